@@ -31,6 +31,7 @@ from dataset import load_dataset, create_dataloaders
 from graph_partition import random_graph_partition
 from graph_partition import metis_graph_partition
 from utils import check_device, process_batch_data, compute_buffer_size
+from utils import lookahead
 from utils import generate_mask, permute, compute_gcn_norm, compute_acc
 
 
@@ -47,8 +48,11 @@ def train_eval(model, feature, gcn_norm, criterion, optim, dataset, data_mode,
         # Then we need to shuffle this list before each epoch starts.
         np.random.shuffle(train_loader)
 
-    for batch_data in train_loader:
+    for batch_data, next_batch_data in lookahead(train_loader):
         batch_id += 1
+        # Read the histories of the next batch while this batch computes,
+        # this batch pulls the ones prefetched in the previous step.
+        model.prefetch(next_batch_data)
         g, batch_size, n_id, offset, count, feat, sub_norm = \
             process_batch_data(batch_data, feature, gcn_norm)
         pred = model(g, feat, sub_norm, batch_size, n_id, offset, count)
@@ -222,8 +226,17 @@ if __name__ == "__main__":
         help=f"Mainly used in creating train dataset, in order to speed up the "
         f"data loading process and reduce process switching. It is useful "
         f"for dataset with small number of batches.")
+    parser.add_argument(
+        "--history_dir",
+        type=str,
+        default=None,
+        help=f"Store history embeddings in memory-mapped files under this "
+        f"directory instead of pinned memory, for graphs whose histories "
+        f"exceed host memory.")
     args = parser.parse_args()
     config = edict(yaml.load(open(args.conf), Loader=yaml.FullLoader))
+    if args.history_dir is not None:
+        config.history_dir = args.history_dir
 
     if not check_device():
         exit()
@@ -24,7 +24,7 @@ import paddle
 from pgl.utils.stream_pool import StreamPool, async_write
 
 sys.path.insert(0, os.path.abspath(".."))
-from history import History
+from history import History, DiskHistory
 from utils import process_batch_data, check_device
 
 
@@ -34,7 +34,8 @@ class ScalableGNN(paddle.nn.Layer):
                  num_layers,
                  hidden_dim,
                  pool_size=None,
-                 buffer_size=None):
+                 buffer_size=None,
+                 history_dir=None):
         super().__init__()
 
         self.num_nodes = num_nodes
@@ -46,8 +47,21 @@ class ScalableGNN(paddle.nn.Layer):
         self._async = False
         self._fout = None
 
-        self.histories = paddle.nn.LayerList(
-            [History(num_nodes, hidden_dim) for _ in range(num_layers - 1)])
+        # Keep the histories in memory-mapped files under history_dir for
+        # graphs whose histories exceed the host memory.
+        self._disk = history_dir is not None
+        if self._disk:
+            if not os.path.exists(history_dir):
+                os.makedirs(history_dir)
+            self.histories = paddle.nn.LayerList([
+                DiskHistory(num_nodes, hidden_dim,
+                            os.path.join(history_dir, "history_%d.npy" % i))
+                for i in range(num_layers - 1)
+            ])
+        else:
+            self.histories = paddle.nn.LayerList([
+                History(num_nodes, hidden_dim) for _ in range(num_layers - 1)
+            ])
 
         self._init_pool()
 
@@ -58,7 +72,7 @@ class ScalableGNN(paddle.nn.Layer):
                                    self.hidden_dim)
 
     def check_emb_on_pin_memory(self):
-        if len(self.histories) > 0:
+        if len(self.histories) > 0 and not self._disk:
             place = self.histories[0].emb.place
             if str(place).startswith("CUDAPinned"):
                 return True
@@ -117,6 +131,10 @@ class ScalableGNN(paddle.nn.Layer):
         assert n_id is not None
         assert batch_size is not None, "batch_size should not be None"
 
+        if self._disk:
+            return self._disk_push_and_pull(history, x, batch_size, n_id,
+                                            offset, count)
+
         if batch_size == len(n_id):
             if self._async:
                 self.pool.async_push(x[:batch_size], history.emb, offset,
@@ -134,6 +152,35 @@ class ScalableGNN(paddle.nn.Layer):
             # TODO(daisiming): Due to some limitations of Paddle OP, we leave here as a todo.
             return x
 
+    def _disk_push_and_pull(self, history, x, batch_size, n_id, offset,
+                            count):
+        if batch_size < len(n_id):
+            out = history.pull(n_id[batch_size:].numpy())
+            out = paddle.to_tensor(out)
+        history.push(x[:batch_size].detach().numpy(),
+                     offset.numpy(), count.numpy())
+        if batch_size == len(n_id):
+            return x
+        return paddle.concat([x[:batch_size], out], axis=0)
+
+    def prefetch(self, batch_data):
+        """Prefetch the history embeddings of the out-of-batch neighbors of
+        the next batch, so that they are read from disk while the current
+        batch is computing. Only work with disk-backed histories.
+
+        Args:
+
+            batch_data (SubgraphData): The next batch data from the loader.
+
+        """
+        if not self._disk or batch_data is None:
+            return
+        n_id = batch_data.n_id[batch_data.batch_size:]
+        if len(n_id) == 0:
+            return
+        for history in self.histories:
+            history.prefetch(n_id)
+
     @paddle.no_grad()
     def _final_out(self):
         if self._fout is None:
@@ -149,6 +196,9 @@ class ScalableGNN(paddle.nn.Layer):
         # such as residual connections.
         loader = [(sub_data, {}) for sub_data in loader]
 
+        if self._disk and len(self.histories) > 0:
+            return self._disk_inference(loader, feature, norm)
+
         if len(self.histories) == 0:
             for sub_data, state in loader:
                 g, batch_size, n_id, offset, count, feat, sub_norm = \
@@ -207,6 +257,39 @@ class ScalableGNN(paddle.nn.Layer):
 
         return self._final_out()
 
+    @paddle.no_grad()
+    def _disk_inference(self, loader, feature, norm):
+        final_out = np.zeros((self.num_nodes, self.output_size), dtype="float32")
+        for layer in range(self.num_layers):
+            if layer > 0:
+                self.histories[layer - 1].prefetch(loader[0][0].n_id)
+            for i, (sub_data, state) in enumerate(loader):
+                # the pull below uses the prefetch started one step earlier
+                if layer > 0 and i + 1 < len(loader):
+                    next_data = loader[i + 1][0]
+                    self.histories[layer - 1].prefetch(next_data.n_id)
+
+                g, batch_size, n_id, offset, count, x, sub_norm = \
+                    process_batch_data(sub_data,
+                                       feature if layer == 0 else None, norm)
+                if layer > 0:
+                    x = paddle.to_tensor(self.histories[layer - 1].pull(
+                        sub_data.n_id))
+                out = self.forward_layer(layer, g, x, sub_norm,
+                                         state)[:batch_size]
+
+                if layer < self.num_layers - 1:
+                    self.histories[layer].push(out.numpy(),
+                                               offset.numpy(), count.numpy())
+                else:
+                    start = 0
+                    out = out.numpy()
+                    for o, c in zip(offset.numpy(), count.numpy()):
+                        final_out[o:o + c] = out[start:start + c]
+                        start += c
+
+        return paddle.to_tensor(final_out)
+
     @paddle.no_grad()
     def forward_layer(self, layer, graph, x, norm=None, state=None):
         raise NotImplementedError
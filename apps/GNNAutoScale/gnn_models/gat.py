@@ -33,7 +33,8 @@ class GAT(ScalableGNN):
                  buffer_size=None,
                  **kwargs):
         super().__init__(num_nodes, num_layers, hidden_size * num_heads,
-                         pool_size, buffer_size)
+                         pool_size, buffer_size,
+                         kwargs.get("history_dir", None))
 
         self.input_size = input_size
         self.hidden_size = hidden_size
@@ -32,7 +32,8 @@ class GCN(ScalableGNN):
                  buffer_size=None,
                  **kwargs):
         super().__init__(num_nodes, num_layers, hidden_size, pool_size,
-                         buffer_size)
+                         buffer_size,
+                         kwargs.get("history_dir", None))
 
         self.input_size = input_size
         self.output_size = output_size
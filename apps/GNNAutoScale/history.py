@@ -17,6 +17,10 @@
     (https://github.com/rusty1s/pyg_autoscale).
 """
 
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import paddle
 from pgl.utils.logger import log
@@ -44,3 +48,144 @@ class History(paddle.nn.Layer):
 
     def forward(self, *args, **kwargs):
         raise NotImplementedError
+
+
+class DiskHistory(paddle.nn.Layer):
+    """History storage in a memory-mapped file for graphs whose history
+    embeddings exceed the host memory.
+
+    The nodes are permuted by graph partition, so the in-batch nodes of
+    a batch are contiguous ranges given by `offset` and `count`, which are
+    pushed with sequential writes. The out-of-batch neighbors of the next
+    batch can be prefetched into RAM by a background thread while the
+    current batch is computing. The pending prefetches are keyed by their
+    node ids, so pulling the current batch uses its own prefetch and keeps
+    the prefetch of the next batch.
+
+    Args:
+
+        num_embs (int): Usually the same with number of nodes in a graph.
+
+        emb_dim (int): Should be set as the hidden size of gnn models.
+
+        path (str): The file to store history embeddings. If None, a
+                    temporary file is created and removed with the object.
+
+        max_prefetch (int): The max number of pending prefetches. The oldest
+                            one is dropped when more are started.
+
+    """
+
+    def __init__(self, num_embs, emb_dim, path=None, max_prefetch=2):
+        super().__init__()
+
+        self.num_embs = num_embs
+        self.emb_dim = emb_dim
+        self.max_prefetch = max_prefetch
+
+        self._tmp_path = None
+        if path is None:
+            fd, path = tempfile.mkstemp(suffix=".npy")
+            os.close(fd)
+            self._tmp_path = path
+        self.path = path
+        self.emb = np.lib.format.open_memmap(
+            path, mode="w+", dtype="float32", shape=(num_embs, emb_dim))
+
+        self._executor = None
+        # node ids -> (future, ranges pushed after the prefetch is started)
+        self._pending = {}
+
+    def _gather(self, index):
+        return self.emb[index]
+
+    def prefetch(self, index):
+        """Start gathering the rows of index in background.
+
+        Args:
+
+            index (numpy.ndarray): The node ids of a later pull.
+
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        index = np.asarray(index, dtype="int64")
+        key = index.tobytes()
+        self._pending.pop(key, None)
+        while len(self._pending) >= self.max_prefetch:
+            oldest = next(iter(self._pending))
+            self._pending.pop(oldest)[0].cancel()
+        future = self._executor.submit(self._gather, index)
+        self._pending[key] = (future, [])
+
+    def pull(self, index):
+        """Pull the history embeddings of index.
+
+        Args:
+
+            index (numpy.ndarray): The node ids to pull.
+
+        Returns:
+
+            out (numpy.ndarray): The history embeddings with shape [len(index), emb_dim].
+
+        """
+        index = np.asarray(index, dtype="int64")
+        pending = self._pending.pop(index.tobytes(), None)
+        if pending is None:
+            return self._gather(index)
+
+        future, pushed = pending
+        out = future.result()
+        if len(pushed) > 0:
+            # rows pushed after the prefetch started are read again
+            offset, count = [np.concatenate(x) for x in zip(*pushed)]
+            order = np.argsort(offset)
+            offset, count = offset[order], count[order]
+            pos = np.searchsorted(offset, index, side="right") - 1
+            stale = pos >= 0
+            stale[stale] = index[stale] < offset[pos[stale]] + count[pos[
+                stale]]
+            out[stale] = self.emb[index[stale]]
+        return out
+
+    def push(self, x, offset, count):
+        """Write the embeddings of in-batch nodes into the history.
+
+        Args:
+
+            x (numpy.ndarray): The embeddings of in-batch nodes, whose rows
+                               are ordered as the ranges of offset and count.
+
+            offset (numpy.ndarray): The begin points of the node ranges.
+
+            count (numpy.ndarray): The length of the node ranges.
+
+        """
+        offset = np.asarray(offset, dtype="int64").reshape([-1])
+        count = np.asarray(count, dtype="int64").reshape([-1])
+        start = 0
+        for o, c in zip(offset, count):
+            self.emb[o:o + c] = x[start:start + c]
+            start += c
+        for _, pushed in self._pending.values():
+            pushed.append((offset, count))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._pending = {}
+        if self._tmp_path is not None and os.path.exists(self._tmp_path):
+            del self.emb
+            os.remove(self._tmp_path)
+            self._tmp_path = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def forward(self, *args, **kwargs):
+        raise NotImplementedError
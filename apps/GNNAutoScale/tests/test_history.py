@@ -0,0 +1,93 @@
+# Copyright (c) 2022 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests of the disk-backed history.
+
+Usage (in apps/GNNAutoScale):
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history import DiskHistory
+
+
+class DiskHistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.history = DiskHistory(10, 2)
+        self.emb = np.arange(20).reshape([10, 2]).astype("float32")
+        self.history.push(self.emb, [0], [10])
+
+        # count the reads from the memory-mapped file
+        self.num_gathers = 0
+        gather = self.history._gather
+
+        def counted_gather(index):
+            self.num_gathers += 1
+            return gather(index)
+
+        self.history._gather = counted_gather
+
+    def tearDown(self):
+        self.history.close()
+
+    def test_pull_without_prefetch(self):
+        index = np.array([3, 1, 7])
+        out = self.history.pull(index)
+        self.assertTrue((out == self.emb[index]).all())
+        self.assertEqual(self.num_gathers, 1)
+
+    def test_prefetch_of_next_batch_is_used(self):
+        curr_index = np.array([2, 5])
+        next_index = np.array([8, 1, 6])
+        self.history.prefetch(curr_index)
+        # the next batch is prefetched before the current batch pulls
+        self.history.prefetch(next_index)
+        out = self.history.pull(curr_index)
+        self.assertTrue((out == self.emb[curr_index]).all())
+        out = self.history.pull(next_index)
+        self.assertTrue((out == self.emb[next_index]).all())
+        self.assertEqual(self.num_gathers, 2)
+
+    def test_rows_pushed_after_prefetch(self):
+        index = np.array([8, 1, 6, 2])
+        self.history.prefetch(index)
+        self.history._pending[index.tobytes()][0].result()
+        new_emb = -np.ones([3, 2], dtype="float32")
+        self.history.push(new_emb, [0, 6], [2, 1])
+        self.emb[[0, 1, 6]] = new_emb
+
+        out = self.history.pull(index)
+        self.assertTrue((out == self.emb[index]).all())
+        self.assertEqual(self.num_gathers, 1)
+
+    def test_max_prefetch(self):
+        indexes = [np.array([i]) for i in range(3)]
+        for index in indexes:
+            self.history.prefetch(index)
+        self.assertEqual(len(self.history._pending), 2)
+        for index in indexes:
+            out = self.history.pull(index)
+            self.assertTrue((out == self.emb[index]).all())
+        # the oldest prefetch is dropped and read again
+        self.assertEqual(self.num_gathers, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -226,6 +226,29 @@ def compute_acc(logits, y, mask):
     return acc
 
 
+def lookahead(loader):
+    """Iterate the loader with the next batch, which is None for the last batch.
+
+    Args:
+
+        loader (Dataloader|list): The loader of batch data.
+
+    Returns:
+
+        An iterator of (batch_data, next_batch_data).
+
+    """
+    loader = iter(loader)
+    try:
+        batch_data = next(loader)
+    except StopIteration:
+        return
+    for next_batch_data in loader:
+        yield batch_data, next_batch_data
+        batch_data = next_batch_data
+    yield batch_data, None
+
+
 def compute_buffer_size(eval_loader):
     """Calculate buffer size for different dataset.
 
@@ -156,7 +156,7 @@ class KGEArgParser(ArgumentParser):
             '--cpu_optimizer',
             type=str,
             default='adagrad',
-            choices=['sgd', 'adagrad'],
+            choices=['sgd', 'adagrad', 'adam', 'rowwise_adam'],
             help='Optimizer of shared embeddings on CPU.')
 
         self.basic_group.add_argument(
@@ -169,6 +169,21 @@ class KGEArgParser(ArgumentParser):
             action='store_true',
             help='Asynchronously update embeddings with gradients.')
 
+        self.basic_group.add_argument(
+            '--ent_cache_size',
+            type=int,
+            default=0,
+            help='Number of hot entity embeddings cached in memory in '\
+                'mix_cpu_gpu mode. 0 means no cache.')
+
+        self.basic_group.add_argument(
+            '--emb_storage_dtype',
+            type=str,
+            default='float32',
+            choices=['float32', 'float16', 'bfloat16', 'int8'],
+            help='Dtype to store shared embeddings on CPU. Embeddings are '\
+                'computed in float32.')
+
         self.basic_group.add_argument(
             '--valid', action='store_true', help='Evaluate the model on'\
                 ' the validation set during training.')
@@ -0,0 +1,153 @@
+# Copyright (c) 2022 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmark the batch construction of KGDataset.collate_fn.
+
+The vectorized collate_fn is compared with the previous implementation,
+which reindexed entities by a dict wrapped in np.vectorize and filtered
+negative samples by rejection.
+
+Usage (in apps/Graph4KG):
+
+    python dataset/benchmark_collate.py --batch_size 1024 --neg_sample_size 256
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+from numpy.random import default_rng
+
+# import as apps/Graph4KG/train.py does, instead of from this directory
+sys.path[0] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from dataset.dataset import KGDataset
+from dataset.trigraph import FilterIndex
+
+
+def legacy_group_index(data):
+    uniques = np.unique(np.concatenate(data))
+    reindex_dict = dict([(x, i) for i, x in enumerate(uniques)])
+    reindex_func = np.vectorize(lambda x: reindex_dict[x])
+    return reindex_func, uniques
+
+
+def legacy_uniform_sampler(k, cand, filter_set=None):
+    rng = default_rng()
+    if filter_set is not None:
+        new_e_list = []
+        new_e_num = 0
+        while new_e_num < k:
+            new_e = rng.choice(cand, 2 * k, replace=True)
+            mask = np.isin(new_e, filter_set, invert=True)
+            new_e = new_e[mask]
+            new_e_list.append(new_e)
+            new_e_num += len(new_e)
+        new_e = np.concatenate(new_e_list)[:k]
+    else:
+        new_e = rng.choice(cand, k, replace=True)
+    return new_e
+
+
+def legacy_collate(data, num_ents, args, filter_index=None):
+    """The previous collate_fn of tail corruption."""
+    h, r, t = np.array(data).T
+    if args.neg_sample_type == 'chunk':
+        neg_size = max(h.shape[0], args.neg_sample_size)
+    else:
+        neg_size = args.neg_sample_size * h.shape[0]
+
+    if filter_index is not None:
+        # the loop-based filter of one set for the whole batch
+        _, filter_set = filter_index.batch_lookup(h, r)
+    else:
+        filter_set = None
+
+    if args.neg_sample_type == 'batch':
+        reindex_func, all_ents = legacy_group_index([h, t])
+        neg_ents = legacy_uniform_sampler(neg_size, all_ents, filter_set)
+    else:
+        neg_ents = legacy_uniform_sampler(neg_size, num_ents, filter_set)
+        reindex_func, all_ents = legacy_group_index([h, t, neg_ents])
+    return reindex_func(h), r, reindex_func(t), reindex_func(
+        neg_ents), all_ents
+
+
+def timeit(func, repeat):
+    func()
+    start = time.time()
+    for _ in range(repeat):
+        func()
+    return (time.time() - start) / repeat
+
+
+def main(args):
+    np.random.seed(args.seed)
+    triplets = np.stack(
+        [
+            np.random.randint(
+                0, args.num_ents, size=args.num_triplets),
+            np.random.randint(
+                0, args.num_rels, size=args.num_triplets),
+            np.random.randint(
+                0, args.num_ents, size=args.num_triplets)
+        ],
+        axis=1).astype('int64')
+    filter_dict = {
+        'head': FilterIndex.build(triplets[:, 2], triplets[:, 1],
+                                  triplets[:, 0], args.num_rels),
+        'tail': FilterIndex.build(triplets[:, 0], triplets[:, 1],
+                                  triplets[:, 2], args.num_rels),
+    }
+    batch_index = np.random.permutation(args.num_triplets)[:args.batch_size]
+    data = [tuple(x) for x in triplets[batch_index]]
+
+    for neg_sample_type in ['batch', 'full', 'chunk']:
+        for filter_sample in [False, True]:
+            args.neg_sample_type = neg_sample_type
+            args.filter_sample = filter_sample
+            dataset = KGDataset(
+                triplets,
+                args.num_ents,
+                args,
+                filter_dict=filter_dict if filter_sample else None)
+            fl_index = filter_dict['tail'] if filter_sample else None
+
+            legacy_cost = timeit(
+                lambda: legacy_collate(data, args.num_ents, args, fl_index),
+                args.repeat)
+            new_cost = timeit(
+                lambda: dataset._collate_fn(data, 'tail', fl_index),
+                args.repeat)
+            print('%-5s filter=%-5s: legacy %8.1f triplets/s, '
+                  'vectorized %8.1f triplets/s, speedup %.2fx' %
+                  (neg_sample_type, filter_sample,
+                   args.batch_size / legacy_cost, args.batch_size / new_cost,
+                   legacy_cost / new_cost))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='benchmark batch construction of KGDataset')
+    parser.add_argument('--num_ents', type=int, default=1000000)
+    parser.add_argument('--num_rels', type=int, default=100)
+    parser.add_argument('--num_triplets', type=int, default=1000000)
+    parser.add_argument('--batch_size', type=int, default=1024)
+    parser.add_argument('--neg_sample_size', type=int, default=256)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    args.weighted_loss = False
+    print(args)
+    main(args)
@@ -20,6 +20,8 @@ import paddle
 from paddle.io import Dataset
 from paddle.io import DataLoader, DistributedBatchSampler
 
+from pgl.utils.shared_embedding import load_weight
+
 from utils import timer_wrapper
 
 
@@ -42,8 +44,10 @@ class KGDataset(Dataset):
                     a group of negative samples sampled from all entities.
             - filter_sample (bool): Whether filter out existing triplets.
         filter_dict (dict, optional):
-            Dictionary of existing triplets, in the form of
-            {'head': {(t, r):set(h)}, 'tail': {(h, r):set(t)}}.
+            FilterIndex of existing triplets, in the form of
+            {'head': FilterIndex of (t, r) -> h, 'tail': FilterIndex of
+            (h, r) -> t}. If filter_sample is True, the true entities of
+            all triplets in a chunk are excluded from its negative samples.
             Default to None.
         shared_path (dict, optional):
             Dictionary of shared embeddings' path for embedding prefetch
@@ -78,28 +82,25 @@ class KGDataset(Dataset):
 
         self._filter_sample = args.filter_sample
         if self._filter_sample is True:
-            raise NotImplementedError('sampling with positive triplets '\
-                'filtered is not implemented!')
+            assert filter_dict is not None, 'filter_dict is required '\
+                'to filter out existing triplets in negative samples!'
+            self._filter_dict = filter_dict
 
         self._step = 0
+        self._rng = default_rng()
 
         self._ent_embedding = None
         self._rel_embedding = None
         if shared_ent_path is not None:
-            self._ent_embedding = np.load(shared_ent_path, mmap_mode='r+')
+            self._ent_embedding = load_weight(shared_ent_path)
         if shared_rel_path is not None:
-            self._rel_embedding = np.load(shared_rel_path, mmap_mode='r+')
+            self._rel_embedding = load_weight(shared_rel_path)
 
     def __len__(self):
         return len(self._triplets)
 
     def __getitem__(self, index):
-        h, r, t = self._triplets[index]
-        if self._sample_weight:
-            weight = self.create_sample_weight(h, r, t)
-        else:
-            weight = -1
-        return h, r, t, weight
+        return self._triplets[index]
 
     def collate_fn(self, data):
         """Collate_fn to corrupt heads and tails by turns.
@@ -111,27 +112,54 @@ class KGDataset(Dataset):
             return self._collate_fn(data, 'tail', self._filter_dict['tail'])
 
     def _collate_fn(self, data, mode, fl_set):
-        h, r, t, weights = np.array(data).T
-
-        if self._neg_sample_type == 'batch':
-            neg_size = self._neg_sample_size * h.shape[0]
-            reindex_func, all_ents = self.group_index([h, t])
-            neg_ents = self.uniform_sampler(neg_size, all_ents)
-
-        elif self._neg_sample_type == 'full':
-            neg_size = self._neg_sample_size * h.shape[0]
-            neg_ents = self.uniform_sampler(neg_size, self._num_ents)
-            reindex_func, all_ents = self.group_index([h, t, neg_ents])
+        h, r, t = np.array(data, dtype='int64').reshape([-1, 3]).T
+        batch_size = h.shape[0]
 
-        elif self._neg_sample_type == 'chunk':
-            neg_size = max(h.shape[0], self._neg_sample_size)
-            neg_ents = self.uniform_sampler(neg_size, self._num_ents)
-            reindex_func, all_ents = self.group_index([h, t, neg_ents])
+        # the negatives of the same chunk are shared by its triplets
+        if self._neg_sample_type == 'chunk':
+            num_chunks = max(batch_size // self._neg_sample_size, 1)
+            neg_size = max(batch_size, self._neg_sample_size)
+        else:
+            num_chunks = batch_size
+            neg_size = self._neg_sample_size * batch_size
+
+        if self._filter_sample:
+            # known positives of the corrupted side
+            if mode == 'head':
+                rows, cols = fl_set.batch_lookup(t, r)
+            else:
+                rows, cols = fl_set.batch_lookup(h, r)
+            filter_chunks = np.minimum(rows // (batch_size // num_chunks),
+                                       num_chunks - 1)
+        else:
+            cols, filter_chunks = None, None
 
+        if self._neg_sample_type == 'batch':
+            cand_ents = np.unique(np.concatenate([h, t]))
+            if cols is not None:
+                # positions of the filtered entities in the candidates
+                pos = np.minimum(
+                    np.searchsorted(cand_ents, cols), len(cand_ents) - 1)
+                found = cand_ents[pos] == cols
+                cols, filter_chunks = pos[found], filter_chunks[found]
+            neg_ents = cand_ents[self.chunk_sampler(
+                neg_size, num_chunks, len(cand_ents), cols, filter_chunks,
+                self._rng)]
+        elif self._neg_sample_type in ['full', 'chunk']:
+            neg_ents = self.chunk_sampler(neg_size, num_chunks,
+                                          self._num_ents, cols, filter_chunks,
+                                          self._rng)
         else:
             raise ValueError('neg_sample_type %s not supported!' %
                              self._neg_sample_type)
 
+        if self._sample_weight:
+            weights = self.create_sample_weight(h, r, t)
+        else:
+            weights = None
+
+        (h, t, neg_ents), all_ents = self.group_index([h, t, neg_ents])
+
         if self._ent_embedding is not None:
             all_ents_emb = self._ent_embedding[all_ents].astype(np.float32)
         else:
@@ -142,24 +170,18 @@ class KGDataset(Dataset):
         else:
             r_emb = None
 
-        h = reindex_func(h)
-        t = reindex_func(t)
-        neg_ents = reindex_func(neg_ents)
-
-        if weights.sum() < 0:
-            weights = None
-
         indexs = (h, r, t, neg_ents, all_ents)
         embeds = (all_ents_emb, r_emb, weights)
         return indexs, embeds, mode
 
     def create_sample_weight(self, head, rel, tail):
-        """Create weights for samples.
+        """Create weights for a batch of samples.
         """
         assert self._filter_dict is not None, 'Can not '\
             'create weights of samples as filter dictionary is not given!'
-        weights = max(len(self._filter_dict['head'][(head, rel)]) + \
-            len(self._filter_dict['tail'][(tail, rel)]), 1.)
+        weights = self._filter_dict['head'].counts(head, rel) + \
+            self._filter_dict['tail'].counts(tail, rel)
+        weights = np.maximum(weights, 1.).astype('float32')
         weights = np.sqrt(1. / weights)
         return weights
 
@@ -168,15 +190,70 @@ class KGDataset(Dataset):
         """
         Function to reindex elements in data.
         Args:
-            data (list): A list of int values.
+            data (list): A list of np.ndarray with int values.
         Return:
-            function: The reindex function to apply to a list.
+            list of np.ndarray: The reindexed arrays with the same shapes.
             np.ndarray: Unique elements in data.
         """
-        uniques = np.unique(np.concatenate(data))
-        reindex_dict = dict([(x, i) for i, x in enumerate(uniques)])
-        reindex_func = np.vectorize(lambda x: reindex_dict[x])
-        return reindex_func, uniques
+        uniques, inverse = np.unique(
+            np.concatenate([x.reshape([-1]) for x in data]),
+            return_inverse=True)
+        outputs = []
+        offset = 0
+        for x in data:
+            outputs.append(inverse[offset:offset + x.size].reshape(x.shape))
+            offset += x.size
+        return outputs, uniques
+
+    @staticmethod
+    def chunk_sampler(k, num_chunks, num_cands, filter_ids=None,
+                      filter_chunks=None, rng=None):
+        """
+        Sample k // num_chunks negatives from [0, num_cands) for each chunk.
+
+        If filter_ids is given, filter_ids[i] is never sampled for the chunk
+        filter_chunks[i]. Instead of rejection, each chunk samples from the
+        count of remaining candidates and maps the samples over its sorted
+        filtered ids. A chunk whose filtered ids cover all the candidates,
+        which happens with small batches or dense relations, is sampled
+        without filtering.
+
+        Return:
+            np.ndarray: Negatives with shape [num_chunks, k // num_chunks].
+        """
+        if rng is None:
+            rng = default_rng()
+        neg_per_chunk = k // num_chunks
+        if filter_ids is None or len(filter_ids) == 0:
+            return rng.integers(
+                0, num_cands, size=(num_chunks, neg_per_chunk), dtype='int64')
+
+        # sorted unique filtered ids of each chunk
+        keys = np.unique(
+            filter_chunks.astype('int64') * num_cands +
+            filter_ids.astype('int64'))
+        chunk_ids = keys // num_cands
+        counts = np.bincount(chunk_ids, minlength=num_chunks)
+        if np.any(counts >= num_cands):
+            # no candidate is left, sample these chunks without filtering
+            keys = keys[counts[chunk_ids] < num_cands]
+            chunk_ids = keys // num_cands
+            counts = np.bincount(chunk_ids, minlength=num_chunks)
+        ids = keys % num_cands
+        offsets = np.cumsum(counts) - counts
+
+        # the u-th remaining candidate of a chunk is u plus the number of
+        # its filtered ids with (id - rank) <= u.
+        gaps = ids - (np.arange(len(ids)) - np.repeat(offsets, counts))
+        samples = (rng.random((num_chunks, neg_per_chunk)) *
+                   (num_cands - counts).reshape([-1, 1])).astype('int64')
+        stride = num_cands + 1
+        chunk_base = np.arange(num_chunks, dtype='int64').reshape([-1, 1])
+        pos = np.searchsorted(
+            np.repeat(np.arange(num_chunks), counts) * stride + gaps,
+            chunk_base * stride + samples,
+            side='right')
+        return samples + pos - offsets.reshape([-1, 1])
 
     @staticmethod
     def uniform_sampler(k, cand, filter_set=None):
@@ -190,19 +267,23 @@ class KGDataset(Dataset):
             filter_set (list): The list of invalid int values.
         """
         rng = default_rng()
-        if filter_set is not None:
-            new_e_list = []
-            new_e_num = 0
-            while new_e_num < k:
-                new_e = rng.choice(cand, 2 * k, replace=True)
-                mask = np.in1d(new_e, filter_set, invert=True)
-                new_e = new_e[mask]
-                new_e_list.append(new_e)
-                new_e_num += len(new_e)
-            new_e = np.concatenate(new_e_list)[:k]
-        else:
-            new_e = rng.choice(cand, k, replace=True)
-        return new_e
+        if filter_set is None:
+            return rng.choice(cand, k, replace=True)
+
+        filter_set = np.asarray(filter_set, dtype='int64')
+        if isinstance(cand, (int, np.integer)):
+            filter_set = filter_set[(filter_set >= 0) & (filter_set < cand)]
+            return KGDataset.chunk_sampler(
+                k, 1, int(cand), filter_set, np.zeros_like(filter_set),
+                rng).reshape([-1])
+
+        cand = np.asarray(cand)
+        filter_set = np.unique(filter_set)
+        pos = np.minimum(np.searchsorted(filter_set, cand), len(filter_set) - 1)
+        if len(filter_set) > 0 and np.any(filter_set[pos] != cand):
+            # sample without filtering if all the candidates are filtered
+            cand = cand[filter_set[pos] != cand]
+        return rng.choice(cand, k, replace=True)
 
 
 class TestKGDataset(Dataset):
@@ -304,7 +385,8 @@ def create_dataloaders(trigraph, args, filter_dict=None, shared_ent_path=None):
         triplets=trigraph.train_triplets,
         num_ents=trigraph.num_ents,
         args=args,
-        filter_dict=filter_dict if args.filter_sample else None,
+        filter_dict=filter_dict
+        if args.filter_sample or args.weighted_loss else None,
         shared_path={'ent': shared_ent_path} if args.mix_cpu_gpu else None)
 
     train_sampler = DistributedBatchSampler(
@@ -19,6 +19,112 @@ from collections import defaultdict
 import numpy as np
 
 
+class FilterIndex(object):
+    """
+    CSR index of the true entities for (entity, relation) pairs.
+
+    The pairs are encoded as ``ent * num_rels + rel`` and sorted into
+    ``keys``, and the true entities of ``keys[i]`` are
+    ``values[indptr[i]:indptr[i + 1]]``, sorted and unique.
+
+    Args:
+        keys (np.ndarray): Sorted unique pair keys.
+        indptr (np.ndarray): Offsets of each key in values.
+        values (np.ndarray): Concatenated true entities.
+        num_rels (int): Number of relations.
+    """
+
+    def __init__(self, keys, indptr, values, num_rels):
+        self._keys = keys
+        self._indptr = indptr
+        self._values = values
+        self._num_rels = int(num_rels)
+
+    @classmethod
+    def build(cls, ents, rels, values, num_rels):
+        """
+        Build the index of values for each pair of (ents[i], rels[i]).
+        """
+        keys = ents.astype('int64') * int(num_rels) + rels.astype('int64')
+        values = values.astype('int64')
+        order = np.lexsort([values, keys])
+        keys, values = keys[order], values[order]
+        if len(keys) > 0:
+            # drop duplicated triplets
+            uniq = np.ones(len(keys), dtype=bool)
+            uniq[1:] = (keys[1:] != keys[:-1]) | (values[1:] != values[:-1])
+            keys, values = keys[uniq], values[uniq]
+        uniq_keys, counts = np.unique(keys, return_counts=True)
+        indptr = np.zeros(len(uniq_keys) + 1, dtype='int64')
+        np.cumsum(counts, out=indptr[1:])
+        return cls(uniq_keys, indptr, values, num_rels)
+
+    def _find(self, ents, rels):
+        """Return the start and end offsets of the pairs in values.
+        """
+        query = np.asarray(
+            ents, dtype='int64') * self._num_rels + np.asarray(
+                rels, dtype='int64')
+        if len(self._keys) == 0:
+            empty = np.zeros(query.shape, dtype='int64')
+            return empty, empty
+        pos = np.searchsorted(self._keys, query)
+        pos = np.minimum(pos, len(self._keys) - 1)
+        found = self._keys[pos] == query
+        start = np.where(found, self._indptr[pos], 0)
+        end = np.where(found, self._indptr[pos + 1], 0)
+        return start, end
+
+    def __getitem__(self, pair):
+        """Return true entities of a pair (ent, rel) like the filter dicts.
+        """
+        start, end = self._find([pair[0]], [pair[1]])
+        return self._values[start[0]:end[0]]
+
+    def counts(self, ents, rels):
+        """Number of true entities for each pair in the batch.
+        """
+        start, end = self._find(ents, rels)
+        return end - start
+
+    def batch_lookup(self, ents, rels):
+        """
+        Gather true entities of a batch of pairs.
+
+        Return:
+            tuple of np.ndarray: (rows, cols), where cols[i] is a true entity
+            of the pair rows[i] in the batch.
+        """
+        start, end = self._find(ents, rels)
+        counts = end - start
+        rows = np.repeat(np.arange(len(counts), dtype='int64'), counts)
+        offsets = np.arange(len(rows), dtype='int64') - np.repeat(
+            np.cumsum(counts) - counts, counts)
+        cols = self._values[np.repeat(start, counts) + offsets]
+        return rows, cols
+
+    def dump(self, path, prefix):
+        """Save the index as ``{prefix}_keys.npy`` etc. in path.
+        """
+        np.save(os.path.join(path, '%s_keys.npy' % prefix), self._keys)
+        np.save(os.path.join(path, '%s_indptr.npy' % prefix), self._indptr)
+        np.save(os.path.join(path, '%s_values.npy' % prefix), self._values)
+
+    @classmethod
+    def load(cls, path, prefix, num_rels, mmap_mode='r'):
+        """Load the index saved by dump, return None if not found.
+        """
+        key_path = os.path.join(path, '%s_keys.npy' % prefix)
+        if not os.path.exists(key_path):
+            return None
+        keys = np.load(key_path, mmap_mode=mmap_mode)
+        indptr = np.load(
+            os.path.join(path, '%s_indptr.npy' % prefix), mmap_mode=mmap_mode)
+        values = np.load(
+            os.path.join(path, '%s_values.npy' % prefix), mmap_mode=mmap_mode)
+        return cls(keys, indptr, values, num_rels)
+
+
 class TriGraph(object):
     """
     Implementation of knowledge graph interface in pglke.
@@ -65,6 +171,9 @@ class TriGraph(object):
         self._ent_feat = ent_feat
         self._rel_feat = rel_feat
 
+        self._head_filter_index = kwargs.get('head_filter_index', None)
+        self._tail_filter_index = kwargs.get('tail_filter_index', None)
+
     def __repr__(self):
         """Pretty Print the TriGraph.
         """
@@ -149,15 +258,29 @@ class TriGraph(object):
         rel_feat = np.load(
             os.path.join(path, 'rel_feat.npy'), mmap_mode=mmap_mode)
         triplets = {'train': train, 'valid': valid, 'test': test}
-        return cls(triplets, num_ents, num_rels, ent_feat, rel_feat)
-
-    def dump(self, path):
+        head_filter_index = FilterIndex.load(
+            path, 'head_filter', num_rels, mmap_mode=mmap_mode)
+        tail_filter_index = FilterIndex.load(
+            path, 'tail_filter', num_rels, mmap_mode=mmap_mode)
+        return cls(
+            triplets,
+            num_ents,
+            num_rels,
+            ent_feat,
+            rel_feat,
+            head_filter_index=head_filter_index,
+            tail_filter_index=tail_filter_index)
+
+    def dump(self, path, filter_index=False):
         """
         Dump knowledge graph data into the given directory.
 
         Args:
             path (str):
                 Directory for the storage of the knowledge graph.
+            filter_index (bool, optional):
+                Whether to build and save the filter indexes of true heads
+                and tails, which can be loaded in mmap_mode with the graph.
 
         """
         if not os.path.exists(path):
@@ -170,6 +293,10 @@ class TriGraph(object):
         np.save(os.path.join(path, 'test.npy'), self._test)
         np.save(os.path.join(path, 'ent_feat.npy'), self._ent_feat)
         np.save(os.path.join(path, 'rel_feat.npy'), self._rel_feat)
+        if filter_index or self._head_filter_index is not None:
+            self.head_filter_index.dump(path, 'head_filter')
+        if filter_index or self._tail_filter_index is not None:
+            self.tail_filter_index.dump(path, 'tail_filter')
 
     @property
     def true_tails_for_head_rel(self):
@@ -201,6 +328,38 @@ class TriGraph(object):
             true_pairs[k] = np.array(list(v), dtype='int32')
         return true_pairs
 
+    @property
+    def head_filter_index(self):
+        """
+        Get the CSR filter index of valid heads for (tail, relation) pairs.
+
+        Return:
+            FilterIndex: The index works like :code:`true_heads_for_tail_rel`
+            with vectorized batch lookup.
+        """
+        if self._head_filter_index is None:
+            triplets = self.triplets
+            self._head_filter_index = FilterIndex.build(
+                triplets[:, 2], triplets[:, 1], triplets[:, 0],
+                self._num_rels)
+        return self._head_filter_index
+
+    @property
+    def tail_filter_index(self):
+        """
+        Get the CSR filter index of valid tails for (head, relation) pairs.
+
+        Return:
+            FilterIndex: The index works like :code:`true_tails_for_head_rel`
+            with vectorized batch lookup.
+        """
+        if self._tail_filter_index is None:
+            triplets = self.triplets
+            self._tail_filter_index = FilterIndex.build(
+                triplets[:, 0], triplets[:, 1], triplets[:, 2],
+                self._num_rels)
+        return self._tail_filter_index
+
     @property
     def ent_feat(self):
         """Entity features (np.ndarray).
@@ -338,6 +497,8 @@ class TriGraph(object):
         self._test = new_object._test
         self._ent_feat = new_object._ent_feat
         self._rel_feat = new_object._rel_feat
+        self._head_filter_index = new_object._head_filter_index
+        self._tail_filter_index = new_object._tail_filter_index
 
     def sampled_subgraph(self, percent, dataset='all'):
         """
@@ -359,6 +520,9 @@ class TriGraph(object):
                 data = data[:max_index]
             return data
 
+        # the filter indexes should be rebuilt with the sampled triplets
+        self._head_filter_index = None
+        self._tail_filter_index = None
         if dataset == 'train' or dataset == 'all':
             self._train = _sample_subgraph(self._train)
         if dataset == 'valid' or dataset == 'all':
@@ -80,11 +80,23 @@ class KGEModel(nn.Layer):
     @property
     def shared_ent_path(self):
         """Return path of entities' shared embeddings.
+
+        It is None if the entity embeddings are cached in memory, as they
+        should be looked up by _get_ent_embedding instead of the file.
         """
-        if self._ent_emb_on_cpu:
+        if self._ent_emb_on_cpu and \
+                self.ent_embedding.cache_stats() is None:
             return self.ent_embedding.weight_path
         return None
 
+    @property
+    def ent_cache_stats(self):
+        """Return hit rate stats of the entity embedding cache.
+        """
+        if self._ent_emb_on_cpu:
+            return self.ent_embedding.cache_stats()
+        return None
+
     @property
     def shared_rel_path(self):
         """Return path of relations' shared embeddings.
@@ -234,7 +246,8 @@ class KGEModel(nn.Layer):
         """
         self.set_eval_mode()
         if cand is None:
-            cand_emb = paddle.to_tensor(self.ent_embedding.weight).unsqueeze(0)
+            cand_emb = paddle.to_tensor(np.asarray(
+                self.ent_embedding.weight, dtype='float32')).unsqueeze(0)
             if self._use_feat:
                 cand_feat = paddle.to_tensor(self._ent_feat.astype('float32'))
                 cand_emb = self.trans_ent(cand_feat, cand_emb)
@@ -265,6 +278,8 @@ class KGEModel(nn.Layer):
             os.makedirs(save_path)
         with open(os.path.join(save_path, 'config.json'), 'w') as wp:
             json.dump(vars(self._args), wp, indent=4)
+        if self._ent_emb_on_cpu:
+            self.ent_embedding.flush()
         if not self._ent_emb_on_cpu:
             paddle.save(self.ent_embedding.state_dict(),
                         os.path.join(save_path, 'ent_embeds.pdparams'))
@@ -374,7 +389,9 @@ class KGEModel(nn.Layer):
                 weight_path=self._ent_weight_path,
                 optimizer=self._optim,
                 learning_rate=self._lr,
-                num_workers=self._args.num_process)
+                num_workers=self._args.num_process,
+                cache_size=getattr(self._args, 'ent_cache_size', 0),
+                storage_dtype=getattr(self._args, 'emb_storage_dtype', None))
         else:
             ent_embeds = nn.Embedding(self._num_ents, self._ent_dim)
             ent_embeds.weight.set_value(ent_weight)
@@ -386,7 +403,8 @@ class KGEModel(nn.Layer):
                 weight_path=self._rel_weight_path,
                 optimizer=self._optim,
                 learning_rate=self._lr,
-                num_workers=self._args.num_process)
+                num_workers=self._args.num_process,
+                storage_dtype=getattr(self._args, 'emb_storage_dtype', None))
         else:
             rel_embeds = nn.Embedding(self._num_rels, self._rel_dim)
             rel_embeds.weight.set_value(rel_weight)
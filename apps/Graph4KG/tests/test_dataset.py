@@ -0,0 +1,182 @@
+# Copyright (c) 2022 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests of the vectorized batch construction of KGDataset.
+
+Usage (in apps/Graph4KG):
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+import argparse
+import unittest
+
+import numpy as np
+from numpy.random import default_rng
+
+# import as apps/Graph4KG/train.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dataset.dataset import KGDataset
+from dataset.trigraph import FilterIndex
+
+
+def legacy_group_index(data):
+    """The previous reindexing by a dict."""
+    uniques = np.unique(np.concatenate(data))
+    reindex_dict = dict([(x, i) for i, x in enumerate(uniques)])
+    return [np.array([reindex_dict[x] for x in d]) for d in data], uniques
+
+
+def legacy_uniform_sampler(k, cand, filter_set=None):
+    """The previous sampler which filters by rejection."""
+    rng = default_rng(0)
+    if filter_set is None:
+        return rng.choice(cand, k, replace=True)
+    new_e_list = []
+    new_e_num = 0
+    while new_e_num < k:
+        new_e = rng.choice(cand, 2 * k, replace=True)
+        new_e = new_e[np.isin(new_e, filter_set, invert=True)]
+        new_e_list.append(new_e)
+        new_e_num += len(new_e)
+    return np.concatenate(new_e_list)[:k]
+
+
+class KGDatasetTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.num_ents, self.num_rels = 40, 3
+        self.triplets = np.stack([
+            rng.randint(0, self.num_ents, 400),
+            rng.randint(0, self.num_rels, 400),
+            rng.randint(0, self.num_ents, 400)
+        ],
+                                 axis=1).astype('int64')
+        self.filter_dict = {
+            'head':
+            FilterIndex.build(self.triplets[:, 2], self.triplets[:, 1],
+                              self.triplets[:, 0], self.num_rels),
+            'tail':
+            FilterIndex.build(self.triplets[:, 0], self.triplets[:, 1],
+                              self.triplets[:, 2], self.num_rels),
+        }
+
+    def make_args(self, neg_sample_type, filter_sample=True):
+        return argparse.Namespace(neg_sample_size=4,
+                                  neg_sample_type=neg_sample_type,
+                                  weighted_loss=False,
+                                  filter_sample=filter_sample)
+
+    def test_group_index(self):
+        data = [
+            np.array([5, 3, 9]),
+            np.array([3, 7]),
+            np.array([[9, 1], [5, 5]])
+        ]
+        outputs, uniques = KGDataset.group_index(data)
+        ground, ground_uniques = legacy_group_index(
+            [x.reshape([-1]) for x in data])
+        self.assertEqual(uniques.tolist(), ground_uniques.tolist())
+        for x, out, gt in zip(data, outputs, ground):
+            self.assertEqual(out.shape, x.shape)
+            self.assertEqual(out.reshape([-1]).tolist(), gt.tolist())
+
+    def test_chunk_sampler(self):
+        rng = default_rng(0)
+        filter_ids = np.array([0, 2, 2, 5, 1, 3])
+        filter_chunks = np.array([0, 0, 0, 0, 1, 1])
+        samples = KGDataset.chunk_sampler(6000, 3, 8, filter_ids,
+                                          filter_chunks, rng)
+        self.assertEqual(samples.shape, (3, 2000))
+        # the same support as rejection sampling, and uniform over it
+        for chunk in range(3):
+            filter_set = filter_ids[filter_chunks == chunk]
+            ground = legacy_uniform_sampler(2000, 8, filter_set)
+            self.assertEqual(set(samples[chunk].tolist()),
+                             set(ground.tolist()))
+            counts = np.bincount(samples[chunk], minlength=8)
+            counts = counts[counts > 0]
+            self.assertTrue(counts.min() > 0.6 * counts.max())
+
+        # a chunk with all candidates filtered is sampled without filtering
+        samples = KGDataset.chunk_sampler(200, 2, 3, np.array([0, 1, 2, 0]),
+                                          np.array([0, 0, 0, 1]), rng)
+        self.assertEqual(set(samples[0].tolist()), set([0, 1, 2]))
+        self.assertEqual(set(samples[1].tolist()), set([1, 2]))
+
+    def test_uniform_sampler(self):
+        cand = np.array([3, 8, 11, 20])
+        for filter_set in [None, [8, 4], [3, 8, 11, 20]]:
+            samples = KGDataset.uniform_sampler(500, cand, filter_set)
+            if filter_set is None or set(filter_set) >= set(cand.tolist()):
+                ground = set(cand.tolist())
+            else:
+                ground = set(
+                    legacy_uniform_sampler(500, cand, filter_set).tolist())
+            self.assertEqual(set(samples.tolist()), ground)
+
+    def test_filtered_collate_fn(self):
+        data = [tuple(x) for x in self.triplets[:16]]
+        h, r, t = self.triplets[:16].T
+        for neg_sample_type in ['batch', 'full', 'chunk']:
+            dataset = KGDataset(self.triplets, self.num_ents,
+                                self.make_args(neg_sample_type),
+                                self.filter_dict)
+            for mode in ['head', 'tail']:
+                (h_idx, r_out, t_idx, neg_idx, all_ents), _, _ = \
+                    dataset._collate_fn(data, mode, self.filter_dict[mode])
+                self.assertEqual(all_ents[h_idx].tolist(), h.tolist())
+                self.assertEqual(all_ents[t_idx].tolist(), t.tolist())
+                self.assertEqual(r_out.tolist(), r.tolist())
+
+                negs = all_ents[neg_idx]
+                num_chunks = negs.shape[0]
+                chunk_size = 16 // num_chunks
+                for chunk in range(num_chunks):
+                    rows = slice(chunk * chunk_size, (chunk + 1) * chunk_size)
+                    if mode == 'head':
+                        _, true_ents = self.filter_dict['head'].batch_lookup(
+                            t[rows], r[rows])
+                    else:
+                        _, true_ents = self.filter_dict['tail'].batch_lookup(
+                            h[rows], r[rows])
+                    self.assertFalse(np.any(np.isin(negs[chunk], true_ents)))
+                    if neg_sample_type == 'batch':
+                        self.assertTrue(
+                            np.all(np.isin(negs[chunk], np.concatenate([h,
+                                                                        t]))))
+
+    def test_filtered_collate_fn_all_filtered(self):
+        # every candidate of the batch is a known tail of (0, 0)
+        triplets = np.array([[0, 0, 0], [0, 0, 1]], dtype='int64')
+        filter_dict = {
+            'head':
+            FilterIndex.build(triplets[:, 2], triplets[:, 1], triplets[:, 0],
+                              1),
+            'tail':
+            FilterIndex.build(triplets[:, 0], triplets[:, 1], triplets[:, 2],
+                              1),
+        }
+        dataset = KGDataset(triplets, 2, self.make_args('batch'), filter_dict)
+        data = [tuple(x) for x in triplets]
+        (_, _, _, neg_idx,
+         all_ents), _, _ = dataset._collate_fn(data, 'tail',
+                                               filter_dict['tail'])
+        self.assertEqual(neg_idx.shape, (2, 4))
+        self.assertTrue(np.all(np.isin(all_ents[neg_idx], [0, 1])))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+# Copyright (c) 2022 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests of the CSR filter index and the batched filtered ranking.
+
+Usage (in apps/Graph4KG):
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import paddle
+
+# import as apps/Graph4KG/train.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dataset.trigraph import TriGraph, FilterIndex
+from utils import calculate_metrics, calculate_batch_metrics
+
+
+class FilterIndexTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.num_ents, self.num_rels = 30, 4
+        train = np.stack([
+            rng.randint(0, self.num_ents, 300),
+            rng.randint(0, self.num_rels, 300),
+            rng.randint(0, self.num_ents, 300)
+        ],
+                         axis=1).astype('int64')
+        # duplicated triplets are counted once
+        train = np.concatenate([train, train[:20]])
+        valid = {
+            'h': train[:10, 0],
+            'r': train[:10, 1],
+            't': train[:10, 2],
+            'mode': 'hrt'
+        }
+        self.graph = TriGraph({
+            'train': train,
+            'valid': valid,
+            'test': valid
+        }, self.num_ents, self.num_rels)
+        self.ents = rng.randint(0, self.num_ents, 50)
+        self.rels = rng.randint(0, self.num_rels, 50)
+
+    def check_lookup(self, index, true_dict):
+        rows, cols = index.batch_lookup(self.ents, self.rels)
+        for i, (ent, rel) in enumerate(zip(self.ents, self.rels)):
+            ground = sorted(true_dict.get((ent, rel), []))
+            self.assertEqual(sorted(cols[rows == i].tolist()), ground)
+            self.assertEqual(sorted(index[(ent, rel)].tolist()), ground)
+        self.assertEqual(
+            index.counts(self.ents, self.rels).tolist(), [
+                len(true_dict.get((e, r), []))
+                for e, r in zip(self.ents, self.rels)
+            ])
+
+    def test_batch_lookup(self):
+        self.check_lookup(self.graph.tail_filter_index,
+                          self.graph.true_tails_for_head_rel)
+        self.check_lookup(self.graph.head_filter_index,
+                          self.graph.true_heads_for_tail_rel)
+
+    def test_dump_and_load(self):
+        with tempfile.TemporaryDirectory() as path:
+            self.graph.dump(path, filter_index=True)
+            tail_index = FilterIndex.load(path,
+                                          'tail_filter',
+                                          self.num_rels,
+                                          mmap_mode='r')
+            head_index = FilterIndex.load(path,
+                                          'head_filter',
+                                          self.num_rels,
+                                          mmap_mode='r')
+            self.assertIsInstance(tail_index._values, np.memmap)
+            self.check_lookup(tail_index, self.graph.true_tails_for_head_rel)
+            self.check_lookup(head_index, self.graph.true_heads_for_tail_rel)
+            del tail_index, head_index
+        self.assertIsNone(FilterIndex.load(path, 'tail_filter', 1))
+
+    def test_batch_metrics(self):
+        rng = np.random.RandomState(1)
+        triplets = self.graph.triplets[rng.permutation(300)[:40]]
+        h, r, t = triplets[:, 0], triplets[:, 1], triplets[:, 2]
+        # coarse scores make ties with the correct entity
+        scores = paddle.to_tensor(
+            rng.randint(0, 5, size=[len(t), self.num_ents]).astype('float32'))
+        corr = paddle.to_tensor(t)
+        true_tails = self.graph.true_tails_for_head_rel
+        for filter_index, filter_list in [
+            (None, None),
+            (self.graph.tail_filter_index,
+             [true_tails[(hi, ri)] for hi, ri in zip(h, r)])
+        ]:
+            logs = calculate_metrics(scores, corr, filter_list)
+            metrics = calculate_batch_metrics(scores, corr, filter_index, h, r)
+            for key, value in metrics.items():
+                ground = np.sum([float(x[key]) for x in logs])
+                self.assertAlmostEqual(float(value), ground, places=4)
+
+
+if __name__ == '__main__':
+    unittest.main()
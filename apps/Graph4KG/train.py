@@ -46,8 +46,8 @@ def main():
     use_filter_set = args.filter_sample or args.filter_eval or args.weighted_loss
     if use_filter_set:
         filter_dict = {
-            'head': trigraph.true_heads_for_tail_rel,
-            'tail': trigraph.true_tails_for_head_rel
+            'head': trigraph.head_filter_index,
+            'tail': trigraph.tail_filter_index
         }
     else:
         filter_dict = None
@@ -169,7 +169,7 @@ def main():
 
             if args.log_interval > 0 and (step + 1) % args.log_interval == 0:
                 print_log(step, args.log_interval, log, timer,
-                          time.time() - t_step)
+                          time.time() - t_step, model.ent_cache_stats)
                 timer = defaultdict(int)
                 log = defaultdict(int)
                 t_step = time.time()
@@ -63,7 +63,7 @@ def set_logger(args):
         logging.info('{:20}:{}'.format(arg, getattr(args, arg)))
 
 
-def print_log(step, interval, log, timer, time_sum):
+def print_log(step, interval, log, timer, time_sum, cache_stats=None):
     """Print log to logger.
     """
     logging.info(
@@ -72,6 +72,10 @@ def print_log(step, interval, log, timer, time_sum):
          interval / time_sum, time_sum))
     logging.info('sample: %f, forward: %f, backward: %f, update: %f' % (
         timer['sample'], timer['forward'], timer['backward'], timer['update']))
+    if cache_stats is not None:
+        logging.info('entity cache: hit rate %.4f, %d/%d rows cached' % (
+            cache_stats['hit_rate'], cache_stats['num_cached'],
+            cache_stats['capacity']))
 
 
 def uniform(low, high, size, dtype=np.float32, seed=0):
@@ -188,6 +192,40 @@ def evaluate_wikikg90m(model, loader, mode, save_path):
                 input_dict=input_dict, dir_path=save_path)
 
 
+def calculate_batch_metrics(scores, corr_idxs, filter_index=None, ents=None,
+                            rels=None):
+    """Calculate summed metrics of a batch with vectorized filtered ranks.
+
+    Args:
+        scores (paddle.Tensor): Scores of all entities with shape [batch_size, num_ents].
+        corr_idxs (paddle.Tensor): The correct entities with shape [batch_size].
+        filter_index (FilterIndex, optional): Index of the true entities for
+            the pairs (ents[i], rels[i]), which are excluded in ranking.
+    """
+    batch_size, num_ents = scores.shape
+    corr_idxs = paddle.reshape(corr_idxs, [-1, 1]).astype('int64')
+    corr_scores = paddle.take_along_axis(scores, corr_idxs, axis=1)
+    greater = (scores > corr_scores).astype('float32')
+    if filter_index is not None:
+        rows, cols = filter_index.batch_lookup(
+            np.asarray(ents).reshape([-1]), np.asarray(rels).reshape([-1]))
+        if len(rows) > 0:
+            flat_index = paddle.to_tensor(rows * num_ents + cols)
+            greater = paddle.scatter(
+                greater.reshape([-1]),
+                flat_index,
+                paddle.zeros(flat_index.shape, dtype='float32'),
+                overwrite=True).reshape([batch_size, num_ents])
+    rank = (paddle.sum(greater, axis=1) + 1).numpy()
+    return {
+        'MRR': np.sum(1.0 / rank),
+        'MR': np.sum(rank),
+        'HITS@1': np.sum(rank <= 1),
+        'HITS@3': np.sum(rank <= 3),
+        'HITS@10': np.sum(rank <= 10),
+    }
+
+
 @timer_wrapper('evaluation')
 def evaluate(model,
              loader,
@@ -196,6 +234,9 @@ def evaluate(model,
              save_path='./tmp/',
              data_mode='hrt'):
     """Evaluate given KGE model.
+
+    The filter_dict is {'head': FilterIndex, 'tail': FilterIndex} from
+    TriGraph.head_filter_index and TriGraph.tail_filter_index.
     """
     if data_mode == 'wikikg2':
         evaluate_wikikg2(model, loader, evaluate_mode, save_path)
@@ -204,35 +245,32 @@ def evaluate(model,
     else:
         model.eval()
         with paddle.no_grad():
-            h_metrics = []
-            t_metrics = []
+            h_metrics = defaultdict(float)
+            t_metrics = defaultdict(float)
+            num_samples = 0
             output = {'h,r->t': {}, 't,r->h': {}, 'average': {}}
 
+            if filter_dict is not None:
+                h_filter, t_filter = filter_dict['head'], filter_dict['tail']
+            else:
+                h_filter, t_filter = None, None
+
             for h, r, t in tqdm(loader):
                 t_score = model.predict(h, r, mode='tail')
                 h_score = model.predict(t, r, mode='head')
-
-                if filter_dict is not None:
-                    h_filter_list = [
-                        filter_dict['head'][(ti, ri)]
-                        for ti, ri in zip(t.numpy(), r.numpy())
-                    ]
-                    t_filter_list = [
-                        filter_dict['tail'][(hi, ri)]
-                        for hi, ri in zip(h.numpy(), r.numpy())
-                    ]
-                else:
-                    h_filter_list = None
-                    t_filter_list = None
-
-                h_metrics += calculate_metrics(h_score, h, h_filter_list)
-                t_metrics += calculate_metrics(t_score, t, t_filter_list)
-
-            for metric in h_metrics[0].keys():
-                output['t,r->h'][metric] = np.mean(
-                    [x[metric] for x in h_metrics])
-                output['h,r->t'][metric] = np.mean(
-                    [x[metric] for x in t_metrics])
+                h_np, r_np, t_np = h.numpy(), r.numpy(), t.numpy()
+
+                for k, v in calculate_batch_metrics(h_score, h, h_filter,
+                                                    t_np, r_np).items():
+                    h_metrics[k] += v
+                for k, v in calculate_batch_metrics(t_score, t, t_filter,
+                                                    h_np, r_np).items():
+                    t_metrics[k] += v
+                num_samples += h_np.shape[0]
+
+            for metric in h_metrics.keys():
+                output['t,r->h'][metric] = h_metrics[metric] / num_samples
+                output['h,r->t'][metric] = t_metrics[metric] / num_samples
                 output['average'][metric] = (
                     output['t,r->h'][metric] + output['h,r->t'][metric]) / 2
             logging.info('-------------- %s result --------------' %
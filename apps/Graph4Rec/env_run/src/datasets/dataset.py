@@ -22,7 +22,6 @@ import numpy as np
 from collections import defaultdict, OrderedDict
 
 import paddle.distributed.fleet as fleet
-import pgl
 from pgl.graph_kernel import skip_gram_gen_pair
 from pgl.utils.logger import log
 from pgl.distributed import DistGraphClient, DistGraphServer
@@ -491,18 +490,20 @@ class SageCollateFn(object):
             feed_dict["%s_info" % slot] = []
 
         center_id = []
-        graphs = []
+        node_id_list = []
+        edges_list = []
+        edges_type_list = []
 
         offset = 0
         total_num_nodes = 0
         for src, pos in batch_data:
-            center_id.append(total_num_nodes)
-            graphs.append(src.graph)
-            total_num_nodes += src.graph.num_nodes
-
-            center_id.append(total_num_nodes)
-            graphs.append(pos.graph)
-            total_num_nodes += pos.graph.num_nodes
+            # join the ego graphs by array slices instead of pgl.Graph.batch
+            for ego in [src, pos]:
+                center_id.append(total_num_nodes)
+                node_id_list.append(ego.node_id)
+                edges_list.append(ego.edges + total_num_nodes)
+                edges_type_list.append(ego.edges_type)
+                total_num_nodes += len(ego.node_id)
 
             for slot in self.config.slots:
                 feed_dict[slot].extend(src.feature[slot][0])
@@ -530,23 +531,23 @@ class SageCollateFn(object):
             feed_dict["%s_info" % slot] = np.concatenate(feed_dict[
                 "%s_info" % slot]).reshape(-1, )
 
-        graphs = pgl.Graph.batch(graphs)
+        edges = np.concatenate(edges_list).reshape([-1, 2])
+        edges_type = np.concatenate(edges_type_list)
+        origin_node_id = np.concatenate(node_id_list).astype("int64")
 
-        feed_dict['num_nodes'] = np.array([graphs.num_nodes], dtype="int64")
+        feed_dict['num_nodes'] = np.array([total_num_nodes], dtype="int64")
 
         for etype_id, etype in enumerate(self.edge_type_list):
-            edges = graphs.edges[graphs.edge_feat["edge_type"] == etype_id]
+            etype_edges = edges[edges_type == etype_id]
             feed_dict['num_edges_%s' % etype] = np.array(
-                [len(edges)], dtype="int64")
-            feed_dict['edges_%s' % etype] = edges
+                [len(etype_edges)], dtype="int64")
+            feed_dict['edges_%s' % etype] = etype_edges
 
         # the total node index of the subgraph
         if self.mode == "gpu":
-            feed_dict["origin_node_id"] = graphs.node_feat["node_id"].reshape(
-                -1, )
+            feed_dict["origin_node_id"] = origin_node_id.reshape(-1, )
         elif self.mode == "distcpu":
-            feed_dict["origin_node_id"] = graphs.node_feat["node_id"].reshape(
-                -1, 1)
+            feed_dict["origin_node_id"] = origin_node_id.reshape(-1, 1)
         else:
             raise ValueError(
                 "[%s] mode is not recognized, it should be [gpu] or [distcpu]")
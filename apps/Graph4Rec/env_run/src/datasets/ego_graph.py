@@ -13,16 +13,15 @@
 # limitations under the License.
 
 import os
-import re
 import sys
 sys.path.append("../")
 import time
 import warnings
 import numpy as np
-from collections import defaultdict
 
 import pgl
 from pgl.utils.logger import log
+from pgl.utils.slot_feature import SlotFeature
 from pgl.distributed import DistGraphClient, DistGraphServer
 
 from utils.config import prepare_config
@@ -30,8 +29,6 @@ from datasets.helper import stream_shuffle_generator, AsynchronousGenerator
 from datasets.node import NodeGenerator
 import datasets.sampling as Sampler
 
-NODE_FEAT_PATTERN = re.compile(r"[:,]")
-
 
 class EgoInfo(object):
     def __init__(self,
@@ -64,79 +61,35 @@ def ego_graph_sample(graph, node_ids, samples, edge_types):
                    --------/-----n8
                           \-----n9
 
-        TODO @Yelrose: Speed up and standarize to pgl.distributed.sampling
+        The ego graphs are sampled into one batched graph by
+        pgl.sampling.ego_graph_sample, and each EgoInfo holds array slices
+        of it with local edges. Nodes without successors are padded by 0.
     """
-
-    # All Nodes
-    all_new_nodes = [node_ids]
-
-    # Node Index
-    all_new_nodes_index = [np.zeros_like(node_ids, dtype="int64")]
-
-    # The Ego Index for each graph
-    all_new_nodes_ego_index = [np.arange(0, len(node_ids), dtype="int64")]
-
-    unique_nodes = set(node_ids)
-
-    ego_graph_list = [
-        EgoInfo(
-            node_id=[n], edges=[], edges_type=[], edges_weight=[])
-        for n in node_ids
-    ]
-
-    for sample in samples:
-        cur_node_ids = all_new_nodes[-1]
-        cur_node_ego_index = all_new_nodes_ego_index[-1]
-        cur_node_index = all_new_nodes_index[-1]
-
-        nxt_node_ids = []
-        nxt_node_ego_index = []
-        nxt_node_index = []
-        for edge_type_id, edge_type in enumerate(edge_types):
-            cur_succs = graph.sample_successor(
-                cur_node_ids, max_degree=sample, edge_type=edge_type)
-            for succs, ego_index, parent_index in zip(
-                    cur_succs, cur_node_ego_index, cur_node_index):
-                if len(succs) == 0:
-                    succs = [0]
-                ego = ego_graph_list[ego_index]
-
-                for succ in succs:
-                    unique_nodes.add(succ)
-                    succ_index = len(ego.node_id)
-                    ego.node_id.append(succ)
-                    nxt_node_ids.append(succ)
-                    nxt_node_ego_index.append(ego_index)
-                    nxt_node_index.append(succ_index)
-                    if succ == 0:
-                        ego.edges.append((succ_index, succ_index))
-                        ego.edges_type.append(edge_type_id)
-                        ego.edges_weight.append(1.0 / len(succs))
-                    else:
-                        ego.edges.append((succ_index, parent_index))
-                        ego.edges_type.append(edge_type_id)
-                        ego.edges_weight.append(1.0 / len(succs))
-        all_new_nodes.append(nxt_node_ids)
-        all_new_nodes_index.append(nxt_node_index)
-        all_new_nodes_ego_index.append(nxt_node_ego_index)
-
-    for ego in ego_graph_list:
-        pg = pgl.Graph(
-            num_nodes=len(ego.node_id),
-            edges=ego.edges,
-            edge_feat={
-                "edge_type": np.array(
-                    ego.edges_type, dtype="int64"),
-                "edge_weight": np.array(
-                    ego.edges_weight, dtype="float32"),
-            },
-            node_feat={"node_id": np.array(
-                ego.node_id, dtype="int64"), })
-        ego.graph = pg
-    return ego_graph_list, list(unique_nodes)
+    batch = pgl.sampling.ego_graph_sample(
+        graph, node_ids, samples, edge_types=edge_types, pad_value=0)
+    node_index = batch._graph_node_index
+    edge_index = batch._graph_edge_index
+    all_node_id = batch.node_feat["node_id"]
+    all_edges = batch.edges
+    all_edges_type = batch.edge_feat["edge_type"]
+    all_edges_weight = batch.edge_feat["edge_weight"]
+
+    ego_graph_list = []
+    for i in range(len(node_ids)):
+        node_start, node_end = node_index[i], node_index[i + 1]
+        edge_start, edge_end = edge_index[i], edge_index[i + 1]
+        ego_graph_list.append(
+            EgoInfo(
+                node_id=all_node_id[node_start:node_end],
+                edges=all_edges[edge_start:edge_end] - node_start,
+                edges_type=all_edges_type[edge_start:edge_end],
+                edges_weight=all_edges_weight[edge_start:edge_end]))
+    return ego_graph_list, np.unique(all_node_id).tolist()
 
 
 def get_slots_feat(graph, nodes, slots):
+    """Fetch the slot features of nodes and parse them into a SlotFeature.
+    """
     nfeat_list = []
     for ntype in graph.get_node_types():
         nfeat_list.append(graph.get_node_feat(nodes, ntype, "s"))
@@ -150,39 +103,55 @@ def get_slots_feat(graph, nodes, slots):
                 break
         res.append(f)
 
-    nfeat_dict = defaultdict(lambda: defaultdict(list))
-    for nid, feat in zip(nodes, res):
-        slot_feat = re.split(NODE_FEAT_PATTERN, feat)
-        for k, v in zip(slot_feat[0::2], slot_feat[1::2]):
-            try:
-                v = int(v)
-                nfeat_dict[nid][k].append(v)
-            except Exception as e:
-                continue
-
-    return nfeat_dict
-
-
-def make_slot_feat(node_id, slots, node_feat_dict):
-    slot_dict = {}
-    slot_cout = {}
-    for slot in slots:
-        slot_dict[slot] = ([], [])
-        slot_cout[slot] = 0
-
-    for n in node_id:
-        nf = node_feat_dict[n]
-        for slot in slots:
-            if slot in nf:
-                slot_dict[slot][0].extend(nf[slot])
-                seg = np.zeros(len(nf[slot]), dtype="int64") + slot_cout[slot]
-                slot_dict[slot][1].extend(seg)
-            else:
-                slot_dict[slot][0].append(0)
-                slot_dict[slot][1].extend([slot_cout[slot]])
-            slot_cout[slot] += 1
-
-    return slot_dict
+    return SlotFeature.from_strings(res, slots, node_ids=np.array(nodes))
+
+
+def load_slots_feat(node_files, slots, feat_name="s"):
+    """Parse the slot features of node files into a SlotFeature at once.
+
+    Each line of the node files is "ntype\tnode_id\tfeat_name feature",
+    the same as the files loaded by the graph servers. The result can be
+    saved by SlotFeature.dump and set as slot_feature_path in the config,
+    so that the features are memory-mapped instead of fetched and parsed
+    for every batch.
+    """
+    node_ids, feats = [], []
+    prefix = feat_name + " "
+    for filepath in node_files:
+        with open(filepath) as reader:
+            for line in reader:
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) < 2:
+                    continue
+                feat = ""
+                for field in fields[2:]:
+                    if field.startswith(prefix):
+                        feat = field[len(prefix):]
+                        break
+                node_ids.append(int(fields[1]))
+                feats.append(feat)
+    return SlotFeature.from_strings(
+        feats, slots, node_ids=np.array(
+            node_ids, dtype="uint64"))
+
+
+def make_slot_feat(node_id, slots, slot_feature):
+    """Gather the slot features of node_id, padding empty slots by 0.
+    """
+    return slot_feature.gather(node_id, slots=slots, pad_value=0)
+
+
+def split_slot_feat(slot_dict, node_index):
+    """Split the slot features gathered for all egos into each ego.
+    """
+    ego_slot_dict = [{} for _ in range(len(node_index) - 1)]
+    for slot, (values, segments) in slot_dict.items():
+        index = np.searchsorted(segments, node_index)
+        for i in range(len(node_index) - 1):
+            ego_slot_dict[i][slot] = (
+                values[index[i]:index[i + 1]],
+                segments[index[i]:index[i + 1]] - node_index[i])
+    return ego_slot_dict
 
 
 class EgoGraphGenerator(object):
@@ -197,6 +166,13 @@ class EgoGraphGenerator(object):
                                           self.config.sample_num_list)
         log.info("sample_num_list is %s" % repr(self.sample_num_list))
 
+        # slot features parsed by load_slots_feat and dumped in advance
+        self.slot_feature = None
+        slot_feature_path = getattr(self.config, "slot_feature_path", None)
+        if len(self.config.slots) > 0 and slot_feature_path:
+            self.slot_feature = SlotFeature.load(
+                slot_feature_path, mmap_mode="r")
+
     def __call__(self, generator):
         self.generator = generator
 
@@ -226,11 +202,22 @@ class EgoGraphGenerator(object):
                 uniq_nodes = nodes
 
             if len(self.config.slots) > 0:
-                nfeat_dict = get_slots_feat(self.graph, uniq_nodes,
-                                            self.config.slots)
-                for ego in ego_graphs:
-                    ego.feature = make_slot_feat(ego.node_id,
-                                                 self.config.slots, nfeat_dict)
+                if self.slot_feature is not None:
+                    slot_feature = self.slot_feature
+                else:
+                    slot_feature = get_slots_feat(self.graph, uniq_nodes,
+                                                  self.config.slots)
+                # gather once for the nodes of all egos
+                ego_sizes = [len(ego.node_id) for ego in ego_graphs]
+                node_index = np.concatenate([[0], np.cumsum(ego_sizes)])
+                all_node_id = np.concatenate(
+                    [np.asarray(ego.node_id) for ego in ego_graphs])
+                slot_dict = make_slot_feat(all_node_id, self.config.slots,
+                                           slot_feature)
+                for ego, feature in zip(ego_graphs,
+                                        split_slot_feat(slot_dict,
+                                                        node_index)):
+                    ego.feature = feature
 
             start = 0
             egos = []
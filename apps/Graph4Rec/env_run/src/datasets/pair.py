@@ -20,7 +20,7 @@ import warnings
 import numpy as np
 from collections import defaultdict
 
-from pgl.graph_kernel import skip_gram_gen_pair
+from pgl.sampling import skip_gram_pairs
 from pgl.utils.logger import log
 from pgl.distributed import DistGraphClient, DistGraphServer
 from pgl.utils.data import Dataloader, StreamDataset
@@ -62,17 +62,25 @@ class PairGenerator(object):
         iterval = 20000000 * 24 // self.config.walk_len
         pair_count = 0
         for walks in self.generator():
+            if len(walks) == 0:
+                continue
             try:
-                for walk in walks:
-                    index = np.arange(0, len(walk), dtype="int64")
-                    batch_s, batch_p = skip_gram_gen_pair(index,
-                                                          self.config.win_size)
-                    for s, p in zip(batch_s, batch_p):
-                        yield walk[s], walk[p]
-                        pair_count += 1
-                        if pair_count % iterval == 0 and self.rank == 0:
-                            log.info("[%s] pairs have been loaded in rank [%s]" \
-                                    % (pair_count, self.rank))
+                # expand positions instead of node ids, so that the ids
+                # are not limited to int64 and only the same position is
+                # skipped in the windows
+                lens = np.array([len(walk) for walk in walks], dtype="int64")
+                offsets = np.cumsum(lens) - lens
+                steps = np.arange(lens.max(), dtype="int64")
+                index = np.where(steps < lens.reshape([-1, 1]),
+                                 offsets.reshape([-1, 1]) + steps, -1)
+                batch_s, batch_p = skip_gram_pairs(index, self.config.win_size)
+                flat_walks = np.concatenate(walks)
+                for s, p in zip(flat_walks[batch_s], flat_walks[batch_p]):
+                    yield s, p
+                    pair_count += 1
+                    if pair_count % iterval == 0 and self.rank == 0:
+                        log.info("[%s] pairs have been loaded in rank [%s]" \
+                                % (pair_count, self.rank))
 
             except Exception as e:
                 log.exception(e)
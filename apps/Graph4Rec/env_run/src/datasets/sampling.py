@@ -297,54 +297,19 @@ def metapath_randomwalk_with_walktimes(graph,
         metapath: meta path for sample nodes.
             e.g: "c2p-p2a-a2p-p2c"
         walk_length: the walk length
+        walk_times: the number of walks from each start node
 
     Return:
-        a list of metapath walks.
+        a list of metapath walks. The walks stopped at the start nodes
+        are dropped.
 
     """
-
-    edge_types = metapath.split('-')
-    walk = []
-    cur_nodes = []
-    neighbors = graph.sample_successor(
-        np.array(
-            start_nodes, dtype="uint64"),
-        max_degree=walk_times,
-        edge_type=edge_types[0])
-    for neigh, walk_id in zip(neighbors, start_nodes):
-        for node_id in neigh:
-            walk.append([walk_id, node_id])
-            cur_nodes.append(node_id)
-
-    if len(walk) == 0:
-        return walk
-
-    cur_walk_ids = np.arange(0, len(walk))
-    cur_nodes = np.array(cur_nodes, dtype="uint64")
-    #  if np.random.random() - 0.02 < 0:
-    #      sys.stderr.write("length of walks %s\n" % (len(walk)))
-
-    mp_len = len(edge_types)
-    for i in range(1, walk_length - 1):
-        cur_succs = graph.sample_successor(
-            cur_nodes, max_degree=1, edge_type=edge_types[i % mp_len])
-        mask = np.array([len(succ) > 0 for succ in cur_succs], dtype="bool")
-        #  mask = [len(succ) > 0 for succ in cur_succs]
-
-        if np.any(mask):
-            cur_walk_ids = cur_walk_ids[mask]
-            cur_nodes = cur_nodes[mask]
-            cur_succs = np.array(cur_succs, dtype="object")[mask]
-        else:
-            # stop when all nodes have no successor
-            break
-
-        nxt_cur_nodes = []
-        for s, walk_id in zip(cur_succs, cur_walk_ids):
-            walk[walk_id].append(s[0])
-            nxt_cur_nodes.append(s[0])
-        cur_nodes = np.array(nxt_cur_nodes, dtype="uint64")
-    return walk
+    walks, lengths = pgl.sampling.metapath_random_walk(
+        graph, start_nodes, metapath, walk_length, walk_times=walk_times)
+    return [
+        walk[:length] for walk, length in zip(walks, lengths)
+        if length > 1
+    ]
 
 
 def metapath_randomwalk(graph,
@@ -366,36 +331,9 @@ def metapath_randomwalk(graph,
         a list of metapath walks.
 
     """
-
-    edge_types = metapath.split('-')
-
-    walk = []
-    for node in start_nodes:
-        walk.append([node])
-
-    cur_walk_ids = np.arange(0, len(start_nodes))
-    cur_nodes = np.array(start_nodes, dtype="uint64")
-    mp_len = len(edge_types)
-    for i in range(0, walk_length - 1):
-        cur_succs = graph.sample_successor(
-            cur_nodes, max_degree=1, edge_type=edge_types[i % mp_len])
-        mask = np.array([len(succ) > 0 for succ in cur_succs], dtype="bool")
-        #  mask = [len(succ) > 0 for succ in cur_succs]
-
-        if np.any(mask):
-            cur_walk_ids = cur_walk_ids[mask]
-            cur_nodes = cur_nodes[mask]
-            cur_succs = np.array(cur_succs, dtype="object")[mask]
-        else:
-            # stop when all nodes have no successor
-            break
-
-        nxt_cur_nodes = []
-        for s, walk_id in zip(cur_succs, cur_walk_ids):
-            walk[walk_id].append(s[0])
-            nxt_cur_nodes.append(s[0])
-        cur_nodes = np.array(nxt_cur_nodes, dtype="uint64")
-    return walk
+    walks, lengths = pgl.sampling.metapath_random_walk(
+        graph, start_nodes, metapath, walk_length)
+    return [walk[:length] for walk, length in zip(walks, lengths)]
 
 
 def random_walk_with_start_prob(graph, nodes, max_depth, proba=0.5):
@@ -20,8 +20,7 @@ import numpy as np
 from pgl import graph_kernel
 from pgl.utils.logger import log
 from pgl.utils.data import Dataset
-from pgl.sampling import random_walk
-from pgl.graph_kernel import skip_gram_gen_pair
+from pgl.sampling import batch_random_walk, skip_gram_pairs, UnigramSampler
 
 
 class BatchRandWalk(object):
@@ -31,17 +30,12 @@ class BatchRandWalk(object):
         self.win_size = win_size
         self.neg_num = neg_num
         self.neg_sample_type = neg_sample_type
+        if self.neg_sample_type == "outdegree":
+            self.neg_sampler = UnigramSampler(self.graph.outdegree())
 
     def __call__(self, nodes):
-        walks = random_walk(self.graph, nodes, self.walk_len)
-        src_list, pos_list = [], []
-        for walk in walks:
-            s, p = skip_gram_gen_pair(walk, self.win_size)
-            src_list.append(s), pos_list.append(p)
-        src = [s for x in src_list for s in x]
-        pos = [s for x in pos_list for s in x]
-        src = np.array(src, dtype=np.int64),
-        pos = np.array(pos, dtype=np.int64)
+        walks = batch_random_walk(self.graph, nodes, self.walk_len)
+        src, pos = skip_gram_pairs(walks, self.win_size)
         src, pos = np.reshape(src, [-1, 1]), np.reshape(pos, [-1, 1])
 
         neg_sample_size = [len(pos), self.neg_num]
@@ -49,10 +43,10 @@ class BatchRandWalk(object):
             negs = np.random.randint(
                 low=0, high=self.graph.num_nodes, size=neg_sample_size)
         elif self.neg_sample_type == "outdegree":
-            pass
-            #negs = alias_sample(neg_sample_size, alias, events)
+            negs = self.neg_sampler.sample(neg_sample_size)
         elif self.neg_sample_type == "inbatch":
-            pass
+            negs = pos[np.random.randint(
+                low=0, high=len(pos), size=neg_sample_size), 0]
         else:
             raise ValueError
         dsts = np.concatenate([pos, negs], 1)
@@ -0,0 +1,78 @@
+# Copyright (c) 2022 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmark CPU inference of conv layers on numpy graphs (fused send_u_recv)
+against tensor graphs (paddle.geometric.send_u_recv).
+"""
+import time
+import argparse
+
+import numpy as np
+import paddle
+import pgl
+from pgl.utils.logger import log
+
+
+def timeit(func, repeat):
+    func()
+    start = time.time()
+    for _ in range(repeat):
+        func()
+    return (time.time() - start) / repeat
+
+
+def main(args):
+    paddle.set_device("cpu")
+    np.random.seed(args.seed)
+    edges = np.random.randint(
+        0, args.num_nodes, size=[args.num_edges, 2], dtype="int64")
+    feature = paddle.to_tensor(
+        np.random.randn(args.num_nodes, args.feature_size).astype("float32"))
+
+    numpy_graph = pgl.Graph(edges=edges, num_nodes=args.num_nodes)
+    numpy_graph.adj_dst_index
+    tensor_graph = pgl.Graph(edges=edges, num_nodes=args.num_nodes).tensor()
+
+    convs = [
+        ("GCNConv", pgl.nn.GCNConv(args.feature_size, args.hidden_size)),
+        ("GraphSageConv(mean)", pgl.nn.GraphSageConv(
+            args.feature_size, args.hidden_size, aggr_func="mean")),
+        ("GraphSageConv(max)", pgl.nn.GraphSageConv(
+            args.feature_size, args.hidden_size, aggr_func="max")),
+        ("GINConv", pgl.nn.GINConv(args.feature_size, args.hidden_size)),
+    ]
+
+    with paddle.no_grad():
+        for name, conv in convs:
+            conv.eval()
+            tensor_cost = timeit(lambda: conv(tensor_graph, feature),
+                                 args.repeat)
+            fused_cost = timeit(lambda: conv(numpy_graph, feature),
+                                args.repeat)
+            log.info("%s: tensor graph %.4f s, numpy graph %.4f s, "
+                     "speedup %.2fx" %
+                     (name, tensor_cost, fused_cost, tensor_cost / fused_cost))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='benchmark fused send_u_recv for CPU inference')
+    parser.add_argument("--num_nodes", type=int, default=100000)
+    parser.add_argument("--num_edges", type=int, default=2000000)
+    parser.add_argument("--feature_size", type=int, default=128)
+    parser.add_argument("--hidden_size", type=int, default=64)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    log.info(args)
+    main(args)
@@ -0,0 +1,133 @@
+# Copyright (c) 2022 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmark the array based graphsage sampler against the list/set sampler.
+"""
+import time
+import copy
+import argparse
+
+import numpy as np
+import pgl
+from pgl import graph_kernel
+from pgl.sampling import graphsage_sample
+from pgl.sampling import NeighborSampler
+from pgl.sampling.custom import subgraph
+from pgl.sampling.sage import edge_hash
+from pgl.utils.logger import log
+
+
+def list_graphsage_sample(graph, nodes, samples, ignore_edges=[]):
+    """The list/set based graphsage sampler for reference."""
+    node_index = copy.deepcopy(nodes)
+    num_layers = len(samples)
+    start_nodes = nodes
+    nodes = list(start_nodes)
+    eids, edges = [], []
+    nodes_set = set(nodes)
+    layer_nodes, layer_eids, layer_edges = [], [], []
+    ignore_edge_set = set([edge_hash(src, dst) for src, dst in ignore_edges])
+
+    for layer_idx in reversed(range(num_layers)):
+        if len(start_nodes) == 0:
+            layer_nodes = [nodes] + layer_nodes
+            layer_eids = [eids] + layer_eids
+            layer_edges = [edges] + layer_edges
+            continue
+        batch_pred_nodes, batch_pred_eids = graph.sample_predecessor(
+            start_nodes, samples[layer_idx], return_eids=True)
+        last_nodes_set = nodes_set
+
+        nodes, eids = copy.copy(nodes), copy.copy(eids)
+        edges = copy.copy(edges)
+        nodes_set, eids_set = set(nodes), set(eids)
+        for srcs, dst, pred_eids in zip(batch_pred_nodes, start_nodes,
+                                        batch_pred_eids):
+            for src, eid in zip(srcs, pred_eids):
+                if edge_hash(src, dst) in ignore_edge_set:
+                    continue
+                if eid not in eids_set:
+                    eids.append(eid)
+                    edges.append([src, dst])
+                    eids_set.add(eid)
+                if src not in nodes_set:
+                    nodes.append(src)
+                    nodes_set.add(src)
+        layer_edges = [edges] + layer_edges
+        start_nodes = list(nodes_set - last_nodes_set)
+        layer_nodes = [nodes] + layer_nodes
+        layer_eids = [eids] + layer_eids
+
+    from_reindex = {x: i for i, x in enumerate(layer_nodes[0])}
+    node_index = graph_kernel.map_nodes(node_index, from_reindex)
+    sample_index = np.array(layer_nodes[0], dtype="int64")
+
+    graph_list = []
+    for i in range(num_layers):
+        sg = subgraph(
+            graph,
+            nodes=layer_nodes[0],
+            eid=layer_eids[i],
+            edges=layer_edges[i])
+        graph_list.append((sg, sample_index, node_index))
+    return graph_list
+
+
+def timeit(name, func, batches):
+    start = time.time()
+    for batch in batches:
+        func(batch)
+    cost = time.time() - start
+    log.info("%s: %.4f s/batch" % (name, cost / len(batches)))
+    return cost
+
+
+def main(args):
+    np.random.seed(args.seed)
+    edges = np.random.randint(
+        0, args.num_nodes, size=[args.num_edges, 2], dtype="int64")
+    graph = pgl.Graph(edges=edges, num_nodes=args.num_nodes)
+    graph.adj_dst_index
+    batches = [
+        np.random.randint(
+            0, args.num_nodes, size=args.batch_size, dtype="int64")
+        for _ in range(args.num_batches)
+    ]
+
+    list_cost = timeit(
+        "list graphsage_sample",
+        lambda b: list_graphsage_sample(graph, b.tolist(), args.samples),
+        batches)
+    array_cost = timeit("array graphsage_sample",
+                        lambda b: graphsage_sample(graph, b, args.samples),
+                        batches)
+    sampler = NeighborSampler(graph, args.samples, backend="numpy")
+    block_cost = timeit("numpy NeighborSampler", sampler.sample_neighbors,
+                        batches)
+    log.info("speedup of array graphsage_sample: %.2fx" %
+             (list_cost / array_cost))
+    log.info("speedup of numpy NeighborSampler: %.2fx" %
+             (list_cost / block_cost))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='benchmark graphsage sample')
+    parser.add_argument("--num_nodes", type=int, default=100000)
+    parser.add_argument("--num_edges", type=int, default=2000000)
+    parser.add_argument("--batch_size", type=int, default=1024)
+    parser.add_argument("--num_batches", type=int, default=10)
+    parser.add_argument("--samples", type=int, nargs='+', default=[25, 10])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    log.info(args)
+    main(args)
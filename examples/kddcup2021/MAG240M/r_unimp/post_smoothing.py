@@ -12,9 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import paddle
-from tqdm import tqdm
 import pgl
+from pgl.utils.propagation import propagate
 import numpy as np
 import torch
 from ogb.lsc import MAG240MDataset, MAG240MEvaluator
@@ -48,36 +47,6 @@ except Exception as e:
 valid_label = np.load("result/%s/all_eval_result.npy" % model_name)
 test_label = np.load("result/%s/test_%s.npy" % (model_name, fold_id))
 
-# prepare indgree
-indegree = paddle.to_tensor(graph.indegree(), dtype="float32")
-indegree = (1.0 / (indegree + 1)).reshape([-1, 1])
-
-
-def aggr(batch, y, nxt_y, y0, alpha):
-    pred = graph.predecessor(batch.numpy())
-    self_label = paddle.to_tensor(y[batch.numpy()])
-    self_label0 = paddle.to_tensor(y0[batch.numpy()])
-    pred_id = []
-    for n, p in enumerate(pred):
-        if len(p) > 0:
-            pred_id.append(np.ones(len(p)) * n)
-    pred_cat = np.concatenate(pred)
-    pred_id_cat = paddle.to_tensor(np.concatenate(pred_id), dtype="int64")
-    pred_cat_pd = paddle.to_tensor(pred_cat)
-
-    pred_label = paddle.to_tensor(y[pred_cat])
-
-    pred_norm = paddle.gather(indegree, pred_cat_pd)
-    self_norm = paddle.gather(indegree, paddle.to_tensor(batch, dtype="int64"))
-
-    others = paddle.zeros_like(self_label)
-    others = paddle.scatter(others, pred_id_cat, pred_label)
-    others = (1 - alpha) * (others + self_label
-                            ) * self_norm + alpha * self_label0
-    others = others / paddle.sum(others, -1, keepdim=True)
-    nxt_y[batch] = others.numpy()
-
-
 # prepare labels
 N = graph.num_nodes
 C = 153
@@ -106,26 +75,32 @@ test_idx = split['test']
 
 # set gold label
 
-y[train_idx].fill(0)
-y[train_idx, labels[train_idx].astype("int32")] = 1
+train_onehot = np.zeros((len(train_idx), C), dtype="float32")
+train_onehot[np.arange(len(train_idx)), labels[train_idx].astype("int32")] = 1
 
-y0[train_idx].fill(0)
-y0[train_idx, labels[train_idx].astype("int32")] = 1
+y[train_idx] = train_onehot
+y0[train_idx] = train_onehot
 
+smooth_nodes = np.concatenate([train_idx, val_idx, test_idx]).astype("int64")
 
-def smooth(y0, y, nxt_y, alpha=0.2):
-    nodes = train_idx.tolist() + val_idx.tolist() + test_idx.tolist()
-    pbar = tqdm(total=len(nodes))
-    batch_size = 50000
-    batch_no = 0
-    nxt_y.fill(0)
 
-    while batch_no < len(nodes):
-        batch = nodes[batch_no:batch_no + batch_size]
-        batch = paddle.to_tensor(batch, dtype="int64")
-        aggr(batch, y, nxt_y, y0, alpha)
-        batch_no += batch_size
-        pbar.update(batch_size)
+def smooth(y0, y, nxt_y, alpha=0.2):
+    # one hop of (1 - alpha) * mean(y of predecessors and itself) + alpha * y0
+    # over the CSR of the graph, only for the nodes of the splits.
+    propagate(
+        graph,
+        y,
+        num_iters=1,
+        alpha=alpha,
+        norm="row",
+        add_self_loop=True,
+        init=y0,
+        nodes=smooth_nodes,
+        fixed_index=train_idx,
+        fixed_value=train_onehot,
+        post_step="normalize",
+        out=nxt_y,
+        num_threads=os.cpu_count())
 
 
 evaluator = MAG240MEvaluator()
@@ -163,9 +138,6 @@ for hop in range(1, 5):
     smooth(y0, y, nxt_y, alpha)
     nxt_y, y = y, nxt_y
 
-    y[train_idx].fill(0)
-    y[train_idx, labels[train_idx].astype("int32")] = 1
-
     train_label = labels[train_idx]
     train_pred = y[train_idx]
     train_pred = np.argmax(train_pred, -1)
@@ -756,7 +756,9 @@ class BiGraph(object):
                          nodes,
                          max_degree,
                          return_eids=False,
-                         shuffle=False):
+                         shuffle=False,
+                         return_flat=False,
+                         weighted=False):
         """Sample successors of given src nodes.
 
         Args:
@@ -767,17 +769,51 @@ class BiGraph(object):
 
             return_eids: Whether to return the corresponding eids.
 
+            shuffle: Whether to shuffle the successors of nodes with degree
+                     smaller than max_degree.
+
+            return_flat: If True, return flat numpy.ndarray instead of a list
+                         of numpy.ndarray for each node.
+
+            weighted: If True, sample successors by edge weights with replacement
+                      from the alias tables built by
+                      :code:`EdgeIndex.build_alias_table`.
+                      Every node draws max_degree successors (or as many as its
+                      degree if max_degree < 0), and successors with zero
+                      weight are never drawn.
+
         Return:
 
             Return a list of numpy.ndarray and each numpy.ndarray represent a list
             of sampled successor ids for given nodes. If :code:`return_eids=True`, there will
             be an additional list of numpy.ndarray and each numpy.ndarray represent
             a list of eids that connected nodes to their successors.
+
+            If :code:`return_flat=True`, return a tuple of (successors, counts),
+            or (successors, eids, counts) if :code:`return_eids=True`. The sampled
+            successors of nodes[i] are stored in successors[offset[i]:offset[i] + counts[i]]
+            where offset is the cumsum of counts.
         """
         if self.is_tensor():
             raise ValueError(
                 "You must call BiGraph.numpy() first. Tensor object don't supprt sample_successor now."
             )
+        elif return_flat or weighted:
+            if nodes is None:
+                nodes = self.src_nodes
+            node_succ, node_succ_eid, counts = self.adj_src_index.sample_flat(
+                nodes, max_degree, shuffle=shuffle, weighted=weighted)
+            if not return_flat:
+                split = np.cumsum(counts)[:-1]
+                node_succ = np.split(node_succ, split)
+                if return_eids:
+                    return node_succ, np.split(node_succ_eid, split)
+                else:
+                    return node_succ
+            if return_eids:
+                return node_succ, node_succ_eid, counts
+            else:
+                return node_succ, counts
         else:
             node_succ = self.successor(nodes, return_eids=return_eids)
             if return_eids:
@@ -879,7 +915,9 @@ class BiGraph(object):
                            nodes,
                            max_degree,
                            return_eids=False,
-                           shuffle=False):
+                           shuffle=False,
+                           return_flat=False,
+                           weighted=False):
         """Sample predecessor of given dst nodes.
 
         Args:
@@ -890,17 +928,51 @@ class BiGraph(object):
 
             return_eids: Whether to return the corresponding eids.
 
+            shuffle: Whether to shuffle the predecessors of nodes with degree
+                     smaller than max_degree.
+
+            return_flat: If True, return flat numpy.ndarray instead of a list
+                         of numpy.ndarray for each node.
+
+            weighted: If True, sample predecessors by edge weights with replacement
+                      from the alias tables built by
+                      :code:`EdgeIndex.build_alias_table`.
+                      Every node draws max_degree predecessors (or as many as its
+                      degree if max_degree < 0), and predecessors with zero
+                      weight are never drawn.
+
         Return:
 
             Return a list of numpy.ndarray and each numpy.ndarray represent a list
             of sampled predecessor ids for given nodes. If :code:`return_eids=True`, there will
             be an additional list of numpy.ndarray and each numpy.ndarray represent
             a list of eids that connected nodes to their predecessors.
+
+            If :code:`return_flat=True`, return a tuple of (predecessors, counts),
+            or (predecessors, eids, counts) if :code:`return_eids=True`. The sampled
+            predecessors of nodes[i] are stored in predecessors[offset[i]:offset[i] + counts[i]]
+            where offset is the cumsum of counts.
         """
         if self.is_tensor():
             raise ValueError(
                 "You must call BiGraph.numpy() first. Tensor object don't supprt sample_predecessor now."
             )
+        elif return_flat or weighted:
+            if nodes is None:
+                nodes = self.dst_nodes
+            node_pred, node_pred_eid, counts = self.adj_dst_index.sample_flat(
+                nodes, max_degree, shuffle=shuffle, weighted=weighted)
+            if not return_flat:
+                split = np.cumsum(counts)[:-1]
+                node_pred = np.split(node_pred, split)
+                if return_eids:
+                    return node_pred, np.split(node_pred_eid, split)
+                else:
+                    return node_pred
+            if return_eids:
+                return node_pred, node_pred_eid, counts
+            else:
+                return node_pred, counts
         else:
             node_pred = self.predecessor(nodes, return_eids=return_eids)
             if return_eids:
@@ -35,6 +35,23 @@ from pgl.utils.helper import check_is_tensor, maybe_num_nodes, to_paddle_tensor
 from pgl.utils.helper import generate_segment_id_from_index, unique_segment
 
 
+_FUSED_REDUCE_OP = {"sum": 0, "mean": 1, "max": 2, "min": 3}
+
+
+def _can_fuse_send_u_recv(feature):
+    """Whether the feature can be aggregated by the fused CPU kernel of a
+    numpy graph, which does not keep the gradient.
+    """
+    if isinstance(feature, np.ndarray):
+        return True
+    if not paddle.in_dynamic_mode() or not isinstance(feature,
+                                                      paddle.Tensor):
+        return False
+    if not feature.place.is_cpu_place():
+        return False
+    return feature.stop_gradient or not paddle.is_grad_enabled()
+
+
 class Graph(object):
     """Implementation of graph interface in pgl.
 
@@ -537,7 +554,9 @@ class Graph(object):
                          nodes,
                          max_degree,
                          return_eids=False,
-                         shuffle=False):
+                         shuffle=False,
+                         return_flat=False,
+                         weighted=False):
         """Sample successors of given nodes.
 
         Args:
@@ -548,17 +567,51 @@ class Graph(object):
 
             return_eids: Whether to return the corresponding eids.
 
+            shuffle: Whether to shuffle the successors of nodes with degree
+                     smaller than max_degree.
+
+            return_flat: If True, return flat numpy.ndarray instead of a list
+                         of numpy.ndarray for each node.
+
+            weighted: If True, sample successors by edge weights with replacement
+                      from the alias tables built by
+                      :code:`EdgeIndex.build_alias_table`.
+                      Every node draws max_degree successors (or as many as its
+                      degree if max_degree < 0), and successors with zero
+                      weight are never drawn.
+
         Return:
 
             Return a list of numpy.ndarray and each numpy.ndarray represent a list
             of sampled successor ids for given nodes. If :code:`return_eids=True`, there will
             be an additional list of numpy.ndarray and each numpy.ndarray represent
             a list of eids that connected nodes to their successors.
+
+            If :code:`return_flat=True`, return a tuple of (successors, counts),
+            or (successors, eids, counts) if :code:`return_eids=True`. The sampled
+            successors of nodes[i] are stored in successors[offset[i]:offset[i] + counts[i]]
+            where offset is the cumsum of counts.
         """
         if self.is_tensor():
             raise ValueError(
                 "You must call Graph.numpy() first. Tensor object don't supprt sample_successor now."
             )
+        elif return_flat or weighted:
+            if nodes is None:
+                nodes = self.nodes
+            node_succ, node_succ_eid, counts = self.adj_src_index.sample_flat(
+                nodes, max_degree, shuffle=shuffle, weighted=weighted)
+            if not return_flat:
+                split = np.cumsum(counts)[:-1]
+                node_succ = np.split(node_succ, split)
+                if return_eids:
+                    return node_succ, np.split(node_succ_eid, split)
+                else:
+                    return node_succ
+            if return_eids:
+                return node_succ, node_succ_eid, counts
+            else:
+                return node_succ, counts
         else:
             node_succ = self.successor(nodes, return_eids=return_eids)
             if return_eids:
@@ -645,7 +698,9 @@ class Graph(object):
                            nodes,
                            max_degree,
                            return_eids=False,
-                           shuffle=False):
+                           shuffle=False,
+                           return_flat=False,
+                           weighted=False):
         """Sample predecessor of given nodes.
 
         Args:
@@ -656,17 +711,51 @@ class Graph(object):
 
             return_eids: Whether to return the corresponding eids.
 
+            shuffle: Whether to shuffle the predecessors of nodes with degree
+                     smaller than max_degree.
+
+            return_flat: If True, return flat numpy.ndarray instead of a list
+                         of numpy.ndarray for each node.
+
+            weighted: If True, sample predecessors by edge weights with replacement
+                      from the alias tables built by
+                      :code:`EdgeIndex.build_alias_table`.
+                      Every node draws max_degree predecessors (or as many as its
+                      degree if max_degree < 0), and predecessors with zero
+                      weight are never drawn.
+
         Return:
 
             Return a list of numpy.ndarray and each numpy.ndarray represent a list
             of sampled predecessor ids for given nodes. If :code:`return_eids=True`, there will
             be an additional list of numpy.ndarray and each numpy.ndarray represent
             a list of eids that connected nodes to their predecessors.
+
+            If :code:`return_flat=True`, return a tuple of (predecessors, counts),
+            or (predecessors, eids, counts) if :code:`return_eids=True`. The sampled
+            predecessors of nodes[i] are stored in predecessors[offset[i]:offset[i] + counts[i]]
+            where offset is the cumsum of counts.
         """
         if self.is_tensor():
             raise ValueError(
                 "You must call Graph.numpy() first. Tensor object don't supprt sample_predecessor now."
             )
+        elif return_flat or weighted:
+            if nodes is None:
+                nodes = self.nodes
+            node_pred, node_pred_eid, counts = self.adj_dst_index.sample_flat(
+                nodes, max_degree, shuffle=shuffle, weighted=weighted)
+            if not return_flat:
+                split = np.cumsum(counts)[:-1]
+                node_pred = np.split(node_pred, split)
+                if return_eids:
+                    return node_pred, np.split(node_pred_eid, split)
+                else:
+                    return node_pred
+            if return_eids:
+                return node_pred, node_pred_eid, counts
+            else:
+                return node_pred, counts
         else:
             node_pred = self.predecessor(nodes, return_eids=return_eids)
             if return_eids:
@@ -837,6 +926,11 @@ class Graph(object):
         Now, this method only supports default copy send function, and built-in receive 
         function ('sum', 'mean', 'max', 'min').
 
+        If the graph is not a tensor graph, the feature can be a numpy array or
+        a CPU tensor which does not require gradient. The result is then
+        computed by a fused CPU kernel over :code:`adj_dst_index`, which is
+        useful for inference without materializing the edge messages.
+
         Args:
 
            feature (Tensor): The node feature of a graph.
@@ -850,12 +944,14 @@ class Graph(object):
 
         """
 
-        if not self._is_tensor:
-            raise ValueError("You must call Graph.tensor()")
-
         assert reduce_func in ['sum', 'mean', 'max', 'min'], \
             "Only support 'sum', 'mean', 'max', 'min' built-in reduce functions."
 
+        if not self._is_tensor:
+            if _can_fuse_send_u_recv(feature):
+                return self._fused_send_u_recv(feature, reduce_func, out_size)
+            raise ValueError("You must call Graph.tensor()")
+
         src, dst = self.edges[:, 0], self.edges[:, 1]
         return paddle.geometric.send_u_recv(
             feature, src, dst, reduce_op=reduce_func, out_size=out_size)
@@ -863,6 +959,11 @@ class Graph(object):
     def send_u_recv(self, feature, reduce_op="sum", out_size=None):
         """Call paddle.geometric.send_u_recv
 
+        If the graph is not a tensor graph, the feature can be a numpy array or
+        a CPU tensor which does not require gradient. The result is then
+        computed by a fused CPU kernel over :code:`adj_dst_index`, which is
+        useful for inference without materializing the edge messages.
+
         Args:
 
             feature (Tensor): The node feature of a graph.
@@ -876,16 +977,48 @@ class Graph(object):
         
         """
 
-        if not self._is_tensor:
-            raise ValueError("You must call Graph.tensor()")
-
         assert reduce_op in ['sum', 'mean', 'max', 'min'], \
             "Only support 'sum', 'mean', 'max', 'min' built-in reduce functions."
 
+        if not self._is_tensor:
+            if _can_fuse_send_u_recv(feature):
+                return self._fused_send_u_recv(feature, reduce_op, out_size)
+            raise ValueError("You must call Graph.tensor()")
+
         src, dst = self.edges[:, 0], self.edges[:, 1]
         return paddle.geometric.send_u_recv(
             feature, src, dst, reduce_op=reduce_op, out_size=out_size)
 
+    def _fused_send_u_recv(self, feature, reduce_op="sum", out_size=None):
+        """Aggregate source node features for each destination on CPU.
+
+        It reduces over the CSR of adj_dst_index directly, so the messages
+        of shape [num_edges, dim] are never materialized.
+        """
+        is_numpy = isinstance(feature, np.ndarray)
+        if not is_numpy:
+            feature = feature.numpy()
+        if feature.dtype not in (np.float32, np.float64):
+            feature = feature.astype(paddle.get_default_dtype())
+
+        if out_size is None or int(out_size) <= 0:
+            out_size = feature.shape[0]
+        out_size = int(out_size)
+
+        flat_feature = np.ascontiguousarray(
+            feature.reshape([feature.shape[0], -1]))
+        output = np.zeros(
+            [out_size, flat_feature.shape[1]], dtype=flat_feature.dtype)
+        index = self.adj_dst_index
+        graph_kernel.csr_send_u_recv(index._indptr, index._sorted_v,
+                                     flat_feature, output, 0,
+                                     min(out_size, self.num_nodes),
+                                     _FUSED_REDUCE_OP[reduce_op])
+        output = output.reshape([out_size] + list(feature.shape[1:]))
+        if not is_numpy:
+            output = paddle.to_tensor(output)
+        return output
+
     def send_ue_recv(self,
                      feature,
                      edge_feature,
@@ -1240,7 +1373,7 @@ class Graph(object):
                    _graph_node_index=graph_node_index,
                    _graph_edge_index=graph_edge_index)
 
-    def dump(self, path):
+    def dump(self, path, indegree=False, outdegree=False, num_threads=1):
         """Dump the graph into a directory.
 
         This function will dump the graph information into the given directory path. 
@@ -1249,11 +1382,20 @@ class Graph(object):
         Args:
             path: The directory for the storage of the graph.
 
+            indegree: Whether to dump adj_dst_index. If it has not been built,
+                      it will be built on disk from the dumped edges with
+                      :code:`EdgeIndex.build_on_disk` without loading it into memory.
+
+            outdegree: Whether to dump adj_src_index, which is built in the same
+                       way as indegree.
+
+            num_threads: The number of threads to build the EdgeIndex on disk.
+
         """
         if self._is_tensor:
             # Convert back into numpy and dump.
             graph = self.numpy(inplace=False)
-            graph.dump(path)
+            graph.dump(path, indegree, outdegree, num_threads)
         else:
             if not os.path.exists(path):
                 os.makedirs(path)
@@ -1264,9 +1406,23 @@ class Graph(object):
 
             if self._adj_src_index is not None:
                 self._adj_src_index.dump(os.path.join(path, 'adj_src'))
+            elif outdegree:
+                EdgeIndex.build_on_disk(
+                    os.path.join(path, 'edges.npy'),
+                    self._num_nodes,
+                    os.path.join(path, 'adj_src'),
+                    sort_by="src",
+                    num_threads=num_threads)
 
             if self._adj_dst_index is not None:
                 self._adj_dst_index.dump(os.path.join(path, 'adj_dst'))
+            elif indegree:
+                EdgeIndex.build_on_disk(
+                    os.path.join(path, 'edges.npy'),
+                    self._num_nodes,
+                    os.path.join(path, 'adj_dst'),
+                    sort_by="dst",
+                    num_threads=num_threads)
 
             if self._graph_node_index is not None:
                 np.save(
@@ -22,12 +22,20 @@ from libcpp.set cimport set
 from libcpp.unordered_set cimport unordered_set
 from libcpp.unordered_map cimport unordered_map
 from libcpp.vector cimport vector
+from libcpp.string cimport string
 from libc.stdlib cimport rand, RAND_MAX
+from libc.string cimport memcmp
+from libc.math cimport pow
 from libcpp cimport bool
+from libcpp.algorithm cimport sort as stdsort
+from libcpp.utility cimport pair
+from cython.operator cimport dereference as deref
 
 cdef extern from "stdint.h":
     ctypedef signed int int64_t
 
+ctypedef pair[long long, long long] int64_pair_t
+
 cdef extern from *:
     """
     #if defined(_WIN32) || defined(MS_WINDOWS) || defined(_MSC_VER)
@@ -87,6 +95,55 @@ def build_index(np.ndarray[np.int64_t, ndim=1] u,
             count[u[i]] += 1
     return degree, _tmp_v, _tmp_u, _tmp_eid, indptr
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def count_degree_by_chunk(np.ndarray[np.int64_t, ndim=2] edges,
+        long long col,
+        long long start,
+        long long end,
+        np.ndarray[np.int64_t, ndim=1] degree):
+    """Count the degree of edges[start:end, col] into degree in place.
+
+    Callers working on disjoint edge chunks with their own degree arrays
+    can run in parallel threads, and each edge is read once.
+    """
+    cdef long long i
+    with nogil:
+        for i in xrange(start, end):
+            degree[edges[i, col]] += 1
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def scatter_index_by_chunk(np.ndarray[np.int64_t, ndim=2] edges,
+        long long col,
+        long long start,
+        long long end,
+        np.ndarray[np.int64_t, ndim=1] cursor,
+        np.ndarray[np.int64_t, ndim=1] sorted_v,
+        np.ndarray[np.int64_t, ndim=1] sorted_u,
+        np.ndarray[np.int64_t, ndim=1] sorted_eid,
+        long long eid_offset=0):
+    """Scatter edges[start:end] into the sorted arrays.
+
+    cursor[u] is the first position of the edges of u in this chunk, and it
+    is advanced in place. With cursors from the prefix sum of the degrees
+    of the previous chunks, the edges of each node keep their original
+    order, which is the same as build_index. Callers working on disjoint
+    edge chunks with their own cursors can run in parallel threads. The
+    eid of edges[i] is i + eid_offset, so edges can be a block of the edges.
+    """
+    cdef long long i, u, pos
+    cdef long long other = 1 - col
+    with nogil:
+        for i in xrange(start, end):
+            u = edges[i, col]
+            pos = cursor[u]
+            cursor[u] += 1
+            sorted_v[pos] = edges[i, other]
+            sorted_u[pos] = u
+            sorted_eid[pos] = i + eid_offset
+
 @cython.boundscheck(False)
 @cython.wraparound(False)
 def slice_by_index(np.ndarray[np.int64_t, ndim=1] u,
@@ -338,6 +395,826 @@ def sample_subset_with_eid(list nids, list eids, long long maxdegree, shuffle=Fa
             offset += sample_size
     return output, output_eid
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef inline long long sample_segment(long long start,
+        long long deg,
+        long long k,
+        bool do_shuffle,
+        const long long[:] sorted_v,
+        const long long[:] sorted_eid,
+        const long long[:] rnd,
+        long long rnd_offset,
+        long long[:] neighbors,
+        long long[:] eids,
+        long long offset,
+        vector[long long] &perm,
+        unordered_map[long long, long long] &m) nogil:
+    """Sample k of the deg neighbors in sorted_v[start:start + deg] without
+    replacement into neighbors[offset:offset + k].
+
+    Return:
+        The number of random numbers consumed from rnd.
+    """
+    cdef long long t, j, pick, last
+    if k == deg and not do_shuffle:
+        for t in xrange(k):
+            neighbors[offset + t] = sorted_v[start + t]
+            eids[offset + t] = sorted_eid[start + t]
+        return 0
+    elif deg <= 32 * k:
+        # partial Fisher-Yates on a reusable buffer for small degrees
+        perm.resize(deg)
+        for t in xrange(deg):
+            perm[t] = t
+        for t in xrange(k):
+            j = t + rnd[rnd_offset + t] % (deg - t)
+            pick = perm[j]
+            perm[j] = perm[t]
+            neighbors[offset + t] = sorted_v[start + pick]
+            eids[offset + t] = sorted_eid[start + pick]
+    else:
+        m.clear()
+        for t in xrange(k):
+            j = rnd[rnd_offset + t] % (deg - t)
+            pick = j if m.find(j) == m.end() else m[j]
+            neighbors[offset + t] = sorted_v[start + pick]
+            eids[offset + t] = sorted_eid[start + pick]
+            last = deg - t - 1
+            m[j] = last if m.find(last) == m.end() else m[last]
+    return k
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def sample_neighbors_flat(np.ndarray[np.int64_t, ndim=1] indptr,
+        np.ndarray[np.int64_t, ndim=1] sorted_v,
+        np.ndarray[np.int64_t, ndim=1] sorted_eid,
+        np.ndarray[np.int64_t, ndim=1] nodes,
+        long long max_degree,
+        shuffle=False):
+    """Sample neighbors of given nodes directly from CSR arrays.
+
+    Neighbors are sampled without replacement. If :code:`max_degree < 0`,
+    all neighbors are returned.
+
+    Return:
+        A tuple of (neighbors, eids, counts) in flat numpy.ndarray, where
+        the neighbors of nodes[i] are stored in
+        neighbors[offset[i]:offset[i] + counts[i]].
+    """
+    cdef long long n_size = len(nodes)
+    cdef long long i, start, deg
+    cdef long long total = 0
+    cdef long long total_rnd = 0
+    cdef long long offset = 0
+    cdef long long rnd_offset = 0
+    cdef bool do_shuffle = shuffle
+    cdef unordered_map[long long, long long] m
+    cdef vector[long long] perm
+    cdef np.ndarray[np.int64_t, ndim=1] counts = np.zeros([n_size], dtype=np.int64)
+
+    with nogil:
+        for i in xrange(n_size):
+            deg = indptr[nodes[i] + 1] - indptr[nodes[i]]
+            if max_degree >= 0 and deg > max_degree:
+                counts[i] = max_degree
+                total_rnd += max_degree
+            else:
+                counts[i] = deg
+                if do_shuffle:
+                    total_rnd += deg
+            total += counts[i]
+
+    cdef np.ndarray[np.int64_t, ndim=1] neighbors = np.zeros([total], dtype=np.int64)
+    cdef np.ndarray[np.int64_t, ndim=1] eids = np.zeros([total], dtype=np.int64)
+    cdef np.ndarray[np.int64_t, ndim=1] rnd = np.random.randint(0,  np.iinfo(np.int64).max,
+                                                              dtype=np.int64, size=total_rnd)
+    cdef const long long[:] v_view = sorted_v
+    cdef const long long[:] eid_view = sorted_eid
+    cdef const long long[:] rnd_view = rnd
+    cdef long long[:] neigh_view = neighbors
+    cdef long long[:] out_eid_view = eids
+    with nogil:
+        for i in xrange(n_size):
+            start = indptr[nodes[i]]
+            deg = indptr[nodes[i] + 1] - start
+            rnd_offset += sample_segment(start, deg, counts[i], do_shuffle,
+                    v_view, eid_view, rnd_view, rnd_offset, neigh_view,
+                    out_eid_view, offset, perm, m)
+            offset += counts[i]
+    return neighbors, eids, counts
+
+cdef inline long long type_end(const long long[:] sorted_etype,
+        long long start,
+        long long end,
+        long long etype) nogil:
+    """Return the end of edges with type etype in sorted_etype[start:end],
+    where the types before etype have been skipped.
+
+    The end is found by galloping from start, so it costs O(log deg) of the
+    edges with type etype instead of the edges of the node.
+    """
+    cdef long long step = 1
+    cdef long long lo = start
+    cdef long long mid
+    if start == end or sorted_etype[start] > etype:
+        return start
+    # sorted_etype[lo] <= etype
+    while lo + step < end and sorted_etype[lo + step] <= etype:
+        lo += step
+        step *= 2
+    if lo + step < end:
+        end = lo + step
+    lo += 1
+    while lo < end:
+        mid = (lo + end) // 2
+        if sorted_etype[mid] <= etype:
+            lo = mid + 1
+        else:
+            end = mid
+    return lo
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def sample_typed_neighbors_flat(np.ndarray[np.int64_t, ndim=1] indptr,
+        np.ndarray[np.int64_t, ndim=1] sorted_v,
+        np.ndarray[np.int64_t, ndim=1] sorted_eid,
+        np.ndarray[np.int64_t, ndim=1] sorted_etype,
+        np.ndarray[np.int64_t, ndim=1] nodes,
+        np.ndarray[np.int64_t, ndim=1] max_degree,
+        shuffle=False):
+    """Sample neighbors of given nodes for all edge types in one pass.
+
+    The neighbors of each node in the CSR arrays are grouped by edge type,
+    i.e. sorted_etype is sorted within each node. Neighbors of each type
+    are sampled without replacement up to max_degree[type]. A negative
+    max_degree returns all neighbors of the type and zero skips the type.
+
+    Return:
+        A tuple of (neighbors, eids, etypes, counts) where counts has shape
+        [len(nodes), len(max_degree)], and the neighbors are stored in the
+        order of edge types and then nodes.
+    """
+    cdef long long n_size = len(nodes)
+    cdef long long n_types = len(max_degree)
+    cdef long long i, j, t, start, end, next_start, deg, k
+    cdef long long total = 0
+    cdef long long total_rnd = 0
+    cdef long long rnd_offset = 0
+    cdef bool do_shuffle = shuffle
+    cdef unordered_map[long long, long long] m
+    cdef vector[long long] perm
+    cdef np.ndarray[np.int64_t, ndim=2] counts = np.zeros([n_size, n_types], dtype=np.int64)
+    cdef np.ndarray[np.int64_t, ndim=2] starts = np.empty([n_size, n_types], dtype=np.int64)
+    cdef np.ndarray[np.int64_t, ndim=2] degrees = np.empty([n_size, n_types], dtype=np.int64)
+    cdef np.ndarray[np.int64_t, ndim=1] offsets = np.zeros([n_types + 1], dtype=np.int64)
+    cdef const long long[:] etype_view = sorted_etype
+
+    with nogil:
+        for i in xrange(n_size):
+            start = indptr[nodes[i]]
+            end = indptr[nodes[i] + 1]
+            for t in xrange(n_types):
+                if start == end:
+                    break
+                next_start = type_end(etype_view, start, end, t)
+                deg = next_start - start
+                if deg > 0 and max_degree[t] != 0:
+                    starts[i, t] = start
+                    degrees[i, t] = deg
+                    if max_degree[t] > 0 and deg > max_degree[t]:
+                        counts[i, t] = max_degree[t]
+                        total_rnd += max_degree[t]
+                    else:
+                        counts[i, t] = deg
+                        if do_shuffle:
+                            total_rnd += deg
+                    offsets[t + 1] += counts[i, t]
+                start = next_start
+        for t in xrange(n_types):
+            offsets[t + 1] += offsets[t]
+    total = offsets[n_types]
+
+    cdef np.ndarray[np.int64_t, ndim=1] neighbors = np.zeros([total], dtype=np.int64)
+    cdef np.ndarray[np.int64_t, ndim=1] eids = np.zeros([total], dtype=np.int64)
+    cdef np.ndarray[np.int64_t, ndim=1] etypes = np.zeros([total], dtype=np.int64)
+    cdef np.ndarray[np.int64_t, ndim=1] rnd = np.random.randint(0,  np.iinfo(np.int64).max,
+                                                              dtype=np.int64, size=total_rnd)
+    cdef const long long[:] v_view = sorted_v
+    cdef const long long[:] eid_view = sorted_eid
+    cdef const long long[:] rnd_view = rnd
+    cdef long long[:] neigh_view = neighbors
+    cdef long long[:] out_eid_view = eids
+    with nogil:
+        for t in xrange(n_types):
+            for j in xrange(offsets[t], offsets[t + 1]):
+                etypes[j] = t
+        for i in xrange(n_size):
+            for t in xrange(n_types):
+                k = counts[i, t]
+                if k == 0:
+                    continue
+                rnd_offset += sample_segment(starts[i, t], degrees[i, t], k,
+                        do_shuffle, v_view, eid_view, rnd_view, rnd_offset,
+                        neigh_view, out_eid_view, offsets[t], perm, m)
+                offsets[t] += k
+    return neighbors, eids, etypes, counts
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def build_alias_table_by_segment(np.ndarray[np.int64_t, ndim=1] indptr,
+        np.ndarray[np.float64_t, ndim=1] weights):
+    """Build alias tables for each segment of indptr.
+
+    Args:
+        indptr: The indptr of the segments.
+        weights: The non-negative weights aligned to the segments.
+
+    Return:
+        A tuple of (alias_prob, alias_event), where alias_event stores the
+        offset of the alias inside its segment. The alias_prob of segments
+        with zero total weight are -1, so they have nothing to sample, and
+        entries with zero weight are never drawn.
+    """
+    cdef long long n_size = len(indptr) - 1
+    cdef long long i, j, s, deg, s_i, l_i, first
+    cdef double total
+    cdef vector[long long] smaller, larger
+    cdef np.ndarray[np.float32_t, ndim=1] alias_prob = np.ones([len(weights)], dtype=np.float32)
+    cdef np.ndarray[np.int64_t, ndim=1] alias_event = np.zeros([len(weights)], dtype=np.int64)
+    cdef vector[double] prob
+    with nogil:
+        for i in xrange(n_size):
+            s = indptr[i]
+            deg = indptr[i + 1] - s
+            total = 0
+            first = -1
+            for j in xrange(deg):
+                alias_event[s + j] = j
+                total += weights[s + j]
+                if first < 0 and weights[s + j] > 0:
+                    first = j
+            if total <= 0:
+                for j in xrange(deg):
+                    alias_prob[s + j] = -1
+                continue
+            if deg == 1:
+                continue
+            prob.resize(deg)
+            smaller.clear()
+            larger.clear()
+            for j in xrange(deg):
+                prob[j] = weights[s + j] * deg / total
+                if prob[j] < 1:
+                    smaller.push_back(j)
+                else:
+                    larger.push_back(j)
+            while smaller.size() > 0 and larger.size() > 0:
+                s_i = smaller.back()
+                smaller.pop_back()
+                l_i = larger.back()
+                alias_prob[s + s_i] = prob[s_i]
+                alias_event[s + s_i] = l_i
+                prob[l_i] -= 1 - prob[s_i]
+                if prob[l_i] < 1:
+                    larger.pop_back()
+                    smaller.push_back(l_i)
+            # the entries left by rounding errors keep alias_prob 1, except
+            # the ones with zero weight
+            for j in xrange(smaller.size()):
+                if weights[s + smaller[j]] <= 0:
+                    alias_prob[s + smaller[j]] = 0
+                    alias_event[s + smaller[j]] = first
+    return alias_prob, alias_event
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def sample_neighbors_alias(np.ndarray[np.int64_t, ndim=1] indptr,
+        np.ndarray[np.int64_t, ndim=1] sorted_v,
+        np.ndarray[np.int64_t, ndim=1] sorted_eid,
+        np.ndarray[np.float32_t, ndim=1] alias_prob,
+        np.ndarray[np.int64_t, ndim=1] alias_event,
+        np.ndarray[np.int64_t, ndim=1] nodes,
+        long long max_degree):
+    """Weighted sample neighbors of given nodes with alias tables.
+
+    Every node draws max_degree neighbors with replacement from its alias
+    table, or as many as its degree if :code:`max_degree < 0`. Neighbors
+    with zero weight are never drawn, and nodes whose neighbors all have
+    zero weight get no neighbors.
+
+    Return:
+        A tuple of (neighbors, eids, counts) in flat numpy.ndarray.
+    """
+    cdef long long n_size = len(nodes)
+    cdef long long i, t, j, start, deg, k
+    cdef long long total = 0
+    cdef long long total_rnd = 0
+    cdef long long offset = 0
+    cdef long long rnd_offset = 0
+    cdef np.ndarray[np.int64_t, ndim=1] counts = np.zeros([n_size], dtype=np.int64)
+
+    with nogil:
+        for i in xrange(n_size):
+            start = indptr[nodes[i]]
+            deg = indptr[nodes[i] + 1] - start
+            if deg == 0 or alias_prob[start] < 0:
+                counts[i] = 0
+            elif max_degree >= 0:
+                counts[i] = max_degree
+            else:
+                counts[i] = deg
+            total += counts[i]
+        total_rnd = total
+
+    cdef np.ndarray[np.int64_t, ndim=1] neighbors = np.zeros([total], dtype=np.int64)
+    cdef np.ndarray[np.int64_t, ndim=1] eids = np.zeros([total], dtype=np.int64)
+    cdef np.ndarray[np.int64_t, ndim=1] rnd = np.random.randint(0,  np.iinfo(np.int64).max,
+                                                              dtype=np.int64, size=total_rnd)
+    cdef np.ndarray[np.float32_t, ndim=1] coin = np.random.rand(total_rnd).astype(np.float32)
+    with nogil:
+        for i in xrange(n_size):
+            start = indptr[nodes[i]]
+            deg = indptr[nodes[i] + 1] - start
+            k = counts[i]
+            for t in xrange(k):
+                j = rnd[rnd_offset + t] % deg
+                if coin[rnd_offset + t] >= alias_prob[start + j]:
+                    j = alias_event[start + j]
+                neighbors[offset + t] = sorted_v[start + j]
+                eids[offset + t] = sorted_eid[start + j]
+            rnd_offset += k
+            offset += k
+    return neighbors, eids, counts
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def reindex_neighbors(np.ndarray[np.int64_t, ndim=1] nodes,
+        np.ndarray[np.int64_t, ndim=1] neighbors):
+    """Relabel neighbors with a hash map.
+
+    The output nodes start with the given nodes, followed by the neighbors
+    that are not in nodes in the order of their first appearance.
+
+    Return:
+        A tuple of (reindex_neighbors, out_nodes).
+    """
+    cdef long long n_size = len(nodes)
+    cdef long long h = len(neighbors)
+    cdef long long i, j
+    cdef long long size = n_size
+    cdef unordered_map[long long, long long] m
+    cdef np.ndarray[np.int64_t, ndim=1] reindex = np.zeros([h], dtype=np.int64)
+    cdef np.ndarray[np.int64_t, ndim=1] out_nodes = np.zeros([n_size + h], dtype=np.int64)
+    with nogil:
+        m.reserve(n_size + h)
+        for i in xrange(n_size):
+            out_nodes[i] = nodes[i]
+            if m.find(nodes[i]) == m.end():
+                m[nodes[i]] = i
+        for i in xrange(h):
+            j = neighbors[i]
+            if m.find(j) == m.end():
+                m[j] = size
+                out_nodes[size] = j
+                size += 1
+            reindex[i] = m[j]
+    return reindex, out_nodes[:size]
+
+cdef inline unsigned long long splitmix64(unsigned long long *state) nogil:
+    """Splitmix64 random generator with the state in place.
+    """
+    cdef unsigned long long z
+    state[0] += <unsigned long long>0x9E3779B97F4A7C15
+    z = state[0]
+    z = (z ^ (z >> 30)) * <unsigned long long>0xBF58476D1CE4E5B9
+    z = (z ^ (z >> 27)) * <unsigned long long>0x94D049BB133111EB
+    return z ^ (z >> 31)
+
+
+cdef inline double splitmix64_uniform(unsigned long long *state) nogil:
+    """Uniform random number in [0, 1).
+    """
+    return (splitmix64(state) >> 11) * (1.0 / 9007199254740992.0)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def sort_by_segment(np.ndarray[np.int64_t, ndim=1] indptr,
+        np.ndarray[np.int64_t, ndim=1] values):
+    """Return a copy of values sorted within each segment of indptr.
+    """
+    cdef long long n_size = len(indptr) - 1
+    cdef long long i
+    cdef np.ndarray[np.int64_t, ndim=1] output = np.array(values, dtype=np.int64)
+    cdef long long *ptr = <long long *> output.data
+    with nogil:
+        for i in xrange(n_size):
+            if indptr[i + 1] - indptr[i] > 1:
+                stdsort(ptr + indptr[i], ptr + indptr[i + 1])
+    return output
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def coalesce_by_segment(np.ndarray[np.int64_t, ndim=1] indptr,
+        np.ndarray[np.int64_t, ndim=1] sorted_v,
+        np.ndarray[np.int64_t, ndim=1] sorted_eid):
+    """Sort (v, eid) within each segment of indptr and mark duplicated v.
+
+    Return:
+        A tuple of (sorted_v, sorted_eid, is_first) where is_first is True
+        for the first (smallest eid) of the same v in each segment.
+    """
+    cdef long long n_size = len(indptr) - 1
+    cdef long long i, j, start, deg
+    cdef np.ndarray[np.int64_t, ndim=1] out_v = np.array(sorted_v, dtype=np.int64)
+    cdef np.ndarray[np.int64_t, ndim=1] out_eid = np.array(sorted_eid, dtype=np.int64)
+    cdef np.ndarray[np.uint8_t, ndim=1] is_first = np.ones([len(sorted_v)], dtype=np.uint8)
+    cdef vector[int64_pair_t] buf
+    with nogil:
+        for i in xrange(n_size):
+            start = indptr[i]
+            deg = indptr[i + 1] - start
+            if deg <= 1:
+                continue
+            buf.resize(deg)
+            for j in xrange(deg):
+                buf[j].first = out_v[start + j]
+                buf[j].second = out_eid[start + j]
+            stdsort(buf.begin(), buf.end())
+            for j in xrange(deg):
+                out_v[start + j] = buf[j].first
+                out_eid[start + j] = buf[j].second
+                if j > 0 and buf[j].first == buf[j - 1].first:
+                    is_first[start + j] = 0
+    return out_v, out_eid, is_first.view(np.bool_)
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def random_walk_batch(np.ndarray[np.int64_t, ndim=1] indptr,
+        np.ndarray[np.int64_t, ndim=1] sorted_v,
+        np.ndarray[np.int64_t, ndim=1] nodes,
+        np.ndarray[np.int64_t, ndim=2] walks,
+        long long start,
+        long long end,
+        double p=1.0,
+        double q=1.0,
+        unsigned long long seed=0):
+    """Advance walkers nodes[start:end] over CSR arrays and write walks in place.
+
+    The walks of nodes[i] are written into walks[i] and stop early at nodes
+    without successors, leaving the rest unchanged. If p or q is not 1.0,
+    node2vec biased walks are sampled by rejection, which requires the
+    sorted_v to be sorted within each segment for binary search.
+
+    Each walker has its own random state derived from seed and its index,
+    so the result does not depend on how walkers are split into batches.
+    """
+    cdef long long walk_len = walks.shape[1]
+    cdef long long i, t, cur, prev, deg, nxt, lo, hi, mid
+    cdef unsigned long long state
+    cdef bool biased = p != 1.0 or q != 1.0
+    cdef double w_ret = 1.0 / p
+    cdef double w_out = 1.0 / q
+    cdef double w_max = 1.0
+    cdef double w
+    if w_ret > w_max:
+        w_max = w_ret
+    if w_out > w_max:
+        w_max = w_out
+
+    with nogil:
+        for i in xrange(start, end):
+            state = seed + <unsigned long long>i * <unsigned long long>0xD1B54A32D192ED03
+            cur = nodes[i]
+            prev = -1
+            walks[i, 0] = cur
+            for t in xrange(1, walk_len):
+                deg = indptr[cur + 1] - indptr[cur]
+                if deg == 0:
+                    break
+                while True:
+                    nxt = sorted_v[indptr[cur] + <long long>(splitmix64(&state) % <unsigned long long>deg)]
+                    if not biased or prev < 0:
+                        break
+                    if nxt == prev:
+                        w = w_ret
+                    else:
+                        w = w_out
+                        lo = indptr[prev]
+                        hi = indptr[prev + 1]
+                        while lo < hi:
+                            mid = (lo + hi) >> 1
+                            if sorted_v[mid] < nxt:
+                                lo = mid + 1
+                            else:
+                                hi = mid
+                        if lo < indptr[prev + 1] and sorted_v[lo] == nxt:
+                            w = 1.0
+                    if splitmix64_uniform(&state) * w_max < w:
+                        break
+                walks[i, t] = nxt
+                prev = cur
+                cur = nxt
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def metapath_walk_step(np.ndarray[np.int64_t, ndim=1] indptr,
+        np.ndarray[np.int64_t, ndim=1] sorted_v,
+        np.ndarray[np.int64_t, ndim=2] walks,
+        np.ndarray[np.int64_t, ndim=1] lengths,
+        long long step,
+        np.ndarray[np.float32_t, ndim=1] alias_prob=None,
+        np.ndarray[np.int64_t, ndim=1] alias_event=None,
+        unsigned long long seed=0):
+    """Advance the walkers with lengths[i] == step by one edge of a CSR.
+
+    walks[i, step] is sampled from the successors of walks[i, step - 1],
+    uniformly or from the alias tables if alias_prob is given, and
+    lengths[i] is increased by one. Walkers at nodes without successors
+    (or without successors of positive weight) are left unchanged. The random state depends only on seed, the walker
+    and the step.
+
+    Return:
+        The number of advanced walkers.
+    """
+    cdef long long n_size = walks.shape[0]
+    cdef bool weighted = alias_prob is not None
+    cdef long long i, cur, start, deg, j
+    cdef long long advanced = 0
+    cdef unsigned long long state
+    cdef const float[:] prob_view
+    cdef const long long[:] event_view
+    if weighted:
+        prob_view = alias_prob
+        event_view = alias_event
+    else:
+        prob_view = np.ones([0], dtype=np.float32)
+        event_view = np.zeros([0], dtype=np.int64)
+
+    with nogil:
+        for i in xrange(n_size):
+            if lengths[i] != step:
+                continue
+            cur = walks[i, step - 1]
+            start = indptr[cur]
+            deg = indptr[cur + 1] - start
+            if deg == 0 or (weighted and prob_view[start] < 0):
+                continue
+            state = seed + <unsigned long long>i * <unsigned long long>0xD1B54A32D192ED03 \
+                    + <unsigned long long>step * <unsigned long long>0x8CB92BA72F3D8DD7
+            j = <long long>(splitmix64(&state) % <unsigned long long>deg)
+            if weighted and splitmix64_uniform(&state) >= prob_view[start + j]:
+                j = event_view[start + j]
+            walks[i, step] = sorted_v[start + j]
+            lengths[i] += 1
+            advanced += 1
+    return advanced
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def csr_send_u_recv(np.ndarray[np.int64_t, ndim=1] indptr,
+        np.ndarray[np.int64_t, ndim=1] sorted_v,
+        np.ndarray[cython.floating, ndim=2] feature,
+        np.ndarray[cython.floating, ndim=2] output,
+        long long start,
+        long long end,
+        int reduce_op):
+    """Aggregate feature rows of sorted_v into output rows [start, end).
+
+    For each row i, the rows feature[sorted_v[indptr[i]:indptr[i + 1]]] are
+    reduced directly into output[i] without materializing the messages.
+    reduce_op is 0 for sum, 1 for mean, 2 for max and 3 for min. Rows
+    without neighbors are left unchanged.
+    """
+    cdef long long dim = feature.shape[1]
+    cdef long long i, j, k, src, deg
+    cdef cython.floating *out_ptr
+    cdef cython.floating *in_ptr
+    cdef cython.floating scale
+
+    with nogil:
+        for i in xrange(start, end):
+            deg = indptr[i + 1] - indptr[i]
+            if deg == 0:
+                continue
+            out_ptr = &output[i, 0]
+            src = sorted_v[indptr[i]]
+            in_ptr = &feature[src, 0]
+            for k in xrange(dim):
+                out_ptr[k] = in_ptr[k]
+            for j in xrange(indptr[i] + 1, indptr[i + 1]):
+                src = sorted_v[j]
+                in_ptr = &feature[src, 0]
+                if reduce_op <= 1:
+                    for k in xrange(dim):
+                        out_ptr[k] += in_ptr[k]
+                elif reduce_op == 2:
+                    for k in xrange(dim):
+                        out_ptr[k] = in_ptr[k] if in_ptr[k] > out_ptr[k] else out_ptr[k]
+                else:
+                    for k in xrange(dim):
+                        out_ptr[k] = in_ptr[k] if in_ptr[k] < out_ptr[k] else out_ptr[k]
+            if reduce_op == 1 and deg > 1:
+                scale = 1.0 / deg
+                for k in xrange(dim):
+                    out_ptr[k] *= scale
+
+cdef extern from *:
+    """
+    #include <string.h>
+
+    static inline float pgl_half_to_float(unsigned short h) {
+        unsigned int sign = ((unsigned int)h & 0x8000u) << 16;
+        unsigned int exp = (h >> 10) & 0x1fu;
+        unsigned int mant = h & 0x3ffu;
+        unsigned int bits;
+        float f;
+        if (exp == 0) {
+            if (mant == 0) {
+                bits = sign;
+            } else {
+                exp = 127 - 15 + 1;
+                while ((mant & 0x400u) == 0) {
+                    mant <<= 1;
+                    exp--;
+                }
+                bits = sign | (exp << 23) | ((mant & 0x3ffu) << 13);
+            }
+        } else if (exp == 0x1f) {
+            bits = sign | 0x7f800000u | (mant << 13);
+        } else {
+            bits = sign | ((exp + 127 - 15) << 23) | (mant << 13);
+        }
+        memcpy(&f, &bits, sizeof(f));
+        return f;
+    }
+
+    static inline unsigned short pgl_float_to_half(float f) {
+        unsigned int x, sign, mant, rem, half, shift;
+        int exp;
+        memcpy(&x, &f, sizeof(x));
+        sign = (x >> 16) & 0x8000u;
+        mant = x & 0x7fffffu;
+        if (((x >> 23) & 0xffu) == 0xffu) {
+            return (unsigned short)(sign | 0x7c00u | (mant ? 0x200u : 0u));
+        }
+        exp = (int)((x >> 23) & 0xffu) - 127 + 15;
+        if (exp >= 0x1f) {
+            return (unsigned short)(sign | 0x7c00u);
+        }
+        if (exp <= 0) {
+            if (exp < -10) {
+                return (unsigned short)sign;
+            }
+            mant |= 0x800000u;
+            shift = (unsigned int)(14 - exp);
+            half = mant >> shift;
+            rem = mant & ((1u << shift) - 1u);
+            if (rem > (1u << (shift - 1u)) ||
+                    (rem == (1u << (shift - 1u)) && (half & 1u))) {
+                half++;
+            }
+            return (unsigned short)(sign | half);
+        }
+        half = sign | ((unsigned int)exp << 10) | (mant >> 13);
+        rem = mant & 0x1fffu;
+        /* a carry into the exponent rounds up to the next binade or inf */
+        if (rem > 0x1000u || (rem == 0x1000u && (half & 1u))) {
+            half++;
+        }
+        return (unsigned short)half;
+    }
+    """
+    float half_to_float "pgl_half_to_float"(unsigned short h) nogil
+    unsigned short float_to_half "pgl_float_to_half"(float f) nogil
+
+ctypedef fused propagate_t:
+    float
+    double
+    # the bits of float16
+    unsigned short
+
+cdef inline double load_value(propagate_t value) noexcept nogil:
+    if propagate_t is cython.ushort:
+        return half_to_float(value)
+    else:
+        return value
+
+cdef inline propagate_t store_value(double value, propagate_t like) noexcept nogil:
+    if propagate_t is cython.ushort:
+        return float_to_half(<float>value)
+    else:
+        return <propagate_t>value
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def csr_propagate(np.ndarray[np.int64_t, ndim=1] indptr,
+        np.ndarray[np.int64_t, ndim=1] sorted_v,
+        np.ndarray[propagate_t, ndim=2] feature,
+        np.ndarray[propagate_t, ndim=2] output,
+        np.ndarray[propagate_t, ndim=2] init,
+        np.ndarray[np.float32_t, ndim=1] src_norm,
+        np.ndarray[np.float32_t, ndim=1] dst_norm,
+        np.ndarray[np.int64_t, ndim=1] rows,
+        long long start,
+        long long end,
+        double self_weight=0,
+        double alpha=0,
+        int post_op=0,
+        double lower=0,
+        double upper=1):
+    """Run one propagation step for the rows rows[start:end].
+
+    For each row i, it computes
+
+        h = dst_norm[i] * (self_weight * src_norm[i] * feature[i]
+                           + sum_j src_norm[j] * feature[j])
+        output[i] = (1 - alpha) * h + alpha * init[i]
+
+    where j is in sorted_v[indptr[i]:indptr[i + 1]]. An empty rows array
+    means the rows [start, end), and an empty norm array means a norm of
+    1. post_op is 0 for nothing, 1 for normalizing the row to sum 1 (rows
+    with a non-positive sum are kept) and 2 for clipping the row into
+    [lower, upper]. float16 arrays are passed as uint16 views and
+    accumulated in double. Callers working on disjoint rows can run in
+    parallel threads.
+
+    Return the max absolute change between the output and feature rows.
+    """
+    cdef long long dim = feature.shape[1]
+    cdef long long p, i, j, k, src
+    cdef bool use_rows = rows.shape[0] > 0
+    cdef bool use_src = src_norm.shape[0] > 0
+    cdef bool use_dst = dst_norm.shape[0] > 0
+    cdef double scale, row_sum, value, diff
+    cdef double max_diff = 0
+    cdef propagate_t *in_ptr
+    cdef propagate_t *out_ptr
+    cdef propagate_t *init_ptr
+    cdef vector[double] acc
+    acc.resize(dim)
+
+    with nogil:
+        for p in xrange(start, end):
+            i = rows[p] if use_rows else p
+            for k in xrange(dim):
+                acc[k] = 0
+            if self_weight != 0:
+                scale = self_weight
+                if use_src:
+                    scale = scale * src_norm[i]
+                in_ptr = &feature[i, 0]
+                for k in xrange(dim):
+                    acc[k] += scale * load_value(in_ptr[k])
+            for j in xrange(indptr[i], indptr[i + 1]):
+                src = sorted_v[j]
+                in_ptr = &feature[src, 0]
+                if use_src:
+                    scale = src_norm[src]
+                    for k in xrange(dim):
+                        acc[k] += scale * load_value(in_ptr[k])
+                else:
+                    for k in xrange(dim):
+                        acc[k] += load_value(in_ptr[k])
+
+            scale = 1 - alpha
+            if use_dst:
+                scale = scale * dst_norm[i]
+            for k in xrange(dim):
+                acc[k] *= scale
+            if alpha != 0:
+                init_ptr = &init[i, 0]
+                for k in xrange(dim):
+                    acc[k] += alpha * load_value(init_ptr[k])
+
+            if post_op == 1:
+                row_sum = 0
+                for k in xrange(dim):
+                    row_sum += acc[k]
+                if row_sum > 0:
+                    for k in xrange(dim):
+                        acc[k] /= row_sum
+            elif post_op == 2:
+                for k in xrange(dim):
+                    if acc[k] < lower:
+                        acc[k] = lower
+                    elif acc[k] > upper:
+                        acc[k] = upper
+
+            in_ptr = &feature[i, 0]
+            out_ptr = &output[i, 0]
+            for k in xrange(dim):
+                value = load_value(in_ptr[k])
+                diff = acc[k] - value if acc[k] > value else value - acc[k]
+                if diff > max_diff:
+                    max_diff = diff
+                out_ptr[k] = store_value(acc[k], out_ptr[k])
+    return max_diff
+
 @cython.boundscheck(False)
 @cython.wraparound(False)
 def skip_gram_gen_pair(vector[long long] walk, long win_size=5):
@@ -363,6 +1240,271 @@ def skip_gram_gen_pair(vector[long long] walk, long win_size=5):
                 dst.push_back(walk[j])
     return src, dst
 
+cdef inline long long skip_gram_walk(const long long[:, :] walks,
+        long long i,
+        long long win_size,
+        const double[:] keep_prob,
+        bool subsample,
+        unsigned long long seed,
+        vector[long long] &buf,
+        long long[:] src,
+        long long[:] pos,
+        long long offset,
+        bool fill) nogil:
+    """Generate the skip-gram pairs of walks[i] from its own random state.
+
+    The pairs are written from offset if fill is True, otherwise they are
+    only counted. Both passes draw the same random numbers.
+    """
+    cdef unsigned long long state = seed + <unsigned long long>i * <unsigned long long>0xD1B54A32D192ED03
+    cdef long long walk_len = walks.shape[1]
+    cdef long long t, j, l, left, right, real_win_size, v
+    cdef long long count = 0
+    buf.clear()
+    for t in xrange(walk_len):
+        v = walks[i, t]
+        if v < 0:
+            break
+        if subsample and splitmix64_uniform(&state) >= keep_prob[v]:
+            continue
+        buf.push_back(v)
+    l = buf.size()
+    for t in xrange(l):
+        real_win_size = 1 + <long long>(splitmix64(&state) % <unsigned long long>win_size)
+        left = t - real_win_size
+        if left < 0:
+            left = 0
+        right = t + real_win_size
+        if right >= l:
+            right = l - 1
+        for j in xrange(left, right + 1):
+            if buf[t] == buf[j]:
+                continue
+            if fill:
+                src[offset + count] = buf[t]
+                pos[offset + count] = buf[j]
+            count += 1
+    return count
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def skip_gram_gen_pair_batch(np.ndarray[np.int64_t, ndim=2] walks,
+        long long win_size=5,
+        np.ndarray[np.float64_t, ndim=1] keep_prob=None,
+        unsigned long long seed=0):
+    """Generate skip-gram pairs of a padded walk matrix.
+
+    Each walk ends at its first negative entry. If keep_prob is given,
+    node v is kept with probability keep_prob[v] before the windows are
+    taken. For each kept node, the window size is drawn uniformly from
+    [1, win_size] and pairs of the same node are skipped, as
+    skip_gram_gen_pair does.
+
+    Return:
+        A tuple of (src, pos) in flat numpy.ndarray.
+    """
+    cdef long long n_size = walks.shape[0]
+    cdef long long i, total = 0
+    cdef bool subsample = keep_prob is not None
+    cdef const long long[:, :] walks_view = walks
+    cdef const double[:] keep_view
+    cdef vector[long long] buf
+    cdef np.ndarray[np.int64_t, ndim=1] offsets = np.zeros([n_size], dtype=np.int64)
+    cdef long long[:] empty = np.zeros([0], dtype=np.int64)
+    if subsample:
+        keep_view = keep_prob
+    else:
+        keep_view = np.ones([0], dtype=np.float64)
+
+    if win_size <= 0:
+        return np.zeros([0], dtype=np.int64), np.zeros([0], dtype=np.int64)
+
+    with nogil:
+        for i in xrange(n_size):
+            offsets[i] = total
+            total += skip_gram_walk(walks_view, i, win_size, keep_view,
+                        subsample, seed, buf, empty, empty, 0, False)
+
+    cdef np.ndarray[np.int64_t, ndim=1] src = np.zeros([total], dtype=np.int64)
+    cdef np.ndarray[np.int64_t, ndim=1] pos = np.zeros([total], dtype=np.int64)
+    cdef long long[:] src_view = src
+    cdef long long[:] pos_view = pos
+    with nogil:
+        for i in xrange(n_size):
+            skip_gram_walk(walks_view, i, win_size, keep_view, subsample,
+                    seed, buf, src_view, pos_view, offsets[i], True)
+    return src, pos
+
+cdef inline int parse_int64(const unsigned char *s, long long size,
+                            long long *out) noexcept nogil:
+    """Parse a signed decimal integer with optional spaces around it.
+
+    Return 1 if parsed, 0 if it is not an integer and -1 if it overflows int64.
+    """
+    cdef long long i = 0
+    cdef unsigned long long value = 0
+    cdef unsigned long long limit = <unsigned long long>9223372036854775807
+    cdef unsigned long long digit
+    cdef bool negative = False
+    cdef bool has_digit = False
+    cdef bool overflow = False
+    while i < size and s[i] == c' ':
+        i += 1
+    if i < size and (s[i] == c'-' or s[i] == c'+'):
+        negative = s[i] == c'-'
+        i += 1
+    if negative:
+        limit += 1
+    while i < size and s[i] >= c'0' and s[i] <= c'9':
+        digit = s[i] - c'0'
+        if value > (limit - digit) // 10:
+            overflow = True
+        else:
+            value = value * 10 + digit
+        has_digit = True
+        i += 1
+    while i < size and s[i] == c' ':
+        i += 1
+    if not has_digit or i != size:
+        return 0
+    if overflow:
+        return -1
+    out[0] = <long long>(0 - value) if negative else <long long>value
+    return 1
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef inline unsigned long long pack_slot_key(const unsigned char *s,
+                                             long long size) noexcept nogil:
+    """Pack a key of at most 7 bytes with its length into an integer.
+    """
+    cdef unsigned long long key = <unsigned long long>size << 56
+    cdef long long i
+    for i in xrange(size):
+        key |= <unsigned long long>s[i] << (8 * i)
+    return key
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void parse_slot_lines(const unsigned char *data,
+        long long size,
+        unordered_map[unsigned long long, long long] &short_keys,
+        vector[string] &slot_keys,
+        long long[:, :] counts,
+        vector[long long*] &values,
+        vector[long long] &offsets,
+        bool fill,
+        long long *overflow_row) noexcept nogil:
+    """Count (or fill if fill is True) slot values of each line of data.
+
+    The first row with a value out of int64 is kept in overflow_row.
+    """
+    cdef long long i = 0
+    cdef long long row = 0
+    cdef long long start, colon, value, k_start, k_end
+    cdef int status
+    cdef long long slot, s, key_size
+    cdef long long num_slots = slot_keys.size()
+    cdef unordered_map[unsigned long long, long long].iterator it
+    while i <= size:
+        start = i
+        colon = -1
+        while i < size and data[i] != c',' and data[i] != c'\n':
+            if data[i] == c':' and colon < 0:
+                colon = i
+            i += 1
+        if colon >= 0:
+            k_start = start
+            k_end = colon
+            while k_start < k_end and data[k_start] == c' ':
+                k_start += 1
+            while k_end > k_start and data[k_end - 1] == c' ':
+                k_end -= 1
+            key_size = k_end - k_start
+            slot = -1
+            if key_size <= 7:
+                it = short_keys.find(pack_slot_key(data + k_start, key_size))
+                if it != short_keys.end():
+                    slot = deref(it).second
+            else:
+                for s in xrange(num_slots):
+                    if <long long>slot_keys[s].size() == key_size and memcmp(
+                            slot_keys[s].data(), data + k_start, key_size) == 0:
+                        slot = s
+                        break
+            status = 0
+            if slot >= 0:
+                status = parse_int64(data + colon + 1, i - colon - 1, &value)
+            if status < 0 and overflow_row[0] < 0:
+                overflow_row[0] = row
+            if status > 0:
+                if fill:
+                    values[slot][offsets[slot]] = value
+                    offsets[slot] += 1
+                else:
+                    counts[row, slot] += 1
+        if i < size and data[i] == c'\n':
+            row += 1
+        i += 1
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def parse_slot_feature(bytes data, long long num_rows, list slots):
+    """Parse slot features into CSR arrays of each slot.
+
+    data holds num_rows lines separated by newlines. Each line is a comma
+    separated list of "slot:value" with int64 values. Unknown slots and
+    values that are not integers are skipped, and values out of the range
+    of int64 raise OverflowError.
+
+    Return:
+        A list of (indptr, values) for each slot in slots.
+    """
+    cdef long long num_slots = len(slots)
+    cdef long long s
+    cdef vector[string] slot_keys
+    cdef unordered_map[unsigned long long, long long] short_keys
+    cdef vector[long long*] values_ptr
+    cdef vector[long long] offsets
+    cdef const unsigned char *buf = data
+    cdef long long size = len(data)
+    cdef np.ndarray[np.int64_t, ndim=2] counts = np.zeros(
+            [num_rows + 1, num_slots], dtype=np.int64)
+    cdef long long[:, :] counts_view = counts
+    cdef long long overflow_row = -1
+
+    for s in xrange(num_slots):
+        slot_keys.push_back(str(slots[s]).encode("utf-8"))
+        if slot_keys[s].size() <= 7:
+            short_keys[pack_slot_key(
+                <const unsigned char*>slot_keys[s].data(),
+                slot_keys[s].size())] = s
+
+    with nogil:
+        parse_slot_lines(buf, size, short_keys, slot_keys, counts_view, values_ptr,
+                         offsets, False, &overflow_row)
+    if overflow_row >= 0:
+        raise OverflowError("The slot value of line %s is out of int64." %
+                            overflow_row)
+
+    outputs = []
+    cdef np.ndarray[np.int64_t, ndim=1] slot_values
+    for s in xrange(num_slots):
+        indptr = np.zeros([num_rows + 1], dtype=np.int64)
+        np.cumsum(counts[:num_rows, s], out=indptr[1:])
+        slot_values = np.zeros([indptr[num_rows]], dtype=np.int64)
+        values_ptr.push_back(<long long*> slot_values.data)
+        offsets.push_back(0)
+        outputs.append((indptr, slot_values))
+
+    with nogil:
+        parse_slot_lines(buf, size, short_keys, slot_keys, counts_view, values_ptr,
+                         offsets, True, &overflow_row)
+    return outputs
+
 @cython.boundscheck(False)
 @cython.wraparound(False)
 def alias_sample_build_table(np.ndarray[np.float64_t, ndim=1] probs):
@@ -397,40 +1539,46 @@ def extract_edges_from_nodes(
     np.ndarray[np.int64_t, ndim=1] adj_indptr,
     np.ndarray[np.int64_t, ndim=1] sorted_v,
     np.ndarray[np.int64_t, ndim=1] sorted_eid,
-    vector[long long] sampled_nodes,
+    sampled_nodes,
+    np.ndarray[np.int64_t, ndim=1] node_index=None,
 ):
     """
     Extract all eids of given sampled_nodes for the origin graph.
     ret_edge_index: edge ids between sampled_nodes.
 
+    If node_index is given, it should be an array of num_nodes where
+    node_index[v] >= 0 if and only if v is in sampled_nodes, and it is
+    used instead of allocating a mark array of num_nodes on each call.
+
     Refers: https://github.com/GraphSAINT/GraphSAINT
     """
+    cdef np.ndarray[np.int64_t, ndim=1] nodes = np.asarray(sampled_nodes, dtype=np.int64).reshape([-1])
     cdef long long i, v, j
     cdef long long num_v_orig, num_v_sub
     cdef long long start_neigh, end_neigh
-    cdef vector[int] _arr_bit
-    cdef vector[long long] ret_edge_index
+    cdef long long total = 0
+    cdef long long offset = 0
     num_v_orig = adj_indptr.size-1
-    _arr_bit = vector[int](num_v_orig,-1)
-    num_v_sub = sampled_nodes.size()
-    i = 0
+    num_v_sub = nodes.size
+    if node_index is None:
+        node_index = np.full([num_v_orig], -1, dtype=np.int64)
+        node_index[nodes] = np.arange(num_v_sub, dtype=np.int64)
+    with nogil:
+        for i in xrange(num_v_sub):
+            v = nodes[i]
+            for j in xrange(adj_indptr[v], adj_indptr[v + 1]):
+                if node_index[sorted_v[j]] > -1:
+                    total += 1
+    cdef np.ndarray[np.int64_t, ndim=1] ret_edge_index = np.zeros([total], dtype=np.int64)
     with nogil:
-        while i < num_v_sub:
-            _arr_bit[sampled_nodes[i]] = i
-            i = i + 1
-        i = 0
-        while i < num_v_sub:
-            v = sampled_nodes[i]
-            start_neigh = adj_indptr[v]
-            end_neigh = adj_indptr[v+1]
-            j = start_neigh
-            while j < end_neigh:
-                if _arr_bit[sorted_v[j]] > -1:
-                    ret_edge_index.push_back(sorted_eid[j])
-                j = j + 1
-            i = i + 1
+        for i in xrange(num_v_sub):
+            v = nodes[i]
+            for j in xrange(adj_indptr[v], adj_indptr[v + 1]):
+                if node_index[sorted_v[j]] > -1:
+                    ret_edge_index[offset] = sorted_eid[j]
+                    offset += 1
     return ret_edge_index
-   
+
 @cython.boundscheck(False)
 @cython.wraparound(False)
 def metis_partition(
@@ -472,3 +1620,100 @@ def metis_partition(
     return part
     
 
+cdef inline double partition_score(long long count,
+        long long size,
+        long long capacity,
+        double alpha,
+        double gamma,
+        int method) nogil:
+    """Score of placing a node with count neighbors into a part of size.
+    method 0 is LDG and method 1 is Fennel.
+    """
+    if method == 0:
+        return count * (1.0 - <double>size / capacity)
+    return count - alpha * gamma * pow(<double>size, gamma - 1.0)
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def streaming_partition_chunk(np.ndarray[np.int64_t, ndim=1] out_indptr,
+        np.ndarray[np.int64_t, ndim=1] out_v,
+        np.ndarray[np.int64_t, ndim=1] in_indptr,
+        np.ndarray[np.int64_t, ndim=1] in_v,
+        long long start,
+        np.ndarray[np.int64_t, ndim=1] part_id,
+        np.ndarray[np.int64_t, ndim=1] part_size,
+        long long capacity,
+        double alpha,
+        double gamma,
+        int method):
+    """Assign a chunk of nodes to parts one by one in a streaming pass.
+
+    The successors and predecessors of node start + i are
+    out_v[out_indptr[i]:out_indptr[i + 1]] and
+    in_v[in_indptr[i]:in_indptr[i + 1]]. Each node goes to the part with
+    the best LDG (method 0) or Fennel (method 1) score over its assigned
+    neighbors, among the parts with size smaller than capacity. A node
+    that has been assigned (part_id >= 0) is moved out of its part first,
+    which restreams the node with the full assignment.
+
+    part_id and part_size are updated in place.
+    """
+    cdef long long n_size = len(out_indptr) - 1
+    cdef long long npart = len(part_size)
+    cdef long long i, j, k, u, w, p, best
+    cdef double score, best_score
+    cdef vector[long long] count
+    cdef vector[long long] touched
+    # parts ordered by (size, part) to find the least loaded part
+    cdef set[int64_pair_t] loads
+
+    count.resize(npart)
+    for p in xrange(npart):
+        count[p] = 0
+        loads.insert(int64_pair_t(part_size[p], p))
+
+    with nogil:
+        for i in xrange(n_size):
+            u = start + i
+            p = part_id[u]
+            if p >= 0:
+                loads.erase(int64_pair_t(part_size[p], p))
+                part_size[p] -= 1
+                loads.insert(int64_pair_t(part_size[p], p))
+
+            touched.clear()
+            for j in xrange(out_indptr[i], out_indptr[i + 1]):
+                w = out_v[j]
+                p = part_id[w]
+                if w == u or p < 0:
+                    continue
+                if count[p] == 0:
+                    touched.push_back(p)
+                count[p] += 1
+            for j in xrange(in_indptr[i], in_indptr[i + 1]):
+                w = in_v[j]
+                p = part_id[w]
+                if w == u or p < 0:
+                    continue
+                if count[p] == 0:
+                    touched.push_back(p)
+                count[p] += 1
+
+            best = deref(loads.begin()).second
+            best_score = partition_score(0, part_size[best], capacity, alpha,
+                                         gamma, method)
+            for k in xrange(touched.size()):
+                p = touched[k]
+                if part_size[p] < capacity:
+                    score = partition_score(count[p], part_size[p], capacity,
+                                            alpha, gamma, method)
+                    if score > best_score or (score == best_score and
+                                              part_size[p] < part_size[best]):
+                        best = p
+                        best_score = score
+                count[p] = 0
+
+            part_id[u] = best
+            loads.erase(int64_pair_t(part_size[best], best))
+            part_size[best] += 1
+            loads.insert(int64_pair_t(part_size[best], best))
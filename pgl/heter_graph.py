@@ -25,6 +25,7 @@ from collections import defaultdict
 
 from pgl.graph import Graph
 from pgl.utils import op
+from pgl.utils.edge_index import TypedEdgeIndex
 import pgl.graph_kernel as graph_kernel
 from pgl.message import Message
 
@@ -125,6 +126,8 @@ class HeterGraph(object):
 
         self._edge_types = self.edge_types_info()
         self._nodes = None
+        self._typed_src_index = None
+        self._typed_dst_index = None
 
         for etype, g in self._multi_graph.items():
             if g.is_tensor():
@@ -193,6 +196,43 @@ class HeterGraph(object):
                 self._nodes = np.arange(self.num_nodes)
         return self._nodes
 
+    @property
+    def typed_src_index(self):
+        """Return a TypedEdgeIndex of all edge types for src.
+        """
+        if self._typed_src_index is None:
+            self._typed_src_index = self._build_typed_index(src=True)
+        return self._typed_src_index
+
+    @property
+    def typed_dst_index(self):
+        """Return a TypedEdgeIndex of all edge types for dst.
+        """
+        if self._typed_dst_index is None:
+            self._typed_dst_index = self._build_typed_index(src=False)
+        return self._typed_dst_index
+
+    def _build_typed_index(self, src):
+        if self.is_tensor():
+            raise ValueError(
+                "TypedEdgeIndex needs a numpy HeterGraph, call HeterGraph.numpy() first."
+            )
+        u_list, v_list = [], []
+        for etype in self._edge_types:
+            edges = self._multi_graph[etype].edges
+            u_list.append(edges[:, 0] if src else edges[:, 1])
+            v_list.append(edges[:, 1] if src else edges[:, 0])
+        return TypedEdgeIndex.from_typed_edges(u_list, v_list, self.num_nodes)
+
+    def _typed_max_degree(self, max_degree):
+        if isinstance(max_degree, dict):
+            for etype in max_degree:
+                if etype not in self._multi_graph:
+                    raise ValueError("%s is not a valid edge type." % etype)
+            # edge types not in the dict are skipped by max_degree 0
+            return [max_degree.get(etype, 0) for etype in self._edge_types]
+        return [max_degree] * len(self._edge_types)
+
     def __getitem__(self, edge_type):
         """__getitem__
         """
@@ -220,6 +260,11 @@ class HeterGraph(object):
             A numpy.ndarray or paddle.Tensor as the given nodes' indegree.
         """
         if edge_type is None:
+            if not self.is_tensor():
+                if nodes is None:
+                    return self.typed_dst_index.degree
+                return self.typed_dst_index.degree[np.asarray(
+                    nodes, dtype="int64").reshape([-1])]
             indegrees = []
             for e_type in self._edge_types:
                 indegrees.append(self._multi_graph[e_type].indegree(nodes))
@@ -245,6 +290,11 @@ class HeterGraph(object):
             A numpy.array or paddle.Tensor as the given nodes' outdegree.
         """
         if edge_type is None:
+            if not self.is_tensor():
+                if nodes is None:
+                    return self.typed_src_index.degree
+                return self.typed_src_index.degree[np.asarray(
+                    nodes, dtype="int64").reshape([-1])]
             outdegrees = []
             for e_type in self._edge_types:
                 outdegrees.append(self._multi_graph[e_type].outdegree(nodes))
@@ -276,7 +326,9 @@ class HeterGraph(object):
                          nodes,
                          max_degree,
                          return_eids=False,
-                         shuffle=False):
+                         shuffle=False,
+                         return_flat=False,
+                         weighted=False):
         """Sample successors of given nodes with the specified edge_type.
 
         Args:
@@ -288,6 +340,16 @@ class HeterGraph(object):
 
             return_eids: Whether to return the corresponding eids.
 
+            return_flat: If True, return flat numpy.ndarray instead of a list
+                         of numpy.ndarray for each node.
+
+            weighted: If True, sample successors by edge weights with replacement
+                      from the alias tables built by
+                      :code:`EdgeIndex.build_alias_table`.
+                      Every node draws max_degree successors (or as many as its
+                      degree if max_degree < 0), and successors with zero
+                      weight are never drawn.
+
         Return:
 
             Return a list of numpy.ndarray and each numpy.ndarray represent a list
@@ -295,12 +357,16 @@ class HeterGraph(object):
             If :code:`return_eids=True`, there will be an additional list of 
             numpy.ndarray and each numpy.ndarray represent a list of eids that 
             connected nodes to their successors.
+            If :code:`return_flat=True`, return a tuple of (successors, counts),
+            or (successors, eids, counts) if :code:`return_eids=True`.
         """
         return self._multi_graph[edge_type].sample_successor(
             nodes=nodes,
             max_degree=max_degree,
             return_eids=return_eids,
-            shuffle=shuffle)
+            shuffle=shuffle,
+            return_flat=return_flat,
+            weighted=weighted)
 
     def predecessor(self, edge_type, nodes=None, return_eids=False):
         """Find predecessor of given nodes with the specified edge_type.
@@ -320,7 +386,9 @@ class HeterGraph(object):
                            nodes,
                            max_degree,
                            return_eids=False,
-                           shuffle=False):
+                           shuffle=False,
+                           return_flat=False,
+                           weighted=False):
         """Sample predecessors of given nodes with the specified edge_type.
 
         Args:
@@ -332,6 +400,16 @@ class HeterGraph(object):
 
             return_eids: Whether to return the corresponding eids.
 
+            return_flat: If True, return flat numpy.ndarray instead of a list
+                         of numpy.ndarray for each node.
+
+            weighted: If True, sample predecessors by edge weights with replacement
+                      from the alias tables built by
+                      :code:`EdgeIndex.build_alias_table`.
+                      Every node draws max_degree predecessors (or as many as its
+                      degree if max_degree < 0), and predecessors with zero
+                      weight are never drawn.
+
         Return:
 
             Return a list of numpy.ndarray and each numpy.ndarray represent a list
@@ -339,12 +417,66 @@ class HeterGraph(object):
             If :code:`return_eids=True`, there will be an additional list of 
             numpy.ndarray and each numpy.ndarray represent a list of eids that 
             connected nodes to their predecessors.
+            If :code:`return_flat=True`, return a tuple of (predecessors, counts),
+            or (predecessors, eids, counts) if :code:`return_eids=True`.
         """
         return self._multi_graph[edge_type].sample_predecessor(
             nodes=nodes,
             max_degree=max_degree,
             return_eids=return_eids,
-            shuffle=shuffle)
+            shuffle=shuffle,
+            return_flat=return_flat,
+            weighted=weighted)
+
+    def sample_typed_successor(self, nodes, max_degree, shuffle=False):
+        """Sample successors of given nodes for multiple edge types in one call.
+
+        Args:
+            nodes: Given nodes whose successors will be sampled.
+
+            max_degree: An int of the max sampled successors of each edge type
+                        for all edge types, or a dict of {edge_type: int} for
+                        the specified edge types. -1 means all successors.
+
+            shuffle: Whether to shuffle the successors of nodes with degree
+                     smaller than max_degree.
+
+        Return:
+
+            A tuple of (successors, eids, etypes, counts) in flat numpy.ndarray.
+            :code:`etypes` are the indices of edge types in :code:`edge_types`
+            and :code:`eids` are the edge ids within each edge type. The
+            :code:`counts` with shape [len(nodes), len(edge_types)] is the
+            number of sampled successors of each node and edge type, and the
+            successors are ordered by edge types and then nodes.
+        """
+        return self.typed_src_index.sample_flat(
+            nodes, self._typed_max_degree(max_degree), shuffle=shuffle)
+
+    def sample_typed_predecessor(self, nodes, max_degree, shuffle=False):
+        """Sample predecessors of given nodes for multiple edge types in one call.
+
+        Args:
+            nodes: Given nodes whose predecessors will be sampled.
+
+            max_degree: An int of the max sampled predecessors of each edge type
+                        for all edge types, or a dict of {edge_type: int} for
+                        the specified edge types. -1 means all predecessors.
+
+            shuffle: Whether to shuffle the predecessors of nodes with degree
+                     smaller than max_degree.
+
+        Return:
+
+            A tuple of (predecessors, eids, etypes, counts) in flat numpy.ndarray.
+            :code:`etypes` are the indices of edge types in :code:`edge_types`
+            and :code:`eids` are the edge ids within each edge type. The
+            :code:`counts` with shape [len(nodes), len(edge_types)] is the
+            number of sampled predecessors of each node and edge type, and the
+            predecessors are ordered by edge types and then nodes.
+        """
+        return self.typed_dst_index.sample_flat(
+            nodes, self._typed_max_degree(max_degree), shuffle=shuffle)
 
     def node_batch_iter(self, batch_size, shuffle=False, n_type=None):
         """Node batch iterator
@@ -407,6 +539,7 @@ class HeterGraph(object):
         if inplace:
             for etype in self._edge_types:
                 self._multi_graph[etype].tensor(inplace)
+            self._convert_typed_index(lambda x: x.tensor(inplace))
 
             self._is_tensor = True
             return self
@@ -420,8 +553,16 @@ class HeterGraph(object):
                     node_types=self.__dict__["_node_types"],
                     multi_graph=new_multi_graph,
                     )
+            new_graph._typed_src_index, new_graph._typed_dst_index = \
+                self._convert_typed_index(lambda x: x.tensor(inplace))
             return new_graph
 
+    def _convert_typed_index(self, convert):
+        typed_index = []
+        for index in [self._typed_src_index, self._typed_dst_index]:
+            typed_index.append(None if index is None else convert(index))
+        return typed_index
+
     def numpy(self, inplace=True):
         """Convert the Heterogeneous Graph into numpy format.
 
@@ -439,6 +580,7 @@ class HeterGraph(object):
         if inplace:
             for etype in self._edge_types:
                 self._multi_graph[etype].numpy(inplace)
+            self._convert_typed_index(lambda x: x.numpy(inplace))
             self._is_tensor = False
             return self
         else:
@@ -451,26 +593,27 @@ class HeterGraph(object):
                     node_types=self.__dict__["_node_types"],
                     multi_graph=new_multi_graph,
                     )
+            new_graph._typed_src_index, new_graph._typed_dst_index = \
+                self._convert_typed_index(lambda x: x.numpy(inplace))
             return new_graph
 
-    def dump(self, path, indegree=False, outdegree=False):
+    def dump(self, path, indegree=False, outdegree=False, num_threads=1):
         """Dump the heterogeneous graph into a directory.
 
         This function will dump the graph information into the given directory path. 
-        The graph can be read back with :code:`pgl.HeterGraph.load`
+        The graph can be read back with :code:`pgl.HeterGraph.load`. The typed
+        indices are dumped as well if they have been built.
 
         Args:
             path: The directory for the storage of the heterogeneous graph.
 
-        """
-        if indegree:
-            for etype, g in self._multi_graph.items():
-                g.indegree()
+            indegree: Whether to dump adj_dst_index of each edge type.
 
-        if outdegree:
-            for etype, g in self._multi_graph.items():
-                g.outdegree()
+            outdegree: Whether to dump adj_src_index of each edge type.
 
+            num_threads: The number of threads to build the EdgeIndex on disk.
+
+        """
         if not os.path.exists(path):
             os.makedirs(path)
 
@@ -480,7 +623,12 @@ class HeterGraph(object):
 
         for etype, g in self._multi_graph.items():
             sub_path = os.path.join(path, etype)
-            g.dump(sub_path)
+            g.dump(sub_path, indegree, outdegree, num_threads)
+
+        if self._typed_src_index is not None:
+            self._typed_src_index.dump(os.path.join(path, "typed_src"))
+        if self._typed_dst_index is not None:
+            self._typed_dst_index.dump(os.path.join(path, "typed_dst"))
 
     @classmethod
     def load(cls, path, mmap_mode="r"):
@@ -504,11 +652,19 @@ class HeterGraph(object):
             sub_path = os.path.join(path, etype)
             _multi_graph[etype] = Graph.load(sub_path, mmap_mode)
 
-        return cls(edges=None,
+        graph = cls(edges=None,
                 node_types=_node_types,
                 multi_graph=_multi_graph,
                 )
 
+        if os.path.isdir(os.path.join(path, "typed_src")):
+            graph._typed_src_index = TypedEdgeIndex.load(
+                os.path.join(path, "typed_src"), mmap_mode=mmap_mode)
+        if os.path.isdir(os.path.join(path, "typed_dst")):
+            graph._typed_dst_index = TypedEdgeIndex.load(
+                os.path.join(path, "typed_dst"), mmap_mode=mmap_mode)
+        return graph
+
 
 
 
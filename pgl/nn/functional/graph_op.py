@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import numpy as np
 import paddle
 import paddle.nn as nn
 
@@ -48,6 +49,9 @@ def degree_norm(graph, mode="indegree"):
     elif mode == "outdegree":
         degree = graph.outdegree()
 
+    if isinstance(degree, np.ndarray):
+        degree = paddle.to_tensor(degree)
+
     norm = paddle.cast(degree, dtype=paddle.get_default_dtype())
     norm = paddle.clip(norm, min=1.0)
     norm = paddle.pow(norm, -0.5)
@@ -0,0 +1,205 @@
+# Copyright (c) 2022 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""This package implements layer-wise full-graph inference for conv stacks.
+"""
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import paddle
+
+import pgl
+from pgl import graph_kernel
+from pgl.nn import conv
+
+__all__ = ["layerwise_inference"]
+
+# layers which only aggregate by send_recv and run on numpy graphs on CPU
+_FUSED_LAYERS = (conv.GCNConv, conv.GraphSageConv, conv.GINConv)
+
+
+def _default_layer_fn(layer_idx, layer, graph, feature, norm=None):
+    if isinstance(layer, conv.GCNConv) and layer.norm:
+        return layer(graph, feature, norm=norm)
+    return layer(graph, feature)
+
+
+def _node_block(graph, nodes):
+    """Build the graph of nodes and all their predecessors.
+
+    The first len(nodes) nodes of the block are the given nodes.
+    """
+    pred = graph.predecessor(nodes)
+    counts = graph.indegree(nodes)
+    if len(pred) > 0:
+        neighbors = np.concatenate(pred).astype("int64")
+    else:
+        neighbors = np.zeros([0], dtype="int64")
+    reindex_src, block_nodes = graph_kernel.reindex_neighbors(
+        np.asarray(nodes, dtype="int64"), neighbors)
+    reindex_dst = np.repeat(np.arange(len(nodes), dtype="int64"), counts)
+    edges = np.stack([reindex_src, reindex_dst], axis=1)
+    block = pgl.Graph(edges=edges, num_nodes=len(block_nodes))
+    return block, block_nodes
+
+
+def layerwise_inference(graph,
+                        layers,
+                        feature,
+                        batch_size=10000,
+                        layer_fn=None,
+                        output_dir=None,
+                        dtype=None):
+    """Full-neighbor inference of a conv stack one layer at a time.
+
+    Instead of sampling a multi-hop neighborhood for every node, each layer
+    is applied to all the nodes in node batches with all their predecessors,
+    so the total cost is O(layers x edges) and the result is deterministic.
+    The output of each layer is written into a memory-mapped array and read
+    as the input of the next layer, so only one node batch of features is in
+    memory at a time.
+
+    Example:
+
+        .. code-block:: python
+
+            layers = [pgl.nn.GraphSageConv(feat_size, 64),
+                      pgl.nn.GraphSageConv(64, num_class)]
+
+            def layer_fn(layer_idx, layer, graph, feature, norm=None):
+                feature = layer(graph, feature)
+                if layer_idx < len(layers) - 1:
+                    feature = paddle.nn.functional.relu(feature)
+                return feature
+
+            emb = layerwise_inference(graph, layers, feat, layer_fn=layer_fn)
+
+    Args:
+
+        graph: A numpy `pgl.Graph` instance.
+
+        layers: A list of conv layers, like pgl.nn.GraphSageConv, GCNConv
+                and GATConv.
+
+        feature: A numpy array (or np.memmap) with shape (num_nodes, input_size).
+
+        batch_size: The number of destination nodes in each node batch.
+
+        layer_fn: (default None) A function with the signature
+                  :code:`layer_fn(layer_idx, layer, graph, feature, norm)`
+                  to run one layer on a block graph, where the first nodes of
+                  the block are the destination nodes, and :code:`norm` is the
+                  GCN degree norm of the block nodes in the full graph. By
+                  default, it calls :code:`layer(graph, feature)`, passing the
+                  norm to GCNConv. Put activations and dropouts between layers
+                  here.
+
+        output_dir: (default None) The directory to keep the embeddings of
+                    each layer as :code:`layer_{i}.npy`. If None, the
+                    embeddings are written in a temporary directory, and the
+                    output of the last layer is loaded into memory.
+
+        dtype: (default None) The dtype of the embeddings. If None, use
+               paddle.get_default_dtype().
+
+    Return:
+
+        A numpy array with shape (num_nodes, output_size). It is a
+        memory-mapped array of :code:`layer_{last}.npy` if output_dir is set.
+        For a graph without nodes, an empty array with the output width of
+        the last layer is returned, which is found by running the layers on
+        a single node with a self-loop.
+
+    """
+    if graph.is_tensor():
+        raise ValueError(
+            "layerwise_inference needs a numpy graph, call graph.numpy() first.")
+
+    if layer_fn is None:
+        layer_fn = _default_layer_fn
+
+    if dtype is None:
+        dtype = paddle.get_default_dtype()
+
+    if isinstance(feature, paddle.Tensor):
+        feature = feature.numpy()
+
+    if graph.num_nodes == 0:
+        # the conv layers can't run on empty blocks
+        probe = pgl.Graph(
+            edges=np.zeros([1, 2], dtype="int64"), num_nodes=1)
+        probe_feature = np.zeros(
+            [1] + list(np.shape(feature)[1:]), dtype=dtype)
+        output = layerwise_inference(
+            probe, layers, probe_feature, layer_fn=layer_fn, dtype=dtype)
+        return output[:0]
+
+    tmp_dir = None
+    if output_dir is None:
+        tmp_dir = tempfile.mkdtemp()
+        layer_dir = tmp_dir
+    else:
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        layer_dir = output_dir
+
+    # GCN normalizes the source nodes by their degree in the full graph,
+    # which is lost in the block graphs
+    norm = np.clip(graph.indegree(), 1, None).astype(dtype)
+    norm = np.power(norm, -0.5).reshape([-1, 1])
+
+    try:
+        with paddle.no_grad():
+            for layer_idx, layer in enumerate(layers):
+                path = os.path.join(layer_dir, "layer_%s.npy" % layer_idx)
+                output = None
+                for nodes in graph.node_batch_iter(batch_size, shuffle=False):
+                    block, block_nodes = _node_block(graph, nodes)
+                    block_feature = paddle.to_tensor(
+                        np.asarray(feature[block_nodes], dtype=dtype))
+                    block_norm = paddle.to_tensor(norm[block_nodes])
+
+                    if not (isinstance(layer, _FUSED_LAYERS) and
+                            block_feature.place.is_cpu_place()):
+                        block.tensor()
+
+                    block_output = layer_fn(layer_idx, layer, block,
+                                            block_feature, block_norm)
+                    block_output = block_output[:len(nodes)].numpy()
+
+                    if output is None:
+                        output = np.lib.format.open_memmap(
+                            path,
+                            mode="w+",
+                            dtype=dtype,
+                            shape=tuple([graph.num_nodes] + list(
+                                block_output.shape[1:])))
+                    output[nodes[0]:nodes[0] + len(nodes)] = block_output
+
+                output.flush()
+                del output
+                if tmp_dir is not None and layer_idx > 0:
+                    os.remove(
+                        os.path.join(layer_dir, "layer_%s.npy" %
+                                     (layer_idx - 1)))
+                feature = np.load(path, mmap_mode="r")
+
+        if tmp_dir is not None:
+            feature = np.array(feature)
+        return feature
+    finally:
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir)
@@ -18,6 +18,7 @@ import math
 
 import numpy as np
 from pgl.graph_kernel import metis_partition as _metis_partition
+from pgl.graph_kernel import streaming_partition_chunk
 from pgl.utils.helper import check_is_tensor
 from pgl.utils.logger import log
 
@@ -113,11 +114,164 @@ def random_partition(graph, npart):
         return np.zeros(graph.num_nodes, dtype=np.int64)
 
     cs = int(math.ceil(graph.num_nodes / npart))
-    part_list = []
-    for i in range(npart):
-        part_list.extend([i] * cs)
-    part_list = part_list[:graph.num_nodes]
-    part_id = np.array(part_list, dtype=np.int64)
-    np.random.shuffle(part_id)
+    # node i goes to the part of its rank in a random permutation
+    part_id = np.random.permutation(int(graph.num_nodes)).astype(
+        np.int64) // cs
 
     return part_id
+
+
+def _csr_chunk(edge_index, start, end):
+    """Read the compressed v of nodes [start, end) into memory, so that
+    memory-mapped EdgeIndex is read chunk by chunk.
+    """
+    indptr = np.array(edge_index._indptr[start:end + 1], dtype=np.int64)
+    sorted_v = np.array(
+        edge_index._sorted_v[indptr[0]:indptr[-1]], dtype=np.int64)
+    return indptr - indptr[0], sorted_v
+
+
+def _iter_csr_chunks(graph, chunk_size):
+    """Yield (start, end, successors, predecessors) of node chunks.
+    """
+    if graph.is_tensor():
+        raise ValueError(
+            "Streaming partition needs a numpy graph, call graph.numpy() first."
+        )
+    num_nodes = int(graph.num_nodes)
+    for start in range(0, num_nodes, chunk_size):
+        end = min(start + chunk_size, num_nodes)
+        yield (start, end, _csr_chunk(graph.adj_src_index, start, end),
+               _csr_chunk(graph.adj_dst_index, start, end))
+
+
+def streaming_partition(graph,
+                        npart,
+                        method="fennel",
+                        num_passes=1,
+                        balance=1.05,
+                        gamma=1.5,
+                        chunk_size=1000000):
+    """Perform one-pass streaming partition over graph.
+
+    Nodes are streamed in the order of node id and each node is assigned
+    to a part by the parts of its assigned neighbors, with LDG or Fennel
+    scores. Edges are treated as undirected. Only the part ids are kept in
+    memory, and the adj_src_index and adj_dst_index of the graph are read
+    chunk by chunk, so a graph dumped by :code:`graph.dump(path,
+    indegree=True, outdegree=True)` and loaded by :code:`pgl.Graph.load`
+    can be partitioned without loading it into memory. Extra passes
+    restream the nodes with the assignment of the previous pass to
+    refine the partition.
+
+    Args:
+
+        graph (pgl.Graph): The input graph for partition in numpy.
+
+        npart (int): The number of part in the final cluster.
+
+        method (str): "fennel" or "ldg" (Linear Deterministic Greedy).
+
+        num_passes (int): The number of streaming passes. Passes after the
+                          first one refine the partition.
+
+        balance (float): The max part size is :code:`balance * num_nodes / npart`.
+
+        gamma (float): The exponent of the part size penalty of Fennel.
+
+        chunk_size (int): The number of nodes read into memory at a time.
+
+    Returns:
+
+        part_id (numpy.ndarray): An int64 numpy array with shape [num_nodes, ] denotes the cluster id.
+
+    """
+    if method not in ["fennel", "ldg"]:
+        raise ValueError("method should be in 'fennel' or 'ldg'.")
+
+    num_nodes = int(graph.num_nodes)
+    if npart == 1:
+        return np.zeros(num_nodes, dtype=np.int64)
+
+    capacity = max(
+        int(math.ceil(balance * num_nodes / npart)),
+        int(math.ceil(num_nodes / npart)))
+    # alpha of Fennel, which makes the expected part size penalty
+    # comparable to the number of neighbors
+    alpha = math.sqrt(npart) * graph.num_edges / max(num_nodes, 1)**1.5
+
+    method_id = 0 if method == "ldg" else 1
+    part_id = np.full([num_nodes], -1, dtype=np.int64)
+    part_size = np.zeros([npart], dtype=np.int64)
+    for _ in range(num_passes):
+        for start, end, (out_indptr, out_v), (in_indptr, in_v) in \
+                _iter_csr_chunks(graph, chunk_size):
+            streaming_partition_chunk(out_indptr, out_v, in_indptr, in_v,
+                                      start, part_id, part_size, capacity,
+                                      alpha, gamma, method_id)
+    return part_id
+
+
+def partition_stats(graph, part_id, chunk_size=1000000):
+    """Compute the quality of a partition over graph.
+
+    The graph is read chunk by chunk in the same way as
+    :code:`streaming_partition`.
+
+    Args:
+
+        graph (pgl.Graph): The partitioned graph in numpy.
+
+        part_id (numpy.ndarray): The part id of each node.
+
+        chunk_size (int): The number of nodes read into memory at a time.
+
+    Returns:
+
+        A dict of the partition quality:
+
+        - edge_cut: The number of edges across parts.
+
+        - edge_cut_ratio: edge_cut divided by the number of edges.
+
+        - replication_factor: The average number of parts which hold a
+          node, where a part holds its own nodes and the remote neighbors
+          of them.
+
+        - balance: The max part size divided by the average part size.
+
+        - part_sizes: The number of nodes in each part.
+
+    """
+    part_id = np.asarray(part_id, dtype=np.int64)
+    num_nodes = int(graph.num_nodes)
+    npart = int(part_id.max()) + 1 if num_nodes > 0 else 1
+
+    edge_cut = 0
+    num_replicas = 0
+    for start, end, (out_indptr, out_v), (in_indptr, in_v) in \
+            _iter_csr_chunks(graph, chunk_size):
+        local = np.arange(end - start, dtype=np.int64)
+        out_local = np.repeat(local, np.diff(out_indptr))
+        in_local = np.repeat(local, np.diff(in_indptr))
+        out_part = part_id[out_v]
+        node_part = part_id[start:end]
+        edge_cut += int(np.sum(node_part[out_local] != out_part))
+
+        # the (node, part) pairs that a remote part holds the node
+        neigh_local = np.concatenate([out_local, in_local])
+        neigh_part = np.concatenate([out_part, part_id[in_v]])
+        remote = neigh_part != node_part[neigh_local]
+        num_replicas += len(
+            np.unique(neigh_local[remote] * npart + neigh_part[remote]))
+
+    part_sizes = np.bincount(part_id, minlength=npart)
+    num_edges = int(graph.num_edges)
+    return {
+        "edge_cut": edge_cut,
+        "edge_cut_ratio": edge_cut / max(num_edges, 1),
+        "replication_factor":
+        (num_nodes + num_replicas) / float(max(num_nodes, 1)),
+        "balance": part_sizes.max() * npart / float(max(num_nodes, 1)),
+        "part_sizes": part_sizes,
+    }
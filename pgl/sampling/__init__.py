@@ -15,12 +15,15 @@
 from pgl.sampling import sage
 from pgl.sampling import walk
 from pgl.sampling import custom
+from pgl.sampling import ego
 
 from pgl.sampling.walk import *
 from pgl.sampling.sage import *
 from pgl.sampling.custom import *
+from pgl.sampling.ego import *
 
 __all__ = []
 __all__ += sage.__all__
 __all__ += walk.__all__
 __all__ += custom.__all__
+__all__ += ego.__all__
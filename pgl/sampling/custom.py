@@ -12,12 +12,117 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import pgl
+import threading
+import weakref
+
 import numpy as np
+from pgl import graph_kernel
 from pgl.graph import Graph
 
 __all__ = []
 __all__.append("subgraph")
+__all__.append("induced_subgraph")
+__all__.append("LazyFeature")
+
+# graph -> per-thread relabel buffer, released with the graph
+_RELABEL_BUFFERS = weakref.WeakKeyDictionary()
+
+
+class _RelabelBuffer(threading.local):
+    """A per-thread int64 scratch array of num_nodes filled with -1.
+
+    Relabeling sets the new ids of the given nodes, gathers them for the
+    edges and resets the nodes to -1, so the cost is linear in the size of
+    the subgraph instead of building a hash map on every call.
+    """
+
+    def __init__(self, num_nodes):
+        self.index = np.full([num_nodes], -1, dtype="int64")
+
+
+def _relabel_buffer(graph):
+    buf = _RELABEL_BUFFERS.get(graph)
+    if buf is None:
+        buf = _RelabelBuffer(int(graph.num_nodes))
+        _RELABEL_BUFFERS[graph] = buf
+    return buf.index
+
+
+def _relabel(graph, nodes, *arrays):
+    """Relabel node ids in arrays to their positions in nodes.
+
+    Nodes should be unique. Node ids not in nodes are relabeled to -1.
+    """
+    index = _relabel_buffer(graph)
+    index[nodes] = np.arange(len(nodes), dtype="int64")
+    try:
+        return [index[array] for array in arrays]
+    finally:
+        index[nodes] = -1
+
+
+class LazyFeature(object):
+    """A lazy view of :code:`value[index]` for subgraph features.
+
+    The rows are gathered when the feature is converted into a numpy array
+    or paddle.Tensor (e.g. by :code:`graph.tensor()`), and cached then.
+    Indexing rows before that only gathers the indexed rows.
+
+    Args:
+        value: The feature of the parent graph.
+        index: The row ids of the view in value.
+    """
+
+    def __init__(self, value, index):
+        self._value = value
+        self._index = index
+        self._data = None
+
+    @property
+    def shape(self):
+        return (len(self._index), ) + tuple(self._value.shape[1:])
+
+    @property
+    def dtype(self):
+        return self._value.dtype
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    def __len__(self):
+        return len(self._index)
+
+    def numpy(self):
+        """Gather and return the feature as numpy.ndarray.
+        """
+        if self._data is None:
+            self._data = np.asarray(self._value[self._index])
+        return self._data
+
+    def __array__(self, dtype=None, copy=None):
+        data = self.numpy()
+        if dtype is not None:
+            data = data.astype(dtype)
+        return data
+
+    def __getitem__(self, key):
+        if self._data is None and not isinstance(key, tuple):
+            return np.asarray(self._value[self._index[key]])
+        return self.numpy()[key]
+
+    def __repr__(self):
+        return "LazyFeature(shape=%s, dtype=%s)" % (self.shape, self.dtype)
+
+
+def _gather_feat(feat, index, lazy_feat):
+    sub_feat = {}
+    for key, value in feat.items():
+        if lazy_feat:
+            sub_feat[key] = LazyFeature(value, index)
+        else:
+            sub_feat[key] = value[index]
+    return sub_feat
 
 
 def subgraph(graph,
@@ -25,7 +130,8 @@ def subgraph(graph,
              eid=None,
              edges=None,
              with_node_feat=True,
-             with_edge_feat=True):
+             with_edge_feat=True,
+             lazy_feat=False):
     """Generate subgraph with nodes and edge ids.
     This function will generate a :code:`pgl.graph.Subgraph` object and
     copy all corresponding node and edge features. Nodes and edges will
@@ -39,6 +145,8 @@ def subgraph(graph,
 
         with_node_feat: Whether to inherit node features from parent graph.
         with_edge_feat: Whether to inherit edge features from parent graph.
+        lazy_feat: Whether to inherit features as :code:`LazyFeature`, which
+                   defers gathering until the features are used.
 
     Return:
         A :code:`pgl.Graph` object.
@@ -48,31 +156,82 @@ def subgraph(graph,
     if eid is None and edges is None:
         raise ValueError("Eid and edges can't be None at the same time.")
 
-    reindex = {}
-
-    for ind, node in enumerate(nodes):
-        reindex[node] = ind
-
+    nodes = np.asarray(nodes, dtype="int64").reshape([-1])
     sub_edge_feat = {}
     if edges is None:
+        eid = np.asarray(eid, dtype="int64").reshape([-1])
         edges = graph._edges[eid]
     else:
-        edges = np.array(edges, dtype="int64")
+        edges = np.array(edges, dtype="int64").reshape([-1, 2])
 
-    if with_edge_feat:
-        for key, value in graph._edge_feat.items():
-            if eid is None:
-                raise ValueError("Eid can not be None with edge features.")
-            sub_edge_feat[key] = value[eid]
+    if with_edge_feat and len(graph._edge_feat) > 0:
+        if eid is None:
+            raise ValueError("Eid can not be None with edge features.")
+        sub_edge_feat = _gather_feat(graph._edge_feat, eid, lazy_feat)
 
-    sub_edges = pgl.graph_kernel.map_edges(
-        np.arange(
-            len(edges), dtype="int64"), edges, reindex)
+    sub_edges, = _relabel(graph, nodes, edges)
+    if len(sub_edges) > 0 and sub_edges.min() < 0:
+        raise ValueError("All nodes in edges must be included by nodes.")
 
     sub_node_feat = {}
     if with_node_feat:
-        for key, value in graph._node_feat.items():
-            sub_node_feat[key] = value[nodes]
+        sub_node_feat = _gather_feat(graph._node_feat, nodes, lazy_feat)
+
+    g = Graph(
+        edges=sub_edges,
+        num_nodes=len(nodes),
+        node_feat=sub_node_feat,
+        edge_feat=sub_edge_feat)
+
+    return g
+
+
+def induced_subgraph(graph,
+                     nodes,
+                     with_node_feat=True,
+                     with_edge_feat=True,
+                     lazy_feat=False,
+                     return_eids=False):
+    """Generate the subgraph induced by nodes with all edges among them.
+
+    The edges are extracted from the adj_src_index of the graph by
+    :code:`graph_kernel.extract_edges_from_nodes`, with the same relabel
+    buffer of :code:`subgraph`.
+
+    Args:
+        nodes: Unique node ids which will be included in the subgraph.
+
+        with_node_feat: Whether to inherit node features from parent graph.
+        with_edge_feat: Whether to inherit edge features from parent graph.
+        lazy_feat: Whether to inherit features as :code:`LazyFeature`, which
+                   defers gathering until the features are used.
+        return_eids: Whether to return the edge ids in the parent graph.
+
+    Return:
+        A :code:`pgl.Graph` object, and the edge ids if :code:`return_eids=True`.
+    """
+    assert not graph.is_tensor(), "You must call Graph.numpy() first."
+
+    nodes = np.asarray(nodes, dtype="int64").reshape([-1])
+    edge_index = graph.adj_src_index
+    index = _relabel_buffer(graph)
+    index[nodes] = np.arange(len(nodes), dtype="int64")
+    try:
+        eid = graph_kernel.extract_edges_from_nodes(
+            edge_index._indptr,
+            edge_index._sorted_v,
+            edge_index._sorted_eid,
+            nodes,
+            node_index=index)
+        sub_edges = index[graph._edges[eid]]
+    finally:
+        index[nodes] = -1
+
+    sub_node_feat, sub_edge_feat = {}, {}
+    if with_node_feat:
+        sub_node_feat = _gather_feat(graph._node_feat, nodes, lazy_feat)
+    if with_edge_feat:
+        sub_edge_feat = _gather_feat(graph._edge_feat, eid, lazy_feat)
 
     g = Graph(
         edges=sub_edges,
@@ -80,4 +239,6 @@ def subgraph(graph,
         node_feat=sub_node_feat,
         edge_feat=sub_edge_feat)
 
+    if return_eids:
+        return g, eid
     return g
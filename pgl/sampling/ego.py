@@ -0,0 +1,196 @@
+# Copyright (c) 2022 PaddlePaddle Authors. All Rights Reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+    This package implement heterogeneous ego graph sampling.
+"""
+
+import numpy as np
+
+from pgl.graph import Graph
+from pgl.heter_graph import HeterGraph
+from pgl.utils import op
+
+__all__ = ['ego_graph_sample']
+
+
+def _sample_successor_flat(graph, nodes, max_degree, edge_type):
+    """Sample successors of nodes and return (successors, counts).
+    """
+    if isinstance(graph, HeterGraph):
+        return graph.sample_successor(
+            edge_type, nodes, max_degree, return_flat=True)
+
+    edges = np.asarray(
+        graph.sample_successor(
+            nodes, max_degree=max_degree, edge_type=edge_type,
+            return_edges=True),
+        dtype=nodes.dtype).reshape([-1, 2])
+    # The edges of a graph client are in the order of the query, and every
+    # query of the same node returns the same number of successors.
+    uniq_nodes, inverse, query_counts = np.unique(
+        nodes, return_inverse=True, return_counts=True)
+    edge_counts = np.bincount(
+        np.searchsorted(uniq_nodes, edges[:, 0]), minlength=len(uniq_nodes))
+    counts = (edge_counts // query_counts)[inverse.reshape([-1])]
+    return edges[:, 1], counts.astype("int64")
+
+
+def ego_graph_sample(graph, nodes, samples, edge_types=None, pad_value=None):
+    """Implement of heterogeneous ego graph sampling.
+
+    Each start node grows a tree of sampled successors. At each hop, every
+    node of the last hop samples successors of each edge type, and each
+    sampled successor is added as a new node with an edge to its parent,
+    so the same node may appear several times in an ego graph. All the
+    ego graphs are written into flat arrays and returned as one disjoint
+    batched graph, without building a graph for each ego.
+
+    Args:
+        graph: A numpy pgl.HeterGraph or a DistGraphClient
+
+        nodes: The start nodes. nodes[i] is the first node of the i-th
+               ego graph.
+
+        samples: A list of fanouts for each hop. Each fanout is an int for
+                 all the edge types, or a dict from edge type to int, where
+                 missing edge types are not sampled.
+
+        edge_types: (default None) The edge types to sample in order. If
+                    None, use all the edge types of the graph.
+
+        pad_value: (default None) If not None, a node without successors
+                   of an edge type gets a new node with id pad_value and a
+                   self-loop of that edge type instead, as Graph4Rec does.
+                   The padding nodes are not expanded in the next hops.
+
+    Return:
+        A numpy pgl.Graph batched from len(nodes) ego graphs, whose node
+        ids are in :code:`node_feat["node_id"]` (uint64 for the ids of
+        DistGraphClient). Edges point from the
+        sampled successors to their parents, with the index of the edge
+        type in :code:`edge_feat["edge_type"]` and 1 / (number of sampled
+        successors of the parent) in :code:`edge_feat["edge_weight"]`.
+        The nodes of each ego graph are contiguous, in the order of hop,
+        edge type and parent, and :code:`graph_node_id` gives the ego
+        graph of each node.
+    """
+    if isinstance(graph, HeterGraph):
+        assert not graph.is_tensor(), "You must call HeterGraph.numpy() first."
+        if edge_types is None:
+            edge_types = graph.edge_types
+        dtype = "int64"
+    else:
+        if edge_types is None:
+            edge_types = graph.get_edge_types()
+        dtype = "uint64"
+
+    nodes = np.array(nodes, dtype=dtype).reshape([-1])
+    num_egos = len(nodes)
+
+    node_ids = [nodes]
+    node_egos = [np.arange(num_egos, dtype="int64")]
+    src, dst, etypes, weights = [], [], [], []
+
+    num_nodes = num_egos
+    cur_nodes = nodes
+    cur_egos = node_egos[0]
+    cur_index = np.arange(num_egos, dtype="int64")
+    for sample in samples:
+        nxt_nodes, nxt_egos, nxt_index = [], [], []
+        for etype_id, etype in enumerate(edge_types):
+            if isinstance(sample, dict):
+                max_degree = sample.get(etype, 0)
+            else:
+                max_degree = sample
+            if max_degree == 0 or len(cur_nodes) == 0:
+                continue
+
+            succ, counts = _sample_successor_flat(graph, cur_nodes,
+                                                  max_degree, etype)
+            counts = np.asarray(counts, dtype="int64")
+            succ = np.asarray(succ, dtype=dtype)
+            if pad_value is not None:
+                is_pad = counts == 0
+                counts = np.where(is_pad, 1, counts)
+                is_pad = np.repeat(is_pad, counts)
+                new_nodes = np.full([len(is_pad)], pad_value, dtype=dtype)
+                new_nodes[~is_pad] = succ
+            else:
+                new_nodes = succ
+
+            parent = np.repeat(np.arange(len(cur_nodes)), counts)
+            new_index = num_nodes + np.arange(len(new_nodes), dtype="int64")
+            num_nodes += len(new_nodes)
+
+            src.append(new_index)
+            if pad_value is not None:
+                dst.append(np.where(is_pad, new_index, cur_index[parent]))
+            else:
+                dst.append(cur_index[parent])
+            etypes.append(np.full([len(new_nodes)], etype_id, dtype="int64"))
+            weights.append(1.0 / counts[parent])
+
+            node_ids.append(new_nodes)
+            node_egos.append(cur_egos[parent])
+            if pad_value is not None:
+                # padding nodes are isolated and not expanded
+                nxt_nodes.append(new_nodes[~is_pad])
+                nxt_egos.append(cur_egos[parent][~is_pad])
+                nxt_index.append(new_index[~is_pad])
+            else:
+                nxt_nodes.append(new_nodes)
+                nxt_egos.append(cur_egos[parent])
+                nxt_index.append(new_index)
+
+        if len(nxt_nodes) == 0:
+            break
+        cur_nodes = np.concatenate(nxt_nodes)
+        cur_egos = np.concatenate(nxt_egos)
+        cur_index = np.concatenate(nxt_index)
+
+    node_ids = np.concatenate(node_ids)
+    node_egos = np.concatenate(node_egos)
+    if len(src) > 0:
+        src = np.concatenate(src)
+        dst = np.concatenate(dst)
+        etypes = np.concatenate(etypes)
+        weights = np.concatenate(weights).astype("float32")
+    else:
+        src = dst = etypes = np.zeros([0], dtype="int64")
+        weights = np.zeros([0], dtype="float32")
+
+    # Nodes are generated by hop and edge type, and a stable sort by ego
+    # keeps this order inside each ego graph.
+    edge_egos = node_egos[src]
+    perm = np.argsort(node_egos, kind="stable")
+    reindex = np.empty_like(perm)
+    reindex[perm] = np.arange(len(perm))
+    src, dst = reindex[src], reindex[dst]
+
+    edge_perm = np.argsort(edge_egos, kind="stable")
+    edges = np.stack([src[edge_perm], dst[edge_perm]], axis=1)
+
+    node_counts = np.bincount(node_egos, minlength=num_egos)
+    edge_counts = np.bincount(edge_egos, minlength=num_egos)
+    return Graph(
+        edges=edges,
+        num_nodes=len(node_ids),
+        node_feat={"node_id": node_ids[perm]},
+        edge_feat={
+            "edge_type": etypes[edge_perm],
+            "edge_weight": weights[edge_perm]
+        },
+        _num_graph=num_egos,
+        _graph_node_index=op.get_index_from_counts(node_counts),
+        _graph_edge_index=op.get_index_from_counts(edge_counts))
@@ -14,20 +14,19 @@
 """
     This package implement graph sampling algorithm.
 """
-import time
-import copy
-
 import numpy as np
 import paddle
 import pgl
 from pgl import graph_kernel
-from pgl.sampling.custom import subgraph
+from pgl.sampling.custom import subgraph, _relabel
 from pgl.utils.logger import log
 from pgl.utils.helper import to_paddle_tensor
+from pgl.utils.edge_index import EdgeIndex
 
 __all__ = [
     'graphsage_sample',
     'NeighborSampler',
+    'HeteroNeighborSampler',
 ]
 
 
@@ -56,6 +55,39 @@ def edge_hash(src, dst):
     return src * 100000007 + dst
 
 
+def _first_unseen(values, seen):
+    """Return the sorted indices of the first appearance of values not in seen.
+    """
+    _, index = np.unique(values, return_index=True)
+    index = index[~np.isin(values[index], seen)]
+    return np.sort(index)
+
+
+def _block_graph(src, counts, num_nodes):
+    """Build a sampled block graph whose edges are grouped by dst.
+
+    The dst nodes are the first :code:`len(counts)` nodes, so the adj_dst_index
+    can be built from counts directly without sorting edges.
+    """
+    num_dst = len(counts)
+    dst = np.repeat(np.arange(num_dst, dtype="int64"), counts)
+    degree = np.zeros([num_nodes], dtype="int64")
+    degree[:num_dst] = counts
+    indptr = np.zeros([num_nodes + 1], dtype="int64")
+    np.cumsum(degree, out=indptr[1:])
+    adj_dst_index = EdgeIndex.from_index(
+        sorted_v=src,
+        sorted_u=dst,
+        sorted_eid=np.arange(
+            len(src), dtype="int64"),
+        degree=degree,
+        indptr=indptr)
+    return pgl.Graph(
+        num_nodes=num_nodes,
+        edges=np.stack([src, dst], axis=1),
+        adj_dst_index=adj_dst_index)
+
+
 def graphsage_sample(graph, nodes, samples, ignore_edges=[]):
     """Implement of graphsage sample.
     Reference paper: https://cs.stanford.edu/people/jure/pubs/graphsage-nips17.pdf.
@@ -68,75 +100,113 @@ def graphsage_sample(graph, nodes, samples, ignore_edges=[]):
         A list of subgraphs
     """
     assert not graph.is_tensor(), "You must call Graph.numpy() first."
-    node_index = copy.deepcopy(nodes)
-    start = time.time()
+    num_nodes = int(graph.num_nodes)
     num_layers = len(samples)
-    start_nodes = nodes
-    nodes = list(start_nodes)
-    eids, edges = [], []
-    nodes_set = set(nodes)
+    start_nodes = np.array(nodes, dtype="int64").reshape([-1])
+    node_index = start_nodes
+    nodes = start_nodes
+    eids = np.zeros([0], dtype="int64")
+    src = np.zeros([0], dtype="int64")
+    dst = np.zeros([0], dtype="int64")
     layer_nodes, layer_eids, layer_edges = [], [], []
-    ignore_edge_set = set([edge_hash(src, dst) for src, dst in ignore_edges])
+
+    if len(ignore_edges) > 0:
+        ignore_edges = np.array(ignore_edges, dtype="int64").reshape([-1, 2])
+        ignore_keys = np.unique(ignore_edges[:, 0] * num_nodes +
+                                ignore_edges[:, 1])
+    else:
+        ignore_keys = None
 
     for layer_idx in reversed(range(num_layers)):
-        if len(start_nodes) == 0:
-            layer_nodes = [nodes] + layer_nodes
-            layer_eids = [eids] + layer_eids
-            layer_edges = [edges] + layer_edges
-            continue
-        batch_pred_nodes, batch_pred_eids = graph.sample_predecessor(
-            start_nodes, samples[layer_idx], return_eids=True)
-        start = time.time()
-        last_nodes_set = nodes_set
-
-        nodes, eids = copy.copy(nodes), copy.copy(eids)
-        edges = copy.copy(edges)
-        nodes_set, eids_set = set(nodes), set(eids)
-        for srcs, dst, pred_eids in zip(batch_pred_nodes, start_nodes,
-                                        batch_pred_eids):
-            for src, eid in zip(srcs, pred_eids):
-                if edge_hash(src, dst) in ignore_edge_set:
-                    continue
-                if eid not in eids_set:
-                    eids.append(eid)
-                    edges.append([src, dst])
-                    eids_set.add(eid)
-                if src not in nodes_set:
-                    nodes.append(src)
-                    nodes_set.add(src)
-        layer_edges = [edges] + layer_edges
-        start_nodes = list(nodes_set - last_nodes_set)
+        if len(start_nodes) > 0:
+            pred, pred_eids, counts = graph.sample_predecessor(
+                start_nodes,
+                samples[layer_idx],
+                return_eids=True,
+                return_flat=True)
+            pred_dst = np.repeat(start_nodes, counts)
+            if ignore_keys is not None:
+                mask = ~np.isin(pred * num_nodes + pred_dst, ignore_keys)
+                pred, pred_eids, pred_dst = pred[mask], pred_eids[mask], \
+                        pred_dst[mask]
+
+            new_eids = _first_unseen(pred_eids, eids)
+            eids = np.concatenate([eids, pred_eids[new_eids]])
+            src = np.concatenate([src, pred[new_eids]])
+            dst = np.concatenate([dst, pred_dst[new_eids]])
+
+            start_nodes = pred[_first_unseen(pred, nodes)]
+            nodes = np.concatenate([nodes, start_nodes])
+
         layer_nodes = [nodes] + layer_nodes
         layer_eids = [eids] + layer_eids
-        start = time.time()
-        # Find new nodes
+        layer_edges = [(src, dst)] + layer_edges
+
+    sample_index = layer_nodes[0]
+    # the edges of inner layers are prefixes of the outermost layer
+    outer_src, outer_dst = layer_edges[0]
+    node_index, outer_src, outer_dst = _relabel(graph, sample_index,
+                                                node_index, outer_src,
+                                                outer_dst)
 
-    from_reindex = {x: i for i, x in enumerate(layer_nodes[0])}
-    node_index = graph_kernel.map_nodes(node_index, from_reindex)
-    sample_index = np.array(layer_nodes[0], dtype="int64")
+    node_feat = {}
+    for key, value in graph.node_feat.items():
+        node_feat[key] = value[sample_index]
 
     graph_list = []
     for i in range(num_layers):
-        sg = subgraph(
-            graph,
-            nodes=layer_nodes[0],
-            eid=layer_eids[i],
-            edges=layer_edges[i])
+        num_edges = len(layer_eids[i])
+        sub_src = outer_src[:num_edges]
+        sub_dst = outer_dst[:num_edges]
+        edge_feat = {}
+        for key, value in graph.edge_feat.items():
+            edge_feat[key] = value[layer_eids[i]]
+        sg = pgl.Graph(
+            edges=np.stack(
+                [sub_src, sub_dst], axis=1),
+            num_nodes=len(sample_index),
+            node_feat=dict(node_feat),
+            edge_feat=edge_feat)
         graph_list.append((sg, sample_index, node_index))
 
     return graph_list
 
 
 class NeighborSampler(object):
-    """ GPU Sampler for homogeneous graph """
+    """ Sampler for homogeneous graph
+
+    Args:
+
+        graph: A pgl.Graph instance.
 
-    def __init__(self, graph, samples, uva=False):
+        samples: A list, number of neighbors in each layer.
+
+        uva: Whether to store the graph structure in UVA tensor when
+             :code:`backend="paddle"`.
+
+        backend: "paddle" samples with paddle.geometric on tensors and
+                 "numpy" samples on CPU with numpy arrays and returns numpy
+                 graphs with prebuilt adj_dst_index.
+    """
+
+    def __init__(self, graph, samples, uva=False, backend="paddle"):
+        if backend not in ["paddle", "numpy"]:
+            raise ValueError("backend should be in 'paddle' or 'numpy'.")
         self.graph = graph
         self.samples = samples
-        self.row = to_paddle_tensor(self.graph.adj_dst_index._sorted_v, uva)
-        self.colptr = to_paddle_tensor(self.graph.adj_dst_index._indptr, uva)
+        self.backend = backend
+        if backend == "paddle":
+            self.row = to_paddle_tensor(self.graph.adj_dst_index._sorted_v,
+                                        uva)
+            self.colptr = to_paddle_tensor(self.graph.adj_dst_index._indptr,
+                                           uva)
+        else:
+            assert not graph.is_tensor(), "You must call Graph.numpy() first."
 
     def sample_neighbors(self, nodes):
+        if self.backend == "numpy":
+            return self._sample_neighbors_numpy(nodes)
+
         graph_list = []
         for size in self.samples:
             # If you want to sample with faster speed, you can refer to
@@ -154,9 +224,71 @@ class NeighborSampler(object):
             nodes = sample_index
         return graph_list[::-1], nodes
 
+    def _sample_neighbors_numpy(self, nodes):
+        nodes = np.array(nodes, dtype="int64").reshape([-1])
+        graph_list = []
+        for size in self.samples:
+            neighbors, neighbors_count = self.graph.sample_predecessor(
+                nodes, size, return_flat=True)
+            edge_src, sample_index = graph_kernel.reindex_neighbors(
+                nodes, neighbors)
+            subgraph = _block_graph(edge_src, neighbors_count,
+                                    len(sample_index))
+            graph_list.append((subgraph, len(nodes)))
+            nodes = sample_index
+        return graph_list[::-1], nodes
+
 
 class HeteroNeighborSampler(object):
-    """ GPU Sampler for heterogeneous graph """
+    """ CPU Sampler for heterogeneous graph
 
-    def __init__(self, graph_list, sample_list, uva=False):
-        raise NotImplementedError
+    Args:
+
+        graph: A pgl.HeterGraph instance in numpy.
+
+        samples: A list, number of neighbors in each layer. Each element can
+                 be an int for all edge types or a dict of {edge_type: int}
+                 for the specified edge types.
+    """
+
+    def __init__(self, graph, samples):
+        assert not graph.is_tensor(), "You must call HeterGraph.numpy() first."
+        self.graph = graph
+        self.samples = samples
+        self.type_ids = dict((etype, i)
+                             for i, etype in enumerate(graph.edge_types))
+
+    def sample_neighbors(self, nodes):
+        """Sample multi-hop neighbors of given nodes.
+
+        Return:
+
+            A list of (blocks, num_dst_nodes) from the outermost layer and
+            the nodes of the outermost layer. :code:`blocks` is a dict of
+            {edge_type: pgl.Graph} which share the same relabeled nodes.
+        """
+        nodes = np.array(nodes, dtype="int64").reshape([-1])
+        graph_list = []
+        for size in self.samples:
+            if isinstance(size, dict):
+                block_etypes = list(size.keys())
+            else:
+                block_etypes = self.graph.edge_types
+
+            # sample all edge types in one call, where the neighbors are
+            # ordered by edge types and then nodes
+            neighbors, _, _, counts = self.graph.sample_typed_predecessor(
+                nodes, size)
+            edge_src, sample_index = graph_kernel.reindex_neighbors(
+                nodes, neighbors)
+            offsets = np.zeros([counts.shape[1] + 1], dtype="int64")
+            np.cumsum(counts.sum(axis=0), out=offsets[1:])
+            blocks = {}
+            for etype in block_etypes:
+                type_id = self.type_ids[etype]
+                blocks[etype] = _block_graph(
+                    edge_src[offsets[type_id]:offsets[type_id + 1]],
+                    counts[:, type_id], len(sample_index))
+            graph_list.append((blocks, len(nodes)))
+            nodes = sample_index
+        return graph_list[::-1], nodes
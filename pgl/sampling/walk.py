@@ -14,10 +14,16 @@
 """
     This package implement graph sampling algorithm.
 """
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 from pgl import graph_kernel
+from pgl.heter_graph import HeterGraph
 
-__all__ = ['random_walk', 'node2vec_walk',  'node2vec_walk_plus']
+__all__ = [
+    'random_walk', 'node2vec_walk', 'node2vec_walk_plus', 'batch_random_walk',
+    'metapath_random_walk', 'skip_gram_pairs', 'UnigramSampler'
+]
 
 
 def random_walk(graph, nodes, max_depth):
@@ -108,12 +114,11 @@ def node2vec_walk(graph, nodes, max_depth, p=1.0, q=1.0):
         num_nodes = cur_nodes.shape[0]
         nxt_nodes = np.zeros(num_nodes, dtype="int64")
 
-        for idx, (
-                succ, prev_succ, walk_id, prev_node
-        ) in enumerate(zip(cur_succs, prev_succs, cur_walk_ids, prev_nodes)):
+        for idx, (succ, prev_succ, walk_id, prev_node) in enumerate(
+                zip(cur_succs, prev_succs, cur_walk_ids, prev_nodes)):
 
-            sampled_succ = graph_kernel.node2vec_sample(succ, prev_succ,
-                                                        prev_node, p, q)
+            sampled_succ = graph_kernel.node2vec_sample(
+                succ, prev_succ, prev_node, p, q)
             walk[walk_id].append(sampled_succ)
             nxt_nodes[idx] = sampled_succ
 
@@ -167,12 +172,11 @@ def node2vec_walk_plus(graph, nodes, max_depth, p=1.0, q=1.0):
         nxt_nodes = np.zeros(num_nodes, dtype="int64")
 
         new_prev_succs = []
-        for idx, (
-                succ, prev_succ, walk_id, prev_node
-        ) in enumerate(zip(cur_succs, prev_succs, cur_walk_ids, prev_nodes)):
+        for idx, (succ, prev_succ, walk_id, prev_node) in enumerate(
+                zip(cur_succs, prev_succs, cur_walk_ids, prev_nodes)):
 
-            sampled_succ, new_prev_succ = graph_kernel.node2vec_plus_sample(succ, prev_succ.astype(np.int64),
-                                                        prev_node, p, q)
+            sampled_succ, new_prev_succ = graph_kernel.node2vec_plus_sample(
+                succ, prev_succ.astype(np.int64), prev_node, p, q)
             walk[walk_id].append(sampled_succ)
             nxt_nodes[idx] = sampled_succ
             new_prev_succs.append(new_prev_succ)
@@ -181,3 +185,289 @@ def node2vec_walk_plus(graph, nodes, max_depth, p=1.0, q=1.0):
         prev_succs = np.array(new_prev_succs, dtype=object)
         cur_nodes = nxt_nodes
     return walk
+
+
+def batch_random_walk(graph,
+                      nodes,
+                      walk_len,
+                      p=1.0,
+                      q=1.0,
+                      seed=None,
+                      num_threads=1):
+    """Implement of batched random walk and node2vec random walk.
+
+    All walkers are advanced together over the CSR arrays of the graph in
+    a compiled loop without the GIL. If p or q is not 1.0, node2vec biased
+    walks are sampled by rejection with binary search on sorted successors.
+
+    Reference paper: https://cs.stanford.edu/~jure/pubs/node2vec-kdd16.pdf.
+
+    Args:
+        graph: A pgl graph instance in numpy
+        nodes: Walk starting from nodes
+        walk_len: The number of nodes in each walk, including the start node
+        p: Return parameter
+        q: In-out parameter
+        seed: The random seed. If None, it will be drawn from numpy.random.
+        num_threads: The number of threads to walk in parallel.
+
+    Return:
+        A numpy.ndarray with shape [len(nodes), walk_len]. Walks that reach
+        nodes without successors are padded with -1.
+    """
+    assert not graph.is_tensor(), "You must call Graph.numpy() first."
+    nodes = np.array(nodes, dtype="int64").reshape([-1])
+    walks = np.full([len(nodes), walk_len], -1, dtype="int64")
+    if len(nodes) == 0 or walk_len == 0:
+        return walks
+
+    if seed is None:
+        seed = np.random.randint(0, np.iinfo(np.int64).max, dtype=np.int64)
+
+    index = graph.adj_src_index
+    indptr = np.ascontiguousarray(index._indptr, dtype="int64")
+    if p == 1.0 and q == 1.0:
+        sorted_v = np.ascontiguousarray(index._sorted_v, dtype="int64")
+    else:
+        sorted_v = index.segment_sorted_v()
+
+    def _walk(start, end):
+        graph_kernel.random_walk_batch(indptr,
+                                       sorted_v,
+                                       nodes,
+                                       walks,
+                                       start,
+                                       end,
+                                       p=p,
+                                       q=q,
+                                       seed=int(seed))
+
+    num_threads = max(1, min(num_threads, len(nodes)))
+    if num_threads == 1:
+        _walk(0, len(nodes))
+    else:
+        bounds = np.linspace(0, len(nodes), num_threads + 1).astype("int64")
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            futures = [
+                executor.submit(_walk, bounds[i], bounds[i + 1])
+                for i in range(num_threads)
+            ]
+            for future in futures:
+                future.result()
+    return walks
+
+
+def _metapath_walk_local(graph, walks, lengths, edge_types, weighted, seed):
+    """Walk a numpy HeterGraph over the CSR arrays of each edge type.
+    """
+    tables = {}
+    for etype in set(edge_types):
+        index = graph[etype].adj_src_index
+        indptr = np.ascontiguousarray(index._indptr, dtype="int64")
+        sorted_v = np.ascontiguousarray(index._sorted_v, dtype="int64")
+        alias_prob, alias_event = None, None
+        if weighted:
+            if not index.has_alias_table():
+                raise ValueError(
+                    "You must call build_alias_table on the adj_src_index "
+                    "of edge type (%s) for weighted walks." % etype)
+            alias_prob = np.ascontiguousarray(index._alias_prob,
+                                              dtype="float32")
+            alias_event = np.ascontiguousarray(index._alias_event,
+                                               dtype="int64")
+        tables[etype] = (indptr, sorted_v, alias_prob, alias_event)
+
+    for step in range(1, walks.shape[1]):
+        indptr, sorted_v, alias_prob, alias_event = \
+                tables[edge_types[(step - 1) % len(edge_types)]]
+        advanced = graph_kernel.metapath_walk_step(indptr,
+                                                   sorted_v,
+                                                   walks,
+                                                   lengths,
+                                                   step,
+                                                   alias_prob=alias_prob,
+                                                   alias_event=alias_event,
+                                                   seed=int(seed))
+        if advanced == 0:
+            break
+
+
+def _metapath_walk_dist(graph, walks, lengths, edge_types, weighted):
+    """Walk a DistGraphClient with one batched query per step.
+    """
+    if weighted:
+        raise ValueError("Weighted metapath walks are only supported "
+                         "on HeterGraph.")
+    active = np.arange(len(walks))
+    for step in range(1, walks.shape[1]):
+        cur_nodes = walks[active, step - 1]
+        # with max_degree=1, every node with successors returns exactly
+        # one edge in the order of the query
+        edges = np.asarray(graph.sample_successor(
+            cur_nodes,
+            max_degree=1,
+            edge_type=edge_types[(step - 1) % len(edge_types)],
+            return_edges=True,
+            split=False),
+                           dtype=walks.dtype).reshape([-1, 2])
+        if len(edges) == 0:
+            break
+        active = active[np.isin(cur_nodes, edges[:, 0])]
+        walks[active, step] = edges[:, 1]
+        lengths[active] += 1
+
+
+def metapath_random_walk(graph,
+                         nodes,
+                         metapath,
+                         walk_len,
+                         walk_times=1,
+                         weighted=False,
+                         seed=None):
+    """Implement of batched metapath random walk.
+
+    All walkers take one step of the same edge type together, cycling
+    through the metapath. On a numpy :code:`pgl.HeterGraph`, each step is a
+    compiled loop over the CSR arrays of the edge type. Other graphs, like
+    :code:`pgl.distributed.DistGraphClient`, are walked with one batched
+    :code:`sample_successor` query per step.
+
+    Reference paper: https://ericdongyx.github.io/papers/KDD17-dong-chawla-swami-metapath2vec.pdf.
+
+    Args:
+        graph: A numpy pgl.HeterGraph or a DistGraphClient
+        nodes: Walk starting from nodes
+        metapath: A list of edge types or a string like "c2p-p2a-a2p-p2c"
+        walk_len: The number of nodes in each walk, including the start node
+        walk_times: The number of walks from each start node
+        weighted: If True, sample each step by edge weights from the alias
+                  tables built by :code:`EdgeIndex.build_alias_table` on
+                  the :code:`adj_src_index` of each edge type.
+        seed: The random seed of HeterGraph walks. If None, it will be
+              drawn from numpy.random.
+
+    Return:
+        A tuple of (walks, lengths). walks is a numpy.ndarray with shape
+        [len(nodes) * walk_times, walk_len], where the walks of nodes[i]
+        are rows [i * walk_times, (i + 1) * walk_times). lengths holds the
+        number of nodes in each walk, and the rest of the row is padded
+        with -1 (or 0 for the uint64 ids of DistGraphClient).
+    """
+    if isinstance(metapath, str):
+        edge_types = metapath.split("-")
+    else:
+        edge_types = list(metapath)
+
+    is_local = isinstance(graph, HeterGraph)
+    if is_local:
+        assert not graph.is_tensor(), "You must call HeterGraph.numpy() first."
+        for etype in edge_types:
+            if etype not in graph.edge_types:
+                raise ValueError("Edge type (%s) is not in the graph." % etype)
+        dtype = "int64"
+    else:
+        dtype = "uint64"
+
+    nodes = np.repeat(np.array(nodes, dtype=dtype).reshape([-1]), walk_times)
+    walks = np.full([len(nodes), walk_len], -1 if is_local else 0, dtype=dtype)
+    lengths = np.zeros([len(nodes)], dtype="int64")
+    if len(nodes) == 0 or walk_len == 0:
+        return walks, lengths
+
+    walks[:, 0] = nodes
+    lengths[:] = 1
+    if is_local:
+        if seed is None:
+            seed = np.random.randint(0, np.iinfo(np.int64).max, dtype=np.int64)
+        _metapath_walk_local(graph, walks, lengths, edge_types, weighted, seed)
+    else:
+        _metapath_walk_dist(graph, walks, lengths, edge_types, weighted)
+    return walks, lengths
+
+
+def skip_gram_pairs(walks, win_size=5, keep_prob=None, seed=None):
+    """Generate skip-gram pairs for a batch of walks.
+
+    Every walk is expanded in a compiled loop, so a whole walk matrix from
+    :code:`batch_random_walk` is turned into pairs in one call instead of
+    calling :code:`graph_kernel.skip_gram_gen_pair` once per walk.
+
+    Args:
+        walks: A numpy.ndarray with shape [num_walks, walk_len]. Each walk
+               ends at its first negative entry, so the -1 padding of
+               :code:`batch_random_walk` is skipped.
+        win_size: The max window size. The window of each node is drawn
+                  uniformly from [1, win_size].
+        keep_prob: (default None) A float array indexed by node id, where
+                   node v is dropped from the walks with probability
+                   1 - keep_prob[v] before the windows are taken. See
+                   :code:`UnigramSampler.keep_prob`.
+        seed: The random seed. If None, it will be drawn from numpy.random.
+
+    Return:
+        A tuple of (src, pos) in flat numpy.ndarray of int64.
+    """
+    walks = np.ascontiguousarray(walks, dtype="int64")
+    if walks.ndim == 1:
+        walks = walks.reshape([1, -1])
+
+    if keep_prob is not None:
+        keep_prob = np.ascontiguousarray(keep_prob, dtype="float64")
+        if walks.size > 0 and walks.max() >= len(keep_prob):
+            raise ValueError("keep_prob has %s entries, but the walks "
+                             "contain node %s." %
+                             (len(keep_prob), walks.max()))
+
+    if seed is None:
+        seed = np.random.randint(0, np.iinfo(np.int64).max, dtype=np.int64)
+
+    return graph_kernel.skip_gram_gen_pair_batch(walks,
+                                                 win_size,
+                                                 keep_prob=keep_prob,
+                                                 seed=int(seed))
+
+
+class UnigramSampler(object):
+    """Sample nodes from the unigram distribution raised to a power.
+
+    The sampling distribution is counts ** power, with an alias table for
+    O(1) draws. power=0.75 is the negative sampling distribution of
+    word2vec and DeepWalk.
+
+    Args:
+        counts: The frequency (or the degree) of each node.
+        power: (default 0.75) The power applied to counts.
+    """
+    def __init__(self, counts, power=0.75):
+        self.counts = np.asarray(counts, dtype="float64").reshape([-1])
+        if np.any(self.counts < 0):
+            raise ValueError("counts should be non-negative.")
+        probs = np.power(self.counts, power)
+        probs[self.counts == 0] = 0
+        total = probs.sum()
+        if total <= 0:
+            raise ValueError("counts should have at least one positive entry.")
+        self.alias, self.events = graph_kernel.alias_sample_build_table(probs /
+                                                                        total)
+
+    def sample(self, size):
+        """Draw nodes with shape of size.
+        """
+        rand_num = np.random.uniform(0.0, len(self.alias), size)
+        idx = np.minimum(rand_num.astype("int64"), len(self.alias) - 1)
+        flags = (rand_num - idx) >= self.alias[idx]
+        idx[flags] = self.events[idx[flags]]
+        return idx
+
+    def keep_prob(self, threshold=1e-3):
+        """The probability to keep each node when subsampling frequent nodes.
+
+        Node v with frequency f is kept with (sqrt(f / threshold) + 1) *
+        threshold / f, clipped to 1, as word2vec does.
+        """
+        freq = self.counts / self.counts.sum()
+        prob = np.ones_like(freq)
+        mask = freq > 0
+        prob[mask] = (np.sqrt(freq[mask] / threshold) +
+                      1) * threshold / freq[mask]
+        return np.minimum(prob, 1.0)
@@ -23,6 +23,7 @@ import paddle
 from pgl.utils import mp_reader
 from pgl.utils.data.dataset import Dataset, StreamDataset
 from pgl.utils.data.sampler import Sampler, StreamSampler
+from pgl.utils.data.worker_pool import WorkerPool
 
 WorkerInfo = namedtuple("WorkerInfo", ["num_workers", "fid"])
 
@@ -62,6 +63,28 @@ class Dataloader(object):
             for batch_data in loader:
                 print(batch_data)
 
+    Setting :code:`use_shared_memory=True` with :code:`num_workers > 1` sends
+    the numpy arrays of each batch (including the arrays inside pgl graphs)
+    through reusable shared memory blocks instead of pickling them. The arrays
+    of a batch are zero-copy views which are only valid until the next batch
+    is requested.
+
+    By default, batches are assigned to workers round-robin and yielded in
+    order. Setting :code:`load_balance=True` lets idle workers pull the next
+    batch from a shared work queue and yields the batches as they complete,
+    so that a slow batch does not stall the other workers. Set
+    :code:`ordered=True` to keep the order of the sampler in this mode. At
+    most :code:`prefetch_depth` finished batches of each worker wait for the
+    trainer, and the throughput and latency counters of each worker are
+    available in :code:`loader.worker_stats` after iterating.
+
+    With :code:`persistent_workers=True`, the worker processes, together with
+    the dataset and any graph they hold, are kept alive between epochs
+    instead of being started again for every epoch, and their random seeds
+    are reset at the start of every epoch. Call :code:`loader.close()` to
+    stop them, otherwise they are stopped when the loader is garbage
+    collected or the program exits.
+
     """
 
     def __init__(self,
@@ -72,7 +95,12 @@ class Dataloader(object):
                  num_workers=1,
                  collate_fn=None,
                  buf_size=1000,
-                 stream_shuffle_size=0):
+                 stream_shuffle_size=0,
+                 use_shared_memory=False,
+                 load_balance=False,
+                 ordered=False,
+                 prefetch_depth=2,
+                 persistent_workers=False):
 
         self.dataset = dataset
         self.batch_size = batch_size
@@ -82,6 +110,13 @@ class Dataloader(object):
         self.buf_size = buf_size
         self.drop_last = drop_last
         self.stream_shuffle_size = stream_shuffle_size
+        self.use_shared_memory = use_shared_memory
+        self.load_balance = load_balance
+        self.ordered = ordered
+        self.prefetch_depth = prefetch_depth
+        self.persistent_workers = persistent_workers
+        self.worker_stats = []
+        self._worker_pool = None
 
         if self.shuffle and isinstance(self.dataset, StreamDataset):
             warn_msg = "The argument [shuffle] should not be True with StreamDataset. " \
@@ -104,6 +139,18 @@ class Dataloader(object):
             raise ValueError("num_workers(default: 1) should be larger than 0, " \
                         "but got [num_workers=%s] < 1." % self.num_workers)
 
+        if self.load_balance and isinstance(self.dataset, StreamDataset):
+            raise ValueError("[load_balance] is only supported with Dataset, " \
+                    "since workers of StreamDataset read their own stream.")
+
+        if self.persistent_workers and isinstance(self.dataset, StreamDataset):
+            raise ValueError("[persistent_workers] is only supported with Dataset, " \
+                    "since workers of StreamDataset read their own stream.")
+
+        if self.prefetch_depth < 1:
+            raise ValueError("prefetch_depth(default: 2) should be larger than 0, " \
+                        "but got [prefetch_depth=%s] < 1." % self.prefetch_depth)
+
         if isinstance(self.dataset, StreamDataset):  # for stream data
             # generating a iterable sequence for produce batch data without repetition
             self.sampler = StreamSampler(
@@ -127,6 +174,28 @@ class Dataloader(object):
         # random seed will be fixed when using multiprocess, 
         # so set seed explicitly every time
         np.random.seed()
+        if (self.load_balance or self.persistent_workers) and \
+                self.num_workers > 1:
+            pool = self._worker_pool
+            if pool is None or not pool.is_alive:
+                pool = WorkerPool(
+                    self.dataset,
+                    self.collate_fn,
+                    self.num_workers,
+                    prefetch_depth=self.prefetch_depth,
+                    # without load_balance (persistent mode), the reorder
+                    # buffer of the pool keeps the order of the sampler
+                    ordered=self.ordered or not self.load_balance,
+                    use_shared_memory=self.use_shared_memory,
+                    persistent=self.persistent_workers)
+                if self.persistent_workers:
+                    self._worker_pool = pool
+            self.worker_stats = pool.stats
+            seed = np.random.randint(0, 2**31)
+            for batch in pool.run(self.sampler, seed):
+                yield batch
+            return
+
         if self.num_workers == 1:
             r = paddle.reader.buffered(_DataLoaderIter(self, 0), self.buf_size)
         else:
@@ -134,8 +203,17 @@ class Dataloader(object):
                 _DataLoaderIter(self, wid) for wid in range(self.num_workers)
             ]
             workers = mp_reader.multiprocess_reader(
-                worker_pool, use_pipe=True, queue_size=1000)
-            r = paddle.reader.buffered(workers, self.buf_size)
+                worker_pool,
+                use_pipe=True,
+                queue_size=1000,
+                use_shared_memory=self.use_shared_memory)
+            if self.use_shared_memory:
+                # The shared memory blocks already work as the buffer.
+                # A batch is recycled when the next one is requested,
+                # so it should not be prefetched.
+                r = workers
+            else:
+                r = paddle.reader.buffered(workers, self.buf_size)
 
         for batch in r():
             yield batch
@@ -143,6 +221,18 @@ class Dataloader(object):
     def __call__(self):
         return self.__iter__()
 
+    def close(self):
+        """Stop the persistent workers."""
+        if self._worker_pool is not None:
+            self._worker_pool.close()
+            self._worker_pool = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
 
 class _DataLoaderIter(object):
     """Iterable DataLoader Object
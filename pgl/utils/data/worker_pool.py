@@ -0,0 +1,387 @@
+# Copyright (c) 2022 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""worker pool with dynamic scheduling for Dataloader
+"""
+import time
+import queue
+import atexit
+import weakref
+import random
+import traceback
+import multiprocessing
+from collections import namedtuple
+
+import numpy as np
+
+from pgl.utils.shm_transport import ShmWriter, ShmReader, ensure_resource_tracker
+
+_Task = namedtuple("_Task", ["epoch", "seed", "batch_id", "indices"])
+
+_Result = namedtuple("_Result",
+                     ["worker_id", "epoch", "batch_id", "data", "cost"])
+
+
+def _close_pool(pool_ref):
+    pool = pool_ref()
+    if pool is not None:
+        pool.close()
+
+
+class _WorkerError(object):
+    def __init__(self, message):
+        self.message = message
+
+
+def _worker_loop(dataset, collate_fn, worker_id, task_queue, result_queue,
+                 prefetch_sem, release_queue, num_shm_blocks):
+    """Pull batch indices from the task queue until receiving None."""
+    epoch = None
+    writer = None
+    if release_queue is not None:
+        writer = ShmWriter(release_queue, num_blocks=num_shm_blocks)
+
+    try:
+        while True:
+            # at most prefetch_depth batches of this worker are waiting
+            # for the trainer
+            prefetch_sem.acquire()
+            task = task_queue.get()
+            if task is None:
+                break
+
+            if task.epoch != epoch:
+                # reseed for every epoch of persistent workers
+                epoch = task.epoch
+                seed = (task.seed + worker_id) % (2**32)
+                np.random.seed(seed)
+                random.seed(seed)
+
+            start = time.time()
+            try:
+                batch_data = [dataset[i] for i in task.indices]
+                if collate_fn is not None:
+                    batch_data = collate_fn(batch_data)
+                if writer is not None:
+                    batch_data = writer.write(batch_data)
+            except Exception:
+                result_queue.put(
+                    _Result(worker_id, task.epoch, task.batch_id,
+                            _WorkerError(traceback.format_exc()), 0.0))
+                break
+            result_queue.put(
+                _Result(worker_id, task.epoch, task.batch_id, batch_data,
+                        time.time() - start))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+class WorkerStats(object):
+    """Throughput and latency counters of one worker.
+
+    Args:
+
+        worker_id: The id of the worker.
+
+    Attributes:
+
+        num_batches: The number of batches produced by the worker.
+
+        busy_time: The seconds spent by the worker on loading and collating.
+
+        total_latency: The sum of seconds between dispatching a batch and
+                       receiving it in the trainer.
+    """
+
+    def __init__(self, worker_id):
+        self.worker_id = worker_id
+        self.num_batches = 0
+        self.busy_time = 0.0
+        self.total_latency = 0.0
+
+    def update(self, cost, latency):
+        self.num_batches += 1
+        self.busy_time += cost
+        self.total_latency += latency
+
+    @property
+    def throughput(self):
+        """Batches per busy second."""
+        if self.busy_time <= 0:
+            return 0.0
+        return self.num_batches / self.busy_time
+
+    @property
+    def avg_latency(self):
+        if self.num_batches == 0:
+            return 0.0
+        return self.total_latency / self.num_batches
+
+    def __repr__(self):
+        return "WorkerStats(worker_id=%s, num_batches=%s, " \
+                "throughput=%.3f batch/s, avg_latency=%.4f s)" % (
+                self.worker_id, self.num_batches, self.throughput,
+                self.avg_latency)
+
+
+class WorkerPool(object):
+    """A pool of worker processes pulling batches from a shared work queue.
+
+    Instead of assigning batches round-robin, every idle worker takes the
+    next batch indices from one task queue, so a slow batch only delays the
+    worker computing it. Results are yielded as soon as they arrive, or in
+    the order of the batches if :code:`ordered` is True.
+
+    Args:
+
+        dataset: A map-style pgl.utils.data.Dataset.
+
+        collate_fn: The function to collate the examples of a batch.
+
+        num_workers: The number of worker processes.
+
+        prefetch_depth: The max number of finished batches of each worker
+                        waiting for the trainer.
+
+        ordered: Whether to yield the batches in the order of the sampler.
+
+        use_shared_memory: Whether to send the batches with shared memory.
+
+        persistent: Whether to keep the workers alive between epochs. The
+                    dataset and collate_fn are sent to the workers only once,
+                    and the workers are reseeded at the start of every epoch.
+                    Call :code:`close` to stop them.
+    """
+
+    def __init__(self,
+                 dataset,
+                 collate_fn,
+                 num_workers,
+                 prefetch_depth=2,
+                 ordered=False,
+                 use_shared_memory=False,
+                 persistent=False):
+        if prefetch_depth < 1:
+            raise ValueError("prefetch_depth should be larger than 0, " \
+                    "but got [prefetch_depth=%s] < 1." % prefetch_depth)
+        self.dataset = dataset
+        self.collate_fn = collate_fn
+        self.num_workers = num_workers
+        self.prefetch_depth = prefetch_depth
+        self.ordered = ordered
+        self.use_shared_memory = use_shared_memory
+        self.persistent = persistent
+        self.stats = [WorkerStats(wid) for wid in range(num_workers)]
+        self._workers = []
+        self._reorder_buffer = {}
+        self._epoch = 0
+        self._failed = False
+
+    @property
+    def is_alive(self):
+        return len(self._workers) > 0
+
+    def _start(self):
+        self._failed = False
+        self.task_queue = multiprocessing.Queue()
+        self.result_queue = multiprocessing.Queue()
+        self.prefetch_sems = []
+        self.shm_readers = []
+        if self.use_shared_memory:
+            ensure_resource_tracker()
+
+        # In ordered mode, the results waiting for an earlier batch keep
+        # their shared memory blocks.
+        if self.ordered:
+            num_shm_blocks = self.num_workers * self.prefetch_depth + 1
+        else:
+            num_shm_blocks = self.prefetch_depth + 1
+
+        for wid in range(self.num_workers):
+            prefetch_sem = multiprocessing.Semaphore(self.prefetch_depth)
+            release_queue = None
+            if self.use_shared_memory:
+                release_queue = multiprocessing.Queue()
+                self.shm_readers.append(ShmReader(release_queue))
+            p = multiprocessing.Process(
+                target=_worker_loop,
+                args=(self.dataset, self.collate_fn, wid, self.task_queue,
+                      self.result_queue, prefetch_sem, release_queue,
+                      num_shm_blocks))
+            p.daemon = True
+            try:
+                p.start()
+            except:
+                raise RuntimeError(
+                    f"The program met some problems. If your system is Mac OS and python >= 3.8, "
+                    f"please checkout https://github.com/PaddlePaddle/PGL/issues/305 to fix the problem."
+                )
+            self.prefetch_sems.append(prefetch_sem)
+            self._workers.append(p)
+
+        if self.persistent:
+            # stop the workers before multiprocessing terminates them at
+            # exit, so that their shared memory blocks are unlinked
+            atexit.register(_close_pool, weakref.ref(self))
+
+    def _receive(self):
+        while True:
+            try:
+                result = self.result_queue.get(timeout=1)
+            except queue.Empty:
+                for wid, p in enumerate(self._workers):
+                    if not p.is_alive():
+                        self._failed = True
+                        raise RuntimeError(
+                            "DataLoader worker %s exited unexpectedly "
+                            "with exitcode %s." % (wid, p.exitcode))
+                continue
+            # the worker can prefetch another batch
+            self.prefetch_sems[result.worker_id].release()
+            if result.epoch == self._epoch:
+                break
+            # left by an epoch stopped in the middle
+            self._discard(result)
+
+        if isinstance(result.data, _WorkerError):
+            self._failed = True
+            raise RuntimeError("DataLoader worker %s failed:\n%s" %
+                               (result.worker_id, result.data.message))
+        return result
+
+    def _consume(self, result):
+        """Yield the data of the result and recycle its shared memory."""
+        if not self.use_shared_memory:
+            yield result.data
+            return
+
+        shm_reader = self.shm_readers[result.worker_id]
+        data = shm_reader.read(result.data)
+        try:
+            yield data
+        finally:
+            del data
+            shm_reader.release(result.data)
+
+    def run(self, batches, seed):
+        """Run one epoch and yield the collated batches.
+
+        Args:
+
+            batches: An iterable of batch indices.
+
+            seed: The random seed of the workers, worker i uses seed + i.
+        """
+        if not self.is_alive:
+            self._start()
+        self._epoch += 1
+        try:
+            for data in self._schedule(batches, seed):
+                yield data
+        finally:
+            if self.persistent and not self._failed:
+                self._cancel()
+            else:
+                self.close()
+
+    def _cancel(self):
+        """Drop the remaining tasks of the current epoch."""
+        while True:
+            try:
+                self.task_queue.get_nowait()
+            except queue.Empty:
+                break
+        for result in self._reorder_buffer.values():
+            self._discard(result)
+        self._reorder_buffer = {}
+
+    def _schedule(self, batches, seed):
+        # At most num_workers * prefetch_depth batches are dispatched but not
+        # yielded, which also bounds the reorder buffer of the ordered mode.
+        max_inflight = self.num_workers * self.prefetch_depth
+        batches = iter(batches)
+        dispatch_time = {}
+        reorder_buffer = self._reorder_buffer = {}
+        num_dispatched = 0
+        next_batch_id = 0
+        exhausted = False
+
+        while True:
+            while not exhausted and num_dispatched - next_batch_id < max_inflight:
+                try:
+                    indices = next(batches)
+                except StopIteration:
+                    exhausted = True
+                    break
+                dispatch_time[num_dispatched] = time.time()
+                self.task_queue.put(
+                    _Task(self._epoch, seed, num_dispatched, indices))
+                num_dispatched += 1
+
+            if next_batch_id == num_dispatched:
+                break
+
+            result = self._receive()
+            self.stats[result.worker_id].update(
+                result.cost,
+                time.time() - dispatch_time.pop(result.batch_id))
+
+            if not self.ordered:
+                next_batch_id += 1
+                for data in self._consume(result):
+                    yield data
+                continue
+
+            reorder_buffer[result.batch_id] = result
+            while next_batch_id in reorder_buffer:
+                result = reorder_buffer.pop(next_batch_id)
+                next_batch_id += 1
+                for data in self._consume(result):
+                    yield data
+
+    def _discard(self, result):
+        if self.use_shared_memory and not isinstance(result.data,
+                                                     _WorkerError):
+            self.shm_readers[result.worker_id].release(result.data)
+
+    def close(self, timeout=10):
+        """Stop the workers and release the queues."""
+        if len(self._workers) == 0:
+            return
+
+        self._cancel()
+        for _ in self._workers:
+            self.task_queue.put(None)
+        # unblock the workers waiting for prefetch quota
+        for prefetch_sem in self.prefetch_sems:
+            for _ in range(self.prefetch_depth + 1):
+                prefetch_sem.release()
+
+        # Drain the results so that the workers can flush their queues and
+        # get their shared memory blocks back before exiting.
+        deadline = time.time() + timeout
+        while any(p.is_alive() for p in self._workers) and \
+                time.time() < deadline:
+            try:
+                self._discard(self.result_queue.get(timeout=0.05))
+            except queue.Empty:
+                pass
+
+        for p in self._workers:
+            p.join(timeout=1)
+            if p.is_alive():
+                p.terminate()
+        for shm_reader in self.shm_readers:
+            shm_reader.close()
+        self._workers = []
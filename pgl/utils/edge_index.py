@@ -16,6 +16,7 @@
 import os
 import json
 import copy
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 import paddle
@@ -91,9 +92,144 @@ Sorted edges and represent edges in compressed style like csc_matrix or csr_matr
             os.path.join(path, 'sorted_eid.npy'), mmap_mode=mmap_mode)
         self._indptr = np.load(
             os.path.join(path, 'indptr.npy'), mmap_mode=mmap_mode)
+        if os.path.exists(os.path.join(path, 'alias_prob.npy')):
+            self._alias_prob = np.load(
+                os.path.join(path, 'alias_prob.npy'), mmap_mode=mmap_mode)
+            self._alias_event = np.load(
+                os.path.join(path, 'alias_event.npy'), mmap_mode=mmap_mode)
         self._is_tensor = False
         return self
 
+    @classmethod
+    def build_on_disk(cls,
+                      edges,
+                      num_nodes,
+                      path,
+                      sort_by="src",
+                      num_threads=1):
+        """Build EdgeIndex into memory-mapped files for graphs larger than memory.
+
+        Edges are streamed from a (memory-mapped) array in contiguous chunks,
+        one chunk for each thread. The first pass counts the degrees of each
+        chunk, and their prefix sums give every chunk its own write cursors,
+        so the second pass scatters each chunk into the memory-mapped output
+        files once, keeping the original order of edges of each node. Both
+        passes run in parallel threads without the GIL and read the edges
+        once. Edges that are not int64 are converted block by block while
+        streaming, so they are never loaded into memory at once. The output
+        can be read by :code:`EdgeIndex.load`.
+
+        Args:
+
+            edges: A numpy.ndarray with shape [num_edges, 2] or the path of
+                   an :code:`edges.npy` file, which will be memory-mapped.
+
+            num_nodes: The number of nodes.
+
+            path: The output directory of the EdgeIndex.
+
+            sort_by: Build the index of "src" (adj_src) or "dst" (adj_dst).
+
+            num_threads: The number of threads to build the index.
+
+        Return:
+
+            A memory-mapped EdgeIndex loaded from path.
+        """
+        if sort_by not in ["src", "dst"]:
+            raise ValueError("sort_by should be in 'src' or 'dst'.")
+        if isinstance(edges, str):
+            edges = np.load(edges, mmap_mode="r")
+        col = 0 if sort_by == "src" else 1
+        num_nodes = int(num_nodes)
+        num_edges = edges.shape[0]
+        num_threads = max(1, num_threads)
+
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        def _open(name, size):
+            return np.lib.format.open_memmap(
+                os.path.join(path, name),
+                mode="w+",
+                dtype="int64",
+                shape=(size, ))
+
+        def _run(func):
+            if num_threads == 1:
+                func(0)
+            else:
+                with ThreadPoolExecutor(max_workers=num_threads) as executor:
+                    futures = [
+                        executor.submit(func, chunk)
+                        for chunk in range(num_threads)
+                    ]
+                    for future in futures:
+                        future.result()
+
+        edge_bounds = np.linspace(0, num_edges, num_threads + 1).astype(
+            "int64")
+
+        def _blocks(chunk):
+            # yield (int64 edges, start, end, eid_offset) of the edge chunk
+            start, end = edge_bounds[chunk], edge_bounds[chunk + 1]
+            if edges.dtype == np.int64:
+                yield edges, start, end, 0
+                return
+            block_size = 1 << 22
+            for low in range(start, end, block_size):
+                high = min(low + block_size, end)
+                block = np.asarray(edges[low:high], dtype="int64")
+                yield block, 0, high - low, low
+
+        def _count(chunk):
+            for block, start, end, _ in _blocks(chunk):
+                graph_kernel.count_degree_by_chunk(block, col, start, end,
+                                                   partial[chunk])
+
+        def _scatter(chunk):
+            for block, start, end, eid_offset in _blocks(chunk):
+                graph_kernel.scatter_index_by_chunk(
+                    block, col, start, end, partial[chunk], sorted_v,
+                    sorted_u, sorted_eid, eid_offset)
+
+        # the degrees of each edge chunk, which become its cursors
+        partial_path = os.path.join(path, "partial_degree.npy")
+        partial = np.lib.format.open_memmap(
+            partial_path,
+            mode="w+",
+            dtype="int64",
+            shape=(num_threads, num_nodes))
+        _run(_count)
+
+        degree = _open("degree.npy", num_nodes)
+        indptr = _open("indptr.npy", num_nodes + 1)
+        indptr[0] = 0
+        block_size = 1 << 20
+        for low in range(0, num_nodes, block_size):
+            high = min(low + block_size, num_nodes)
+            np.sum(partial[:, low:high], axis=0, out=degree[low:high])
+        np.cumsum(degree, out=indptr[1:])
+        for low in range(0, num_nodes, block_size):
+            high = min(low + block_size, num_nodes)
+            cursor = indptr[low:high].copy()
+            for chunk in range(num_threads):
+                count = partial[chunk, low:high].copy()
+                partial[chunk, low:high] = cursor
+                cursor += count
+
+        sorted_v = _open("sorted_v.npy", num_edges)
+        sorted_u = _open("sorted_u.npy", num_edges)
+        sorted_eid = _open("sorted_eid.npy", num_edges)
+        _run(_scatter)
+        del partial
+        os.remove(partial_path)
+
+        for array in [degree, indptr, sorted_v, sorted_u, sorted_eid]:
+            array.flush()
+        del degree, indptr, sorted_v, sorted_u, sorted_eid
+        return cls.load(path, mmap_mode="r")
+
     @property
     def degree(self):
         """Return the degree of nodes.
@@ -126,6 +262,85 @@ Sorted edges and represent edges in compressed style like csc_matrix or csr_matr
                 return graph_kernel.slice_by_index(
                     self._sorted_eid, self._indptr, index=u)
 
+    def build_alias_table(self, weights):
+        """Build alias tables of v for each u with edge weights.
+
+        The alias tables are stored in flat arrays aligned to the sorted
+        eids, and they will be persisted by :code:`dump`.
+
+        Args:
+
+            weights: The non-negative weights of edges with shape [num_edges],
+                     which is indexed by edge id.
+        """
+        if self._is_tensor:
+            raise NotImplementedError("not implemented!")
+        weights = np.asarray(weights).reshape([-1])
+        sorted_weights = weights[self._sorted_eid].astype("float64")
+        self._alias_prob, self._alias_event = \
+                graph_kernel.build_alias_table_by_segment(
+                    self._indptr, sorted_weights)
+        return self
+
+    def has_alias_table(self):
+        """Return whether the alias tables have been built.
+        """
+        return getattr(self, "_alias_prob", None) is not None
+
+    def sample_flat(self, u, max_degree, shuffle=False, weighted=False):
+        """Sample v for given u and return flat arrays.
+
+        Args:
+
+            u: The nodes to be sampled.
+
+            max_degree: The max sampled v for each u. If :code:`max_degree < 0`,
+                        all v will be returned.
+
+            shuffle: Whether to shuffle the v of u with degree smaller than max_degree.
+
+            weighted: Whether to sample v with replacement by the alias tables
+                      built from :code:`build_alias_table`. Every u draws
+                      max_degree v (or as many as its degree if max_degree < 0),
+                      and v with zero weight are never drawn.
+
+        Return:
+
+            A tuple of (v, eid, counts) in numpy.ndarray, the sampled v of u[i]
+            are v[offset[i]:offset[i] + counts[i]] where offset is the cumsum
+            of counts.
+        """
+        if self._is_tensor:
+            raise NotImplementedError("not implemented!")
+        else:
+            u = np.array(u, dtype="int64").reshape([-1])
+            if weighted:
+                if not self.has_alias_table():
+                    raise ValueError(
+                        "You must call build_alias_table first for weighted sampling."
+                    )
+                return graph_kernel.sample_neighbors_alias(
+                    self._indptr, self._sorted_v, self._sorted_eid,
+                    self._alias_prob, self._alias_event, u, max_degree)
+            return graph_kernel.sample_neighbors_flat(
+                self._indptr,
+                self._sorted_v,
+                self._sorted_eid,
+                u,
+                max_degree,
+                shuffle=shuffle)
+
+    def segment_sorted_v(self):
+        """Return the v sorted within each u, which allows binary search
+        on the v of given u.
+        """
+        if self._is_tensor:
+            raise NotImplementedError("not implemented!")
+        if getattr(self, "_segment_sorted_v", None) is None:
+            self._segment_sorted_v = graph_kernel.sort_by_segment(
+                self._indptr, self._sorted_v)
+        return self._segment_sorted_v
+
     def triples(self):
         """Return the sorted (u, v, eid) tuples.
         """
@@ -217,3 +432,165 @@ Sorted edges and represent edges in compressed style like csc_matrix or csr_matr
             np.save(os.path.join(path, 'sorted_u.npy'), self._sorted_u)
             np.save(os.path.join(path, 'sorted_eid.npy'), self._sorted_eid)
             np.save(os.path.join(path, 'indptr.npy'), self._indptr)
+            if self.has_alias_table():
+                np.save(
+                    os.path.join(path, 'alias_prob.npy'), self._alias_prob)
+                np.save(
+                    os.path.join(path, 'alias_event.npy'), self._alias_event)
+
+
+class TypedEdgeIndex(EdgeIndex):
+    """Indexing edges of multiple edge types in one compressed structure.
+
+    The v of each u are grouped by edge type, so the neighbors of all (or a
+    subset of) edge types can be sampled for a batch of u in one call. The
+    eids are the edge ids within their own edge type.
+
+    Args:
+        u_list: A list of u arrays, one for each edge type.
+        v_list: A list of v arrays, one for each edge type.
+        num_nodes: The exactive number of nodes.
+    """
+
+    @classmethod
+    def from_typed_edges(cls, u_list, v_list, num_nodes):
+        num_edges = [len(u) for u in u_list]
+        etype = np.repeat(
+            np.arange(
+                len(u_list), dtype="int64"), num_edges)
+        eid_offset = np.zeros([len(u_list) + 1], dtype="int64")
+        np.cumsum(num_edges, out=eid_offset[1:])
+
+        u = np.concatenate(
+            [np.asarray(
+                u, dtype="int64") for u in u_list] + [np.zeros(
+                    [0], dtype="int64")])
+        v = np.concatenate(
+            [np.asarray(
+                v, dtype="int64") for v in v_list] + [np.zeros(
+                    [0], dtype="int64")])
+
+        # build_index is a stable counting sort, so the edges of each u
+        # stay grouped by edge type.
+        self = cls()
+        self._is_tensor = False
+        self._degree, self._sorted_v, self._sorted_u, \
+            sorted_eid, self._indptr = graph_kernel.build_index(u, v, num_nodes)
+        self._sorted_etype = etype[sorted_eid]
+        self._sorted_eid = sorted_eid - eid_offset[self._sorted_etype]
+        self._num_types = len(u_list)
+        return self
+
+    @property
+    def num_types(self):
+        """Return the number of edge types.
+        """
+        return self._num_types
+
+    def sample_flat(self, u, max_degree, shuffle=False):
+        """Sample v of all edge types for given u and return flat arrays.
+
+        Args:
+
+            u: The nodes to be sampled.
+
+            max_degree: An int for all edge types or a list with the max
+                        sampled v of each edge type. A negative value returns
+                        all v of the edge type and 0 skips the edge type.
+
+            shuffle: Whether to shuffle the v of u with degree smaller than max_degree.
+
+        Return:
+
+            A tuple of (v, eid, etype, counts) in numpy.ndarray. The counts
+            with shape [len(u), num_types] is the number of sampled v of each
+            u and edge type, and v are ordered by edge type and then u.
+        """
+        if self._is_tensor:
+            raise NotImplementedError("not implemented!")
+        u = np.array(u, dtype="int64").reshape([-1])
+        if np.isscalar(max_degree):
+            max_degree = [max_degree] * self._num_types
+        max_degree = np.array(max_degree, dtype="int64").reshape([-1])
+        if len(max_degree) != self._num_types:
+            raise ValueError("The length of max_degree should be %s." %
+                             self._num_types)
+        return graph_kernel.sample_typed_neighbors_flat(
+            self._indptr,
+            self._sorted_v,
+            self._sorted_eid,
+            self._sorted_etype,
+            u,
+            max_degree,
+            shuffle=shuffle)
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        """Load TypedEdgeIndex from path and return a TypedEdgeIndex in numpy.
+
+        Args:
+
+            path: The directory path of the stored TypedEdgeIndex.
+
+            mmap_mode: Default :code:`mmap_mode="r"`. If not None, memory-map the index.
+        """
+        self = super(TypedEdgeIndex, cls).load(path, mmap_mode=mmap_mode)
+        self._sorted_etype = np.load(
+            os.path.join(path, 'sorted_etype.npy'), mmap_mode=mmap_mode)
+        self._num_types = int(np.load(os.path.join(path, 'num_types.npy')))
+        return self
+
+    def _from_arrays(self, convert):
+        other = TypedEdgeIndex.from_index(
+            sorted_v=convert(self._sorted_v),
+            sorted_u=convert(self._sorted_u),
+            sorted_eid=convert(self._sorted_eid),
+            indptr=convert(self._indptr),
+            degree=convert(self._degree))
+        other._sorted_etype = convert(self._sorted_etype)
+        other._num_types = self._num_types
+        return other
+
+    def tensor(self, inplace=True, uva=False):
+        """Convert the TypedEdgeIndex into paddle.Tensor format.
+
+        Args:
+
+            inplace: (Default True) Whether to convert the index into tensor inplace.
+            uva: (Default False) Whether to convert the index into UVA tensor mode.
+        """
+        if self._is_tensor:
+            return self
+
+        if not paddle.device.is_compiled_with_cuda() and uva:
+            raise ValueError("uva mode should be run under gpu environment!")
+
+        other = self._from_arrays(lambda x: to_paddle_tensor(x, uva))
+        if inplace:
+            self.__dict__.update(other.__dict__)
+            return self
+        return other
+
+    def numpy(self, inplace=True):
+        """Convert the TypedEdgeIndex into numpy format.
+
+        Args:
+
+            inplace: (Default True) Whether to convert the index into numpy inplace.
+        """
+        if not self._is_tensor:
+            return self
+
+        other = self._from_arrays(lambda x: x.numpy())
+        if inplace:
+            self.__dict__.update(other.__dict__)
+            return self
+        return other
+
+    def dump(self, path):
+        if self._is_tensor:
+            self.numpy(inplace=False).dump(path)
+        else:
+            super(TypedEdgeIndex, self).dump(path)
+            np.save(os.path.join(path, 'sorted_etype.npy'), self._sorted_etype)
+            np.save(os.path.join(path, 'num_types.npy'), self._num_types)
@@ -32,6 +32,10 @@ def check_is_tensor(*data):
 def to_paddle_tensor(data, uva=False):
     """Convert a numpy ndarray to paddle.Tensor.
     """
+    if not isinstance(data, np.ndarray) and not check_is_tensor(data) and \
+            hasattr(data, "__array__"):
+        # array-like views, e.g. pgl.sampling.LazyFeature
+        data = np.asarray(data)
     if not uva:
         data = paddle.to_tensor(data)
     else:
@@ -29,6 +29,8 @@ from multiprocessing import Queue
 import threading
 from collections import namedtuple
 
+from pgl.utils.shm_transport import ShmWriter, ShmReader, ensure_resource_tracker
+
 _np_serialized_data = namedtuple("_np_serialized_data",
                                  ["value", "shape", "dtype"])
 
@@ -50,7 +52,8 @@ def index_iter(data):
 
 def numpy_serialize_data(data):
     """serialize_data"""
-    ret_data = copy.deepcopy(data)
+    # Only the top level items are replaced, a shallow copy is enough.
+    ret_data = copy.copy(data)
 
     if isinstance(ret_data, (dict, list)):
         for key in index_iter(ret_data):
@@ -81,7 +84,12 @@ def deserialize_data(data):
     return numpy_deserialize_data(data)
 
 
-def multiprocess_reader(readers, use_pipe=True, queue_size=1000, pipe_size=10):
+def multiprocess_reader(readers,
+                        use_pipe=True,
+                        queue_size=1000,
+                        pipe_size=10,
+                        use_shared_memory=False,
+                        num_shm_blocks=4):
     """
     multiprocess_reader use python multi process to read data from readers
     and then use multiprocess.Queue or multiprocess.Pipe to merge all
@@ -91,6 +99,14 @@ def multiprocess_reader(readers, use_pipe=True, queue_size=1000, pipe_size=10):
     platform does not support.
     you need to create multiple readers first, these readers should be independent
     to each other so that each process can work independently.
+
+    If use_shared_memory is True, the numpy arrays of each sample (including
+    the arrays inside pgl graphs) are written into a ring of num_shm_blocks
+    reusable shared memory blocks per reader, and only small descriptors go
+    through the Pipe or Queue. The yielded arrays are zero-copy views of the
+    shared memory and are only valid until the next sample is requested.
+    Copy them if they should be kept longer.
+
     An example:
     .. code-block:: python
         reader0 = reader(["file01", "file02"])
@@ -102,78 +118,115 @@ def multiprocess_reader(readers, use_pipe=True, queue_size=1000, pipe_size=10):
 
     assert type(readers) is list and len(readers) > 0
 
-    def _read_into_queue(reader, queue):
+    def _start_process(target, args):
+        p = multiprocessing.Process(target=target, args=args)
+        try:
+            p.start()
+        except:
+            raise RuntimeError(
+                f"The program met some problems. If your system is Mac OS and python >= 3.8, "
+                f"please checkout https://github.com/PaddlePaddle/PGL/issues/305 to fix the problem."
+            )
+
+    def _sample_iter(reader, release_queue):
+        """yield the messages to send, the last one is None"""
+        if release_queue is None:
+            for sample in reader():
+                if sample is None:
+                    raise ValueError("sample has None")
+                yield serialize_data(sample)
+            yield serialize_data(None)
+        else:
+            writer = ShmWriter(release_queue, num_blocks=num_shm_blocks)
+            try:
+                for sample in reader():
+                    if sample is None:
+                        raise ValueError("sample has None")
+                    yield writer.write(sample)
+                yield None
+            finally:
+                writer.close()
+
+    def _read_into_queue(reader, queue, release_queue):
         """read_into_queue"""
-        for sample in reader():
-            if sample is None:
-                raise ValueError("sample has None")
-            queue.put(serialize_data(sample))
-        queue.put(serialize_data(None))
+        for message in _sample_iter(reader, release_queue):
+            queue.put(message)
+
+    def _read_into_pipe(reader, conn, max_pipe_size, release_queue):
+        """read_into_pipe"""
+        for message in _sample_iter(reader, release_queue):
+            conn.send(message)
+        conn.close()
+
+    def _merge_reader(channels, receive, release_queues):
+        """yield samples from all alive channels in turn"""
+        if use_shared_memory:
+            shm_readers = [
+                ShmReader(release_queue) for release_queue in release_queues
+            ]
+        reader_num = len(readers)
+        alive_indices = [i for i in range(reader_num)]
+        try:
+            while len(alive_indices) > 0:
+                for alive_index in [i for i in alive_indices]:
+                    message = receive(channels[alive_index])
+                    if message is None:
+                        alive_indices.remove(alive_index)
+                    elif use_shared_memory:
+                        shm_reader = shm_readers[alive_index]
+                        sample = shm_reader.read(message)
+                        try:
+                            yield sample
+                        finally:
+                            # the consumer has finished this sample
+                            del sample
+                            shm_reader.release(message)
+                    else:
+                        yield deserialize_data(message)
+        finally:
+            if use_shared_memory:
+                for shm_reader in shm_readers:
+                    shm_reader.close()
+
+    def _new_release_queues():
+        if use_shared_memory:
+            ensure_resource_tracker()
+        return [
+            multiprocessing.Queue() if use_shared_memory else None
+            for _ in readers
+        ]
 
     def queue_reader():
         """queue_reader"""
         queues = []
-        for reader in readers:
+        release_queues = _new_release_queues()
+        for reader, release_queue in zip(readers, release_queues):
             queue = multiprocessing.Queue(queue_size)
             queues.append(queue)
-            p = multiprocessing.Process(
-                target=_read_into_queue, args=(reader, queue))
-            try:
-                p.start()
-            except:
-                raise RuntimeError(
-                    f"The program met some problems. If your system is Mac OS and python >= 3.8, "
-                    f"please checkout https://github.com/PaddlePaddle/PGL/issues/305 to fix the problem."
-                )
+            _start_process(_read_into_queue, (reader, queue, release_queue))
 
-        reader_num = len(readers)
-        alive_queue_indices = [i for i in range(reader_num)]
-        while len(alive_queue_indices) > 0:
-            for alive_queue_index in [i for i in alive_queue_indices]:
-                sample = deserialize_data(queues[alive_queue_index].get())
-                if sample is None:
-                    alive_queue_indices.remove(alive_queue_index)
-                else:
-                    yield sample
-
-    def _read_into_pipe(reader, conn, max_pipe_size):
-        """read_into_pipe"""
-        for sample in reader():
-            if sample is None:
-                raise ValueError("sample has None!")
-            conn.send(serialize_data(sample))
-        conn.send(serialize_data(None))
-        conn.close()
+        for sample in _merge_reader(queues, lambda queue: queue.get(),
+                                    release_queues):
+            yield sample
 
     def pipe_reader():
         """pipe_reader"""
         conns = []
-        for reader in readers:
+        release_queues = _new_release_queues()
+        for reader, release_queue in zip(readers, release_queues):
             parent_conn, child_conn = multiprocessing.Pipe()
             conns.append(parent_conn)
-            p = multiprocessing.Process(
-                target=_read_into_pipe, args=(reader, child_conn, pipe_size))
-            try:
-                p.start()
-            except:
-                raise RuntimeError(
-                    f"The program met some problems. If your system is Mac OS and python >= 3.8, "
-                    f"please checkout https://github.com/PaddlePaddle/PGL/issues/305 to fix the problem."
-                )
+            _start_process(_read_into_pipe,
+                           (reader, child_conn, pipe_size, release_queue))
 
-        reader_num = len(readers)
-        conn_to_remove = []
-        finish_flag = np.zeros(len(conns), dtype="int32")
+        def _recv(conn):
+            message = conn.recv()
+            if message is None:
+                conn.close()
+            return message
 
-        alive_conn_indices = [i for i in range(reader_num)]
-        while len(alive_conn_indices) > 0:
-            for alive_conn_index in [i for i in alive_conn_indices]:
-                sample = deserialize_data(conns[alive_conn_index].recv())
-                if sample is None:
-                    conns[alive_conn_index].close()
-                    alive_conn_indices.remove(alive_conn_index)
-                else:
-                    yield sample
+        for sample in _merge_reader(conns, _recv, release_queues):
+            yield sample
 
     if use_pipe:
         return pipe_reader
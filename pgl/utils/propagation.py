@@ -0,0 +1,452 @@
+# Copyright (c) 2022 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""This package implements label propagation and feature smoothing on CPU.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from pgl import graph_kernel
+from pgl.utils.edge_index import EdgeIndex
+
+__all__ = ["propagate", "label_propagation", "correct_and_smooth"]
+
+_NORMS = [None, "sym", "row", "indegree"]
+_POST_STEPS = {None: 0, "normalize": 1, "clip": 2}
+
+
+def _kernel_view(array):
+    """Return the array passed to graph_kernel.csr_propagate.
+    """
+    if array.dtype == np.float16:
+        return array.view(np.uint16)
+    return array
+
+
+def _check_dense(array, name):
+    if array.ndim != 2:
+        raise ValueError("%s should be a 2D array." % name)
+    if array.dtype not in (np.float16, np.float32, np.float64):
+        raise ValueError("%s should be float16, float32 or float64." % name)
+    if not array.flags["C_CONTIGUOUS"]:
+        raise ValueError("%s should be C contiguous." % name)
+
+
+def _get_edge_index(graph):
+    """Return the EdgeIndex of destinations of graph.
+    """
+    if isinstance(graph, EdgeIndex):
+        return graph
+    if graph.is_tensor():
+        raise ValueError("You must call Graph.numpy() first.")
+    return graph.adj_dst_index
+
+
+def _compute_norm(edge_index, norm, add_self_loop):
+    """Return (src_norm, dst_norm) in float32, where empty means 1.
+    """
+    empty = np.zeros([0], dtype="float32")
+    if norm is None:
+        return empty, empty
+    degree = np.asarray(edge_index.degree, dtype="float32")
+    if add_self_loop:
+        degree = degree + 1
+    with np.errstate(divide="ignore"):
+        if norm == "sym":
+            inv = np.power(degree, -0.5)
+        else:
+            inv = 1.0 / degree
+    inv[np.isinf(inv)] = 0
+    inv = inv.astype("float32")
+    if norm == "sym":
+        return inv, inv
+    elif norm == "row":
+        return empty, inv
+    else:
+        return inv, empty
+
+
+def _block_bounds(num_rows, block_size):
+    block_size = max(1, int(block_size))
+    bounds = list(range(0, num_rows, block_size)) + [num_rows]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def propagate(graph,
+              feature,
+              num_iters=10,
+              alpha=0.0,
+              norm="sym",
+              add_self_loop=False,
+              init=None,
+              nodes=None,
+              fixed_index=None,
+              fixed_value=None,
+              post_step=None,
+              clip=(0.0, 1.0),
+              tol=None,
+              out=None,
+              buffer=None,
+              block_size=65536,
+              num_threads=1):
+    """Propagate node features over the graph in CSR blocks.
+
+    Each iteration computes the APPNP-style update
+
+    .. math::
+
+        H^{(t+1)} = (1 - \\alpha) \\hat{A} H^{(t)} + \\alpha H^{(0)}
+
+    where :math:`\\hat{A}` is the normalized adjacency of
+    :code:`graph.adj_dst_index`, so each node aggregates the features of
+    its predecessors. The rows are processed in blocks of block_size by a
+    compiled kernel without the GIL, so the blocks run in parallel threads
+    and no message of shape [num_edges, dim] is built. The feature, init,
+    out and buffer can be memory-mapped arrays, which are read and written
+    block by block. float16 arrays are accumulated in float64 and stored
+    back in float16.
+
+    Args:
+
+        graph: A numpy :code:`pgl.Graph` or an :code:`EdgeIndex` of
+               destinations, whose v are the predecessors of u.
+
+        feature: The float16, float32 or float64 numpy.ndarray with shape
+                 [num_nodes, dim] to propagate.
+
+        num_iters: (default 10) The max number of iterations.
+
+        alpha: (default 0.0) The teleport probability back to init.
+
+        norm: (default "sym") The normalization of the adjacency. "sym" is
+              :math:`D^{-1/2} A D^{-1/2}`, "row" averages the predecessors
+              of each node, "indegree" divides the feature of each
+              predecessor by its degree, and None sums the predecessors.
+              The degree is the in-degree of the graph.
+
+        add_self_loop: (default False) Whether each node also aggregates
+                       itself, which counts in the degree.
+
+        init: (default None) The :math:`H^{(0)}` of the teleport term. If
+              None, use feature.
+
+        nodes: (default None) If not None, only the rows of nodes are
+               updated, and the other rows keep the values of feature.
+
+        fixed_index: (default None) The rows reset to fixed_value after
+                     each iteration, such as the nodes with known labels.
+
+        fixed_value: (default None) The values of fixed_index. If None,
+                     use the rows of feature.
+
+        post_step: (default None) "normalize" rescales each row to sum 1,
+                   and "clip" clips each row into clip after each
+                   iteration.
+
+        clip: (default (0.0, 1.0)) The (lower, upper) bounds of "clip".
+
+        tol: (default None) If not None, stop when the max absolute change
+             of an iteration is smaller than tol.
+
+        out: (default None) The output array with the shape and dtype of
+             feature. It can be feature itself, if init is given or alpha
+             is 0.
+
+        buffer: (default None) The array for the other half of the
+                iterations, with the shape and dtype of feature. If None, it
+                is allocated when needed.
+
+        block_size: (default 65536) The number of rows of each block.
+
+        num_threads: (default 1) The number of threads.
+
+    Return:
+
+        The propagated feature, which is out if out is given.
+    """
+    edge_index = _get_edge_index(graph)
+    if norm not in _NORMS:
+        raise ValueError("norm should be in %s." % _NORMS)
+    if post_step not in _POST_STEPS:
+        raise ValueError("post_step should be in %s." % list(_POST_STEPS))
+
+    _check_dense(feature, "feature")
+    if feature.shape[0] != len(edge_index.degree):
+        raise ValueError("The feature should have %s rows." %
+                         len(edge_index.degree))
+    if init is None:
+        init = feature
+    elif init.shape != feature.shape or init.dtype != feature.dtype:
+        init = np.ascontiguousarray(init, dtype=feature.dtype)
+    _check_dense(init, "init")
+
+    if out is None:
+        out = np.empty_like(feature)
+    for name, array in [("out", out), ("buffer", buffer)]:
+        if array is None:
+            continue
+        _check_dense(array, name)
+        if array.shape != feature.shape or array.dtype != feature.dtype:
+            raise ValueError("%s should have the shape and dtype of feature."
+                             % name)
+    if alpha != 0 and init is out:
+        raise ValueError("init should be given when out is feature.")
+    if fixed_index is not None:
+        fixed_index = np.asarray(fixed_index, dtype="int64").reshape([-1])
+        if fixed_value is None:
+            fixed_value = feature[fixed_index]
+        fixed_value = np.asarray(fixed_value, dtype=feature.dtype)
+
+    if nodes is None:
+        rows = np.zeros([0], dtype="int64")
+        blocks = _block_bounds(feature.shape[0], block_size)
+    else:
+        rows = np.asarray(nodes, dtype="int64").reshape([-1])
+        blocks = _block_bounds(len(rows), block_size)
+
+    # Iterations write out and buffer in turn, in the order that the last
+    # one writes out. out is never written first if it is feature.
+    in_place = out is feature
+    if buffer is None and (num_iters > 1 or in_place):
+        buffer = np.empty_like(feature)
+    targets = []
+    for t in range(num_iters):
+        if in_place:
+            targets.append(buffer if t % 2 == 0 else out)
+        else:
+            targets.append(out if (num_iters - t) % 2 == 1 else buffer)
+
+    if nodes is not None:
+        # the rows which are not updated keep the values of feature
+        for target in [out, buffer]:
+            if target is feature or not any(t is target for t in targets):
+                continue
+            for low, high in _block_bounds(feature.shape[0], block_size):
+                target[low:high] = feature[low:high]
+
+    src_norm, dst_norm = _compute_norm(edge_index, norm, add_self_loop)
+    indptr = np.asarray(edge_index._indptr, dtype="int64")
+    sorted_v = np.asarray(edge_index._sorted_v, dtype="int64")
+    post_op = _POST_STEPS[post_step]
+    lower, upper = clip
+
+    def _step(source, target, low, high):
+        return graph_kernel.csr_propagate(
+            indptr,
+            sorted_v,
+            _kernel_view(source),
+            _kernel_view(target),
+            _kernel_view(init),
+            src_norm,
+            dst_norm,
+            rows,
+            low,
+            high,
+            self_weight=1.0 if add_self_loop else 0.0,
+            alpha=alpha,
+            post_op=post_op,
+            lower=lower,
+            upper=upper)
+
+    executor = None
+    if num_threads > 1:
+        executor = ThreadPoolExecutor(max_workers=num_threads)
+    try:
+        source = feature
+        for target in targets:
+            if executor is None:
+                diffs = [_step(source, target, low, high)
+                         for low, high in blocks]
+            else:
+                futures = [
+                    executor.submit(_step, source, target, low, high)
+                    for low, high in blocks
+                ]
+                diffs = [future.result() for future in futures]
+            if fixed_index is not None:
+                target[fixed_index] = fixed_value
+            source = target
+            if tol is not None and max(diffs + [0]) < tol:
+                break
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if source is not out:
+        for low, high in _block_bounds(feature.shape[0], block_size):
+            out[low:high] = source[low:high]
+    return out
+
+
+def label_propagation(graph,
+                      labels,
+                      train_index,
+                      num_classes,
+                      num_iters=50,
+                      alpha=0.1,
+                      norm="sym",
+                      dtype="float32",
+                      **kwargs):
+    """Propagate the one-hot labels of train_index to all the nodes.
+
+    Args:
+
+        graph: A numpy :code:`pgl.Graph` or an :code:`EdgeIndex` of
+               destinations.
+
+        labels: The int labels of train_index with shape [len(train_index)].
+
+        train_index: The nodes with known labels.
+
+        num_classes: The number of classes.
+
+        num_iters: (default 50) The max number of iterations.
+
+        alpha: (default 0.1) The teleport probability back to the labels.
+
+        norm: (default "sym") The normalization of the adjacency.
+
+        dtype: (default "float32") The dtype of the label matrix.
+
+        kwargs: Other arguments of :code:`propagate`, such as tol and
+                num_threads.
+
+    Return:
+
+        The label distribution with shape [num_nodes, num_classes].
+    """
+    train_index = np.asarray(train_index, dtype="int64").reshape([-1])
+    labels = np.asarray(labels, dtype="int64").reshape([-1])
+    num_nodes = len(_get_edge_index(graph).degree)
+    y0 = np.zeros([num_nodes, num_classes], dtype=dtype)
+    y0[train_index, labels] = 1
+    return propagate(
+        graph, y0, num_iters=num_iters, alpha=alpha, norm=norm, **kwargs)
+
+
+def correct_and_smooth(graph,
+                       y_soft,
+                       labels,
+                       train_index,
+                       num_correction_iters=50,
+                       correction_alpha=0.2,
+                       num_smoothing_iters=50,
+                       smoothing_alpha=0.2,
+                       autoscale=True,
+                       scale=1.0,
+                       norm="sym",
+                       block_size=65536,
+                       **kwargs):
+    """Implementation of Correct and Smooth (C&S).
+
+    This is an implementation of the paper Combining Label Propagation and
+    Simple Models Out-performs Graph Neural Networks
+    (https://arxiv.org/abs/2010.13993).
+
+    The residual errors of y_soft on train_index are propagated to correct
+    y_soft, and then the corrected predictions with the true labels of
+    train_index are propagated to smooth the result. Both steps run
+    :code:`propagate`, so the alphas are teleport probabilities, which are
+    1 - alpha of the paper.
+
+    Args:
+
+        graph: A numpy :code:`pgl.Graph` or an :code:`EdgeIndex` of
+               destinations.
+
+        y_soft: The predicted class probabilities with shape
+                [num_nodes, num_classes].
+
+        labels: The int labels of train_index with shape [len(train_index)].
+
+        train_index: The nodes with known labels.
+
+        num_correction_iters: (default 50) The iterations of correction.
+
+        correction_alpha: (default 0.2) The teleport probability of
+                          correction.
+
+        num_smoothing_iters: (default 50) The iterations of smoothing.
+
+        smoothing_alpha: (default 0.2) The teleport probability of
+                         smoothing.
+
+        autoscale: (default True) Whether to rescale the propagated errors
+                   by the average error of train_index, or by scale.
+
+        scale: (default 1.0) The scale of the propagated errors when
+               autoscale is False.
+
+        norm: (default "sym") The normalization of the adjacency.
+
+        block_size: (default 65536) The number of rows of each block.
+
+        kwargs: Other arguments of :code:`propagate`, such as tol and
+                num_threads.
+
+    Return:
+
+        The smoothed class probabilities with the shape of y_soft.
+    """
+    train_index = np.asarray(train_index, dtype="int64").reshape([-1])
+    labels = np.asarray(labels, dtype="int64").reshape([-1])
+    y_soft = np.ascontiguousarray(y_soft)
+    _check_dense(y_soft, "y_soft")
+    y_train = np.zeros([len(train_index), y_soft.shape[1]], dtype=y_soft.dtype)
+    y_train[np.arange(len(train_index)), labels] = 1
+
+    error = np.zeros_like(y_soft)
+    error[train_index] = y_train - y_soft[train_index]
+    smoothed_error = propagate(
+        graph,
+        error,
+        num_iters=num_correction_iters,
+        alpha=correction_alpha,
+        norm=norm,
+        # keep the errors of train_index if they are not rescaled
+        fixed_index=None if autoscale else train_index,
+        post_step="clip" if autoscale else None,
+        clip=(-1.0, 1.0),
+        block_size=block_size,
+        **kwargs)
+
+    if autoscale:
+        sigma = np.abs(error[train_index].astype("float64")).sum() / max(
+            len(train_index), 1)
+    # reuse error for the corrected predictions
+    result = error
+    for low, high in _block_bounds(y_soft.shape[0], block_size):
+        block = smoothed_error[low:high].astype("float64")
+        if autoscale:
+            row_scale = np.abs(block).sum(axis=1, keepdims=True)
+            with np.errstate(divide="ignore"):
+                row_scale = sigma / row_scale
+            row_scale[np.isinf(row_scale) | (row_scale > 1000)] = 1.0
+        else:
+            row_scale = scale
+        result[low:high] = y_soft[low:high] + row_scale * block
+    result[train_index] = y_train
+
+    return propagate(
+        graph,
+        result,
+        num_iters=num_smoothing_iters,
+        alpha=smoothing_alpha,
+        norm=norm,
+        post_step="clip",
+        clip=(0.0, 1.0),
+        out=smoothed_error,
+        block_size=block_size,
+        **kwargs)
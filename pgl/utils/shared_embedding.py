@@ -38,6 +38,12 @@ def set_current_device_id():
         paddle.zeros([])
 
 
+def _to_numpy(x):
+    if isinstance(x, paddle.Tensor):
+        return x.numpy()
+    return np.asarray(x)
+
+
 def uniform(low, high, size, dtype=np.float32):
     """Memory efficient uniform implementation.
     """
@@ -46,38 +52,442 @@ def uniform(low, high, size, dtype=np.float32):
     return out
 
 
-def async_update(self, queue, event):
-    """Update embeddings asynchronously
+STORAGE_DTYPES = ['float32', 'float16', 'bfloat16', 'int8']
+
+
+def _scale_path(weight_path):
+    return os.path.splitext(weight_path)[0] + '_scale.npy'
+
+
+class QuantizedStorage(object):
+    """
+    Embeddings stored in float16, bfloat16 or int8, read and written as float32.
+
+    bfloat16 rows are stored as the high 16 bits of float32 in uint16, and
+    int8 rows are stored with a float32 scale for each row. Rows are
+    decoded when gathered and encoded again when written, so the optimizers
+    always compute in float32. Written rows are rounded stochastically, so
+    that updates smaller than the precision are not lost but add up in
+    expectation.
+
+    Args:
+        data (np.ndarray): The encoded rows.
+        mode (str): One of float16, bfloat16 and int8.
+        scale (np.ndarray): The scale of each row for int8 rows.
+    """
+
+    def __init__(self, data, mode, scale=None):
+        if mode not in STORAGE_DTYPES[1:]:
+            raise ValueError('storage dtype %s is not supported!' % mode)
+        if mode == 'int8' and scale is None:
+            raise ValueError('The scales of int8 storage are not given!')
+        self.data = data
+        self.mode = mode
+        self.scale = scale
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    @property
+    def dtype(self):
+        return np.dtype(np.float32)
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    def __getitem__(self, index):
+        if self.mode == 'int8':
+            return self.decode(self.mode, self.data[index], self.scale[index])
+        return self.decode(self.mode, self.data[index])
+
+    def __setitem__(self, index, value):
+        data, scale = self.encode(self.mode, value, stochastic=True)
+        self.data[index] = data
+        if scale is not None:
+            self.scale[index] = scale
+
+    def __array__(self, dtype=None):
+        array = self[:]
+        if dtype is not None:
+            array = array.astype(dtype)
+        return array
+
+    @staticmethod
+    def encode(mode, array, stochastic=False):
+        """Encode float rows into the storage dtype.
+
+        Args:
+            mode (str): One of float16, bfloat16 and int8.
+            array (np.ndarray): The float rows.
+            stochastic (bool): Round up with the probability of the distance
+                to the lower value if True, otherwise round to the nearest.
+
+        Return:
+            np.ndarray: The encoded rows.
+            np.ndarray: The scale of each row for int8, otherwise None.
+        """
+        array = np.asarray(array, dtype=np.float32)
+        if mode == 'float16':
+            data = array.astype(np.float16)
+            if not stochastic:
+                return data, None
+            nearest = data.astype(np.float32)
+            down = nearest > array
+            toward = np.where(down, -np.inf, np.inf).astype(np.float16)
+            other = np.nextafter(data, toward).astype(np.float32)
+            lower = np.where(down, other, nearest)
+            gap = np.abs(other - nearest)
+            prob = np.where(
+                np.isfinite(gap) & (gap > 0), (array - lower) / gap, 0.)
+            up = np.random.random_sample(array.shape) < prob
+            return np.where(up, np.maximum(nearest, other),
+                            lower).astype(np.float16), None
+        elif mode == 'bfloat16':
+            bits = array.view(np.uint32)
+            if stochastic:
+                # add random low bits before truncating
+                bits = bits + np.random.randint(
+                    0, 1 << 16, size=bits.shape, dtype=np.uint32)
+            else:
+                # round to the nearest even
+                bits = bits + (np.uint32(0x7FFF) + ((bits >> 16) & 1))
+            return (bits >> 16).astype(np.uint16), None
+        elif mode == 'int8':
+            scale = np.abs(array).max(axis=-1) / 127.
+            scale = np.where(scale > 0, scale, 1.).astype(np.float32)
+            data = array / scale[..., None]
+            if stochastic:
+                data = np.floor(data + np.random.random_sample(data.shape))
+            else:
+                data = np.rint(data)
+            return np.clip(data, -127, 127).astype(np.int8), scale
+        raise ValueError('storage dtype %s is not supported!' % mode)
+
+    @staticmethod
+    def decode(mode, data, scale=None):
+        """Decode the stored rows into float32.
+        """
+        if mode == 'float16':
+            return data.astype(np.float32)
+        elif mode == 'bfloat16':
+            return (data.astype(np.uint32) << 16).view(np.float32)
+        elif mode == 'int8':
+            return data.astype(np.float32) * np.asarray(scale)[..., None]
+        raise ValueError('storage dtype %s is not supported!' % mode)
+
+
+def save_weight(weight_path, weight, storage_dtype=None):
+    """Save embeddings in the storage dtype.
+
+    Args:
+        weight_path (str): The .npy file to save embeddings.
+        weight (np.ndarray): The embeddings.
+        storage_dtype (str): One of float32, float16, bfloat16 and int8.
+            If None, the embeddings are saved as they are.
+    """
+    if storage_dtype is None:
+        np.save(weight_path, weight)
+    elif storage_dtype == 'float32':
+        np.save(weight_path, weight.astype(np.float32))
+    else:
+        data, scale = QuantizedStorage.encode(storage_dtype, weight)
+        if scale is not None:
+            np.save(_scale_path(weight_path), scale)
+        np.save(weight_path, data)
+
+
+def load_weight(weight_path, mmap_mode='r+'):
+    """Load embeddings saved by save_weight.
+
+    The storage dtype is inferred from the dtype of the file.
+
+    Return:
+        np.ndarray or QuantizedStorage: The embeddings, whose rows are
+        gathered as float32 unless they are saved as they are.
+    """
+    data = np.load(weight_path, allow_pickle=True, mmap_mode=mmap_mode)
+    if data.dtype == np.float16:
+        return QuantizedStorage(data, 'float16')
+    elif data.dtype == np.uint16:
+        return QuantizedStorage(data, 'bfloat16')
+    elif data.dtype == np.int8:
+        scale = np.load(_scale_path(weight_path), mmap_mode=mmap_mode)
+        return QuantizedStorage(data, 'int8', scale)
+    return data
+
+
+def coalesce_rows(index, grads):
+    """Sum the gradients of duplicate indices.
+
+    Args:
+        index (np.ndarray): The row index with shape [n].
+        grads (list of np.ndarray): The gradients whose first dimension is n.
+
+    Return:
+        np.ndarray: The sorted unique index.
+        list of np.ndarray: The summed gradients of each unique index.
+    """
+    order = np.argsort(index, kind='stable')
+    index = index[order]
+    if len(index) == 0:
+        return index, [g[order] for g in grads]
+    starts = np.flatnonzero(np.concatenate([[True], index[1:] != index[:-1]]))
+    if len(starts) == len(index):
+        return index, [g[order] for g in grads]
+    grads = [np.add.reduceat(g[order], starts, axis=0) for g in grads]
+    return index[starts], grads
+
+
+def sparse_update(optim_mode,
+                  lr,
+                  weight,
+                  states,
+                  index,
+                  grads,
+                  betas=(0.9, 0.999),
+                  eps=1e-8):
+    """Apply one update of coalesced gradients to the rows of weight.
+
+    Args:
+        optim_mode (str): One of sgd, adagrad, adam and rowwise_adam.
+        lr (float): The learning rate.
+        weight (np.ndarray): The embeddings to update in place.
+        states (dict): The optimizer states of all rows.
+        index (np.ndarray): The unique row index.
+        grads (list of np.ndarray): The gradients created by create_trace.
+    """
+    grad = grads[0]
+    if optim_mode == 'sgd':
+        weight[index] -= lr * grad
+    elif optim_mode == 'adagrad':
+        moment = states['moment']
+        moment[index] += grads[1]
+        std = np.sqrt(moment[index]) + 1e-10
+        weight[index] -= lr * grad / std.reshape((-1, 1))
+    elif optim_mode in ['adam', 'rowwise_adam']:
+        # lazy adam, the bias of each row is corrected by its own steps
+        beta1, beta2 = betas
+        steps = states['steps']
+        steps[index] += 1
+        t = steps[index].reshape((-1, 1))
+        m = beta1 * states['moment'][index] + (1 - beta1) * grad
+        if optim_mode == 'adam':
+            v = beta2 * states['moment2'][index] + (1 - beta2) * grad * grad
+        else:
+            v = beta2 * states['moment2'][index] + \
+                (1 - beta2) * (grad * grad).mean(axis=-1)
+            v = v.reshape((-1, 1))
+        states['moment'][index] = m
+        states['moment2'][index] = v.reshape(
+            states['moment2'][index].shape)
+        m_hat = m / (1 - np.power(beta1, t))
+        v_hat = v / (1 - np.power(beta2, t))
+        weight[index] -= lr * m_hat / (np.sqrt(v_hat) + eps)
+    else:
+        raise ValueError('update method %s is not supported!' % optim_mode)
+
+
+def _load_states(state_paths):
+    return dict((name, np.load(
+        path, mmap_mode='r+')) for name, path in state_paths.items())
+
+
+def async_update(shard_id, optim_mode, lr, weight_path, state_paths, queue,
+                 applied, total_lag, max_lag):
+    """Update a shard of embeddings asynchronously.
+
+    Each process owns a disjoint row range of the embeddings, so the
+    updates are applied without any lock.
     """
-    set_current_device_id()
     weight = None
-    _moment = None
+    states = None
 
     while True:
-        (index, grad_trace) = queue.get()
-        if index is None:
+        item = queue.get()
+        if item is None:
             return
+        enqueue_time, index, grads = item
         if weight is None:
             # Must reload in here, the mmap obj can't pass with spawn.
-            weight = np.load(
-                self._weight_path, allow_pickle=True, mmap_mode='r+')
-            _moment = np.load(self._moment_path, mmap_mode='r+')
+            weight = load_weight(weight_path)
+            states = _load_states(state_paths)
+
+        sparse_update(optim_mode, lr, weight, states, index, grads)
+
+        lag = time.time() - enqueue_time
+        total_lag[shard_id] += lag
+        max_lag[shard_id] = max(max_lag[shard_id], lag)
+        applied[shard_id] += 1
+
+
+class RowCache(object):
+    """
+    In-memory cache of hot rows in front of a mmap array.
+
+    A missed row is admitted after it has been looked up admit_threshold
+    times. When the cache is full, the least frequently (lfu) or least
+    recently (lru) used rows are evicted. Writes to cached rows stay in
+    memory and are written back to the mmap array on eviction or flush.
 
-        index = index.clone()
-        grad_trace = [x.clone() for x in grad_trace]
-        event.set()  # Release the main thread.
+    It supports reading and writing rows by ``cache[index]``, so that
+    optimizers can update it as a np.ndarray.
 
-        # Copy tensor to numpy.
-        grad, grad_square = grad_trace
-        index = index.numpy()
-        grad = grad.numpy()
-        grad_square = grad_square.numpy()
+    Args:
+        weight (np.ndarray):
+            The array to cache, usually loaded with mmap_mode='r+'.
+        capacity (int):
+            The max number of cached rows.
+        policy (str):
+            The eviction policy. Choices: lfu, lru.
+        admit_threshold (int):
+            The number of lookups before admitting a row.
+    """
 
-        # update adagrad
-        _moment[index] += grad_square
-        std = np.sqrt(_moment[index]) + 1e-10
-        grad = -self._lr * grad / std.reshape((-1, 1))
-        weight[index] += grad
+    def __init__(self, weight, capacity, policy='lfu', admit_threshold=2):
+        if policy not in ['lfu', 'lru']:
+            raise ValueError('cache policy %s is not supported!' % policy)
+        num_rows = weight.shape[0]
+        self._weight = weight
+        self._policy = policy
+        self._admit_threshold = admit_threshold
+        self.capacity = int(min(capacity, num_rows))
+
+        self._data = np.zeros(
+            (self.capacity, ) + weight.shape[1:], dtype=weight.dtype)
+        self._slot_of = np.full([num_rows], -1, dtype=np.int64)
+        self._freq = np.zeros([num_rows], dtype=np.int32)
+        self._rows = np.full([self.capacity], -1, dtype=np.int64)
+        self._score = np.zeros([self.capacity], dtype=np.int64)
+        self._dirty = np.zeros([self.capacity], dtype=bool)
+        self._num_used = 0
+        self._clock = 0
+
+        self.admit_filter = None
+        self.num_lookups = 0
+        self.num_hits = 0
+
+    @property
+    def shape(self):
+        return self._weight.shape
+
+    @property
+    def dtype(self):
+        return self._weight.dtype
+
+    def cached(self, index):
+        """Return whether each row of index is cached.
+        """
+        return self._slot_of[index] >= 0
+
+    def __getitem__(self, index):
+        index = np.asarray(index)
+        slots = self._slot_of[index]
+        hit = slots >= 0
+        out = np.empty(index.shape + self._weight.shape[1:], dtype=self.dtype)
+        out[hit] = self._data[slots[hit]]
+        out[~hit] = self._weight[index[~hit]]
+        return out
+
+    def __setitem__(self, index, value):
+        index = np.asarray(index)
+        value = np.broadcast_to(value, index.shape + self._weight.shape[1:])
+        slots = self._slot_of[index]
+        hit = slots >= 0
+        self._data[slots[hit]] = value[hit]
+        self._dirty[slots[hit]] = True
+        self._weight[index[~hit]] = value[~hit]
+
+    def lookup(self, index):
+        """Read rows, count the hits and admit frequently missed rows.
+        """
+        index = np.asarray(index)
+        flat = index.reshape([-1])
+        slots = self._slot_of[flat]
+        hit = slots >= 0
+        out = np.empty(
+            flat.shape + self._weight.shape[1:], dtype=self.dtype)
+        out[hit] = self._data[slots[hit]]
+        out[~hit] = self._weight[flat[~hit]]
+
+        self.num_lookups += len(flat)
+        self.num_hits += int(hit.sum())
+        self._clock += 1
+        rows, counts = np.unique(flat, return_counts=True)
+        self._freq[rows] += counts.astype(np.int32)
+        hit_slots = slots[hit]
+        if self._policy == 'lfu':
+            self._score[hit_slots] = self._freq[flat[hit]]
+        else:
+            self._score[hit_slots] = self._clock
+
+        self._admit(flat[~hit])
+        return out.reshape(index.shape + self._weight.shape[1:])
+
+    def _admit(self, rows):
+        rows = np.unique(rows)
+        mask = self._freq[rows] >= self._admit_threshold
+        if self.admit_filter is not None:
+            mask &= self.admit_filter(rows)
+        rows = rows[mask]
+        if len(rows) == 0:
+            return
+
+        # the most frequent rows first
+        order = np.argsort(-self._freq[rows], kind='stable')
+        rows = rows[order]
+
+        num_used = self._num_used
+        free_slots = np.arange(num_used,
+                               min(self.capacity, num_used + len(rows)))
+        self._num_used += len(free_slots)
+
+        # the victims are chosen from the rows cached before this lookup
+        num_evict = min(len(rows) - len(free_slots), num_used)
+        victims = np.argsort(
+            self._score[:num_used], kind='stable')[:num_evict]
+        if self._policy == 'lfu':
+            # only replace rows used less frequently
+            cand_freq = self._freq[rows[len(free_slots):len(free_slots) +
+                                        num_evict]]
+            victims = victims[cand_freq > self._score[victims]]
+        self._write_back(victims)
+        self._slot_of[self._rows[victims]] = -1
+
+        slots = np.concatenate([free_slots, victims]).astype(np.int64)
+        rows = rows[:len(slots)]
+        # Read the rows after the filter, an update may be applied to the
+        # mmap array between the lookup and the filter.
+        self._data[slots] = self._weight[rows]
+        self._rows[slots] = rows
+        self._slot_of[rows] = slots
+        self._dirty[slots] = False
+        if self._policy == 'lfu':
+            self._score[slots] = self._freq[rows]
+        else:
+            self._score[slots] = self._clock
+
+    def _write_back(self, slots):
+        slots = slots[self._dirty[slots]]
+        if len(slots) > 0:
+            self._weight[self._rows[slots]] = self._data[slots]
+            self._dirty[slots] = False
+
+    def flush(self):
+        """Write all dirty rows back to the mmap array.
+        """
+        self._write_back(np.arange(self._num_used))
+
+    def stats(self):
+        """Return the hit rate of lookups.
+        """
+        return {
+            'num_lookups': self.num_lookups,
+            'num_hits': self.num_hits,
+            'hit_rate': self.num_hits / max(self.num_lookups, 1),
+            'num_cached': self._num_used,
+            'capacity': self.capacity
+        }
 
 
 class SharedEmbedding(object):
@@ -98,13 +508,32 @@ class SharedEmbedding(object):
         weight_path (str):
             The file to save and load embeddings.
         optimizer (str):
-            The optimizer used to update embeddings during training. Choices: sgd, adagrad.
+            The optimizer used to update embeddings during training.
+            Choices: sgd, adagrad, adam, rowwise_adam. The rowwise_adam keeps
+            one second moment for each row.
         learning_rate (float):
             The learning rate of optimizer.
         init_mode (str):
             The source of embeddings initialization. Choices: range, array, file.
         num_workers (int):
-            The number of processes to update gradients.
+            The number of processes to update gradients. In async mode,
+            each process owns a shard of rows.
+        max_pending (int):
+            The max number of updates waiting for each process in async
+            mode. The trainer is blocked only when it is exceeded.
+        cache_size (int):
+            The number of hot rows cached in memory. 0 means no cache.
+            The updates of cached rows are applied in the trainer process
+            and written back to weight_path on eviction or flush.
+        cache_policy (str):
+            The eviction policy of the cache. Choices: lfu, lru.
+        cache_admit_threshold (int):
+            The number of lookups before caching a row.
+        storage_dtype (str):
+            The dtype to store embeddings in weight_path. Choices: float32,
+            float16, bfloat16, int8 (with a float32 scale for each row).
+            Rows are always gathered and updated in float32. None means
+            the dtype of the given weight, or of the file in file mode.
     """
 
     def __init__(self,
@@ -117,7 +546,12 @@ class SharedEmbedding(object):
                  optimizer='adagrad',
                  learning_rate=0.1,
                  init_mode='range',
-                 num_workers=1):
+                 num_workers=1,
+                 max_pending=64,
+                 cache_size=0,
+                 cache_policy='lfu',
+                 cache_admit_threshold=2,
+                 storage_dtype=None):
         super(SharedEmbedding, self).__init__()
         self._num_embed = num_embeddings
         self._embed_dim = embedding_dim
@@ -128,6 +562,11 @@ class SharedEmbedding(object):
         self._moment_path = os.path.join(
             os.path.dirname(self._weight_path),
             os.path.basename(self._weight_path).strip('.npy') + '_moment.npy')
+        self._state_paths = {}
+        if storage_dtype is not None and storage_dtype not in STORAGE_DTYPES:
+            raise ValueError('storage dtype %s is not supported!' %
+                             storage_dtype)
+        self._storage_dtype = storage_dtype
         self._init_weight(weight)
 
         self.trace = []
@@ -135,19 +574,30 @@ class SharedEmbedding(object):
 
         self._optim_mode = optimizer.lower()
         self._lr = learning_rate
-        self._update = self._set_optimizer()
+        self._set_optimizer()
 
         self._process_worker = num_workers
+        self._max_pending = max_pending
         self._async_q = None
-        self._async_e = None
         self._async_p = []
-        for i in range(self._process_worker):
-            self._async_p.append(None)
+        self._shard_bounds = np.linspace(
+            0, self.weight.shape[0], self._process_worker + 1).astype('int64')
+        self._num_enqueued = np.zeros([self._process_worker], dtype='int64')
+        self._applied = None
+        self._total_lag = None
+        self._max_lag = None
+        self._row_seq = None
+
+        self._cache = None
+        if cache_size > 0:
+            self._cache = RowCache(self.weight, cache_size, cache_policy,
+                                   cache_admit_threshold)
+            self._cache.admit_filter = self._can_cache
 
     def __call__(self, index):
         if isinstance(index, paddle.Tensor):
             index = index.numpy()
-        tensors = paddle.to_tensor(self.weight[index])
+        tensors = paddle.to_tensor(self._lookup(index))
         tensors.stop_gradient = self._stop_gradient
         index = paddle.to_tensor(index)
         if not self._stop_gradient:
@@ -160,34 +610,46 @@ class SharedEmbedding(object):
                    weight_path,
                    optimizer='AdaGrad',
                    learning_rate=0.1,
-                   num_workers=1):
+                   num_workers=1,
+                   cache_size=0,
+                   storage_dtype=None):
         """Initialize SharedEmbedding with a pre-defined array
         """
         return cls(weight=weight, weight_path=weight_path, \
-            optimizer=optimizer, learning_rate=learning_rate, init_mode='array', num_workers=num_workers)
+            optimizer=optimizer, learning_rate=learning_rate, init_mode='array', num_workers=num_workers,
+            cache_size=cache_size, storage_dtype=storage_dtype)
 
     @classmethod
     def from_file(cls,
                   weight_path,
                   optimizer='AdaGrad',
                   learning_rate=0.1,
-                  num_workers=1):
+                  num_workers=1,
+                  cache_size=0):
         """Initialize SharedEmbedding from array stored in weight_path
         """
         return cls(weight_path=weight_path, \
-            optimizer=optimizer, learning_rate=learning_rate, init_mode='file', num_workers=num_workers)
+            optimizer=optimizer, learning_rate=learning_rate, init_mode='file', num_workers=num_workers,
+            cache_size=cache_size)
 
     def eval(self):
         """For evaluation without gradients
         """
         self.trace = []
         self._stop_gradient = True
+        self.flush()
 
     def train(self):
         """Fro training with gradient trace
         """
         self._stop_gradient = False
 
+    @property
+    def storage_dtype(self):
+        """Return the dtype to store embeddings
+        """
+        return self._storage_dtype
+
     @property
     def weight_path(self):
         """Return the path of mmap embeddings
@@ -207,29 +669,61 @@ class SharedEmbedding(object):
         """Get embeddings of index
         """
         assert isinstance(index, np.ndarray)
+        return self._lookup(index)
+
+    def flush(self):
+        """Write the cached rows back to weight_path
+        """
+        if self._cache is not None:
+            self._cache.flush()
+
+    def cache_stats(self):
+        """Return the hit rate of the row cache
+        """
+        if self._cache is None:
+            return None
+        return self._cache.stats()
+
+    def _lookup(self, index):
+        if self._cache is not None:
+            return self._cache.lookup(index)
         return self.weight[index]
 
+    def _can_cache(self, rows):
+        """Rows with updates pending in async processes are not cached.
+        """
+        if self._row_seq is None:
+            return np.ones(rows.shape, dtype=bool)
+        shard = np.searchsorted(self._shard_bounds, rows, side='right') - 1
+        applied = np.ctypeslib.as_array(self._applied)
+        return self._row_seq[rows] <= applied[shard]
+
     def start_async_update(self):
         """initialize the async update
         """
-
-        def device_id_hook(*args, **kwargs):
-            set_current_device_id()
-            return paddle.incubate.multiprocessing.reductions.reduce_tensor(
-                *args, **kwargs)
-
-        import paddle.incubate.multiprocessing as mp
-        mp = mp.get_context("spawn")
+        # Spawn instead of fork so the processes don't inherit the state of
+        # paddle, they get numpy gradients and reload the mmap files.
         import multiprocessing
-        multiprocessing.reduction.ForkingPickler._extra_reducers[
-            paddle.Tensor] = device_id_hook
-
-        self._async_q = mp.Queue(1)
-        self._async_e = mp.Event()
+        mp = multiprocessing.get_context("spawn")
+
+        self._applied = mp.Array('q', self._process_worker, lock=False)
+        self._total_lag = mp.Array('d', self._process_worker, lock=False)
+        self._max_lag = mp.Array('d', self._process_worker, lock=False)
+        self._num_enqueued[:] = 0
+        if self._cache is not None:
+            self._row_seq = np.zeros([self.weight.shape[0]], dtype=np.int64)
+        self._async_q = []
+        self._async_p = []
         for i in range(self._process_worker):
-            self._async_p[i] = mp.Process(
-                target=async_update, args=(self, self._async_q, self._async_e))
-            self._async_p[i].daemon = False
+            queue = mp.Queue(self._max_pending)
+            p = mp.Process(
+                target=async_update,
+                args=(i, self._optim_mode, self._lr, self._weight_path,
+                      self._state_paths, queue, self._applied,
+                      self._total_lag, self._max_lag))
+            p.daemon = False
+            self._async_q.append(queue)
+            self._async_p.append(p)
         for i in range(self._process_worker):
             self._async_p[i].start()
 
@@ -237,24 +731,63 @@ class SharedEmbedding(object):
         """Notify the async update process to quit
         """
         for i in range(self._process_worker):
-            self._async_q.put((None, None))
+            self._async_q[i].put(None)
 
         for i in range(self._process_worker):
             self._async_p[i].join()
+        self._async_q = None
+        self._row_seq = None
+        self.flush()
+
+    def wait_async_update(self, interval=0.01):
+        """Block until all enqueued updates are applied.
+        """
+        if self._async_q is None:
+            return
+        while self.update_stats()['num_pending'] > 0:
+            time.sleep(interval)
+
+    def update_stats(self):
+        """Return the lag metrics of async update.
+
+        Return:
+            dict: The number of enqueued, applied and pending updates, and
+            the average and max seconds between enqueuing an update and
+            applying it.
+        """
+        num_enqueued = int(self._num_enqueued.sum())
+        if self._applied is None:
+            return {
+                'num_enqueued': num_enqueued,
+                'num_applied': num_enqueued,
+                'num_pending': 0,
+                'avg_lag': 0.,
+                'max_lag': 0.
+            }
+        num_applied = int(sum(self._applied[:]))
+        return {
+            'num_enqueued': num_enqueued,
+            'num_applied': num_applied,
+            'num_pending': num_enqueued - num_applied,
+            'avg_lag': sum(self._total_lag[:]) / max(num_applied, 1),
+            'max_lag': max(self._max_lag[:])
+        }
 
     def step(self):
         """Update embeddings according to self.trace
         """
         with paddle.no_grad():
-            for index, tensors in self.trace:
-                grad_trace = self.create_trace(index, tensors)
-                if self._async_q is not None:
-                    self._async_q.put(grad_trace)
-                    self._async_e.wait()
-                    self._async_e.clear()
-                else:
-                    index, grads = grad_trace
-                    self._update(index, grads)
+            traces = [
+                self.create_trace(index, tensors)
+                for index, tensors in self.trace
+            ]
+        if len(traces) > 0:
+            index = np.concatenate([_to_numpy(t[0]) for t in traces])
+            grads = [
+                np.concatenate([_to_numpy(t[1][i]) for t in traces])
+                for i in range(len(traces[0][1]))
+            ]
+            self._apply(index, grads)
         self.trace = []
 
     def step_trace(self, trace):
@@ -262,12 +795,42 @@ class SharedEmbedding(object):
         """
         with paddle.no_grad():
             index, grad_trace = trace
-            if self._async_q is not None:
-                self._async_q.put([index, grad_trace], )
-                self._async_e.wait()
-                self._async_e.clear()
-            else:
-                self._update(index, grad_trace)
+            self._apply(
+                _to_numpy(index), [_to_numpy(grad) for grad in grad_trace])
+
+    def _apply(self, index, grads):
+        """Coalesce duplicate rows and apply or enqueue the update.
+        """
+        index, grads = coalesce_rows(index.reshape([-1]), grads)
+        if self._optim_mode == 'adagrad':
+            # adagrad accumulates the square of the summed gradient
+            grads = [grads[0], (grads[0] * grads[0]).mean(axis=-1)]
+        if self._async_q is None:
+            weight = self._cache if self._cache is not None else self.weight
+            sparse_update(self._optim_mode, self._lr, weight, self._states,
+                          index, grads)
+            return
+
+        if self._cache is not None:
+            # cached rows are owned by the trainer process
+            cached = self._cache.cached(index)
+            sparse_update(self._optim_mode, self._lr, self._cache,
+                          self._states, index[cached],
+                          [g[cached] for g in grads])
+            index, grads = index[~cached], [g[~cached] for g in grads]
+
+        # Send the rows to the processes owning them without waiting.
+        enqueue_time = time.time()
+        splits = np.searchsorted(index, self._shard_bounds)
+        for i in range(self._process_worker):
+            start, end = splits[i], splits[i + 1]
+            if start == end:
+                continue
+            self._num_enqueued[i] += 1
+            if self._row_seq is not None:
+                self._row_seq[index[start:end]] = self._num_enqueued[i]
+            self._async_q[i].put((enqueue_time, index[start:end],
+                                  [g[start:end] for g in grads]))
 
     def create_trace(self, index, embeds):
         """Create gradient trace for given paddle.tensor
@@ -279,19 +842,35 @@ class SharedEmbedding(object):
                 grad = embeds.grad
                 grad_square = (grad * grad).mean(axis=-1)
                 grads = [grad.detach(), grad_square.detach()]
-            elif self._optim_mode == 'sgd':
+            else:
                 grads = [embeds.grad.detach()]
         return [index, grads]
 
     def _set_optimizer(self):
+        num_rows = self.weight.shape[0]
         if self._optim_mode == 'adagrad':
-            self._init_moment()
-            return self._update_adagrad
-        elif self._optim_mode == 'sgd':
-            return self._update_sgd
-        else:
+            self._init_state('moment', self._moment_path, (num_rows, ),
+                             np.float32)
+        elif self._optim_mode in ['adam', 'rowwise_adam']:
+            self._init_state('moment', self._moment_path, self.weight.shape,
+                             np.float32)
+            if self._optim_mode == 'adam':
+                moment2_shape = self.weight.shape
+            else:
+                moment2_shape = (num_rows, )
+            self._init_state('moment2',
+                             self._moment_path.replace('_moment.npy',
+                                                       '_moment2.npy'),
+                             moment2_shape, np.float32)
+            self._init_state('steps',
+                             self._moment_path.replace('_moment.npy',
+                                                       '_steps.npy'),
+                             (num_rows, ), np.int64)
+        elif self._optim_mode != 'sgd':
             raise ValueError('update method %s is not supported!' %
                              self._optim_mode)
+        self._states = _load_states(self._state_paths)
+        self._moment = self._states.get('moment', None)
 
     def _init_weight(self, weight):
         if dist.get_rank() == 0:
@@ -300,13 +879,13 @@ class SharedEmbedding(object):
                 assert self._low < self._high, 'Invalid range to initialize SharedEmbedding!'
                 embed_shape = (self._num_embed, self._embed_dim)
                 weight = uniform(self._low, self._high, embed_shape)
-                np.save(self._weight_path, weight)
+                save_weight(self._weight_path, weight, self._storage_dtype)
                 del weight
             elif self._init_mode == 'array':
                 assert isinstance(
                     weight, np.ndarray
                 ), 'Invalid weight type to initialize SharedEmbedding!'
-                np.save(self._weight_path, weight)
+                save_weight(self._weight_path, weight, self._storage_dtype)
                 del weight
             elif self._init_mode != 'file':
                 raise ValueError(
@@ -317,32 +896,26 @@ class SharedEmbedding(object):
                 if os.path.exists(self._weight_path):
                     break
                 time.sleep(5)
-        self.weight = np.load(
-            self._weight_path, allow_pickle=True, mmap_mode='r+')
-
-    def _init_moment(self):
+        self.weight = load_weight(self._weight_path)
+        if isinstance(self.weight, QuantizedStorage):
+            storage_dtype = self.weight.mode
+        else:
+            storage_dtype = self.weight.dtype.name
+        if self._storage_dtype is not None and \
+                self._storage_dtype != storage_dtype:
+            raise ValueError('The embeddings in %s are stored in %s, not %s.'
+                             % (self._weight_path, storage_dtype,
+                                self._storage_dtype))
+        self._storage_dtype = storage_dtype
+
+    def _init_state(self, name, path, shape, dtype):
         if dist.get_rank() == 0:
-            moment = np.zeros((self.weight.shape[0], ), dtype=np.float32)
-            np.save(self._moment_path, moment)
-            del moment
+            state = np.zeros(shape, dtype=dtype)
+            np.save(path, state)
+            del state
         else:
             while True:
-                if os.path.exists(self._moment_path):
+                if os.path.exists(path):
                     break
                 time.sleep(5)
-        self._moment = np.load(self._moment_path, mmap_mode='r+')
-
-    def _update_adagrad(self, index, grad_trace):
-        index = index.numpy()
-        grad, grad_square = grad_trace
-        grad = grad.numpy()
-        grad_square = grad_square.numpy()
-
-        self._moment[index] += grad_square
-        std = np.sqrt(self._moment[index]) + 1e-10
-        grad = -self._lr * grad / std.reshape((-1, 1))
-        self.weight[index] += grad
-
-    def _update_sgd(self, index, grad):
-        grad = -self._lr * grad
-        self.weight[index] += grad
+        self._state_paths[name] = path
@@ -0,0 +1,277 @@
+# Copyright (c) 2022 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Shared memory transport for passing batches of numpy arrays between processes.
+
+The worker writes all numpy arrays of a batch (including the arrays inside
+pgl.Graph, pgl.BiGraph, pgl.HeterGraph and EdgeIndex) into one block of a
+ring of reusable POSIX shared memory blocks and only sends a small descriptor.
+The trainer rebuilds the arrays zero-copy with np.frombuffer and gives the
+block back to the worker after the batch is consumed.
+"""
+
+import copy
+import mmap
+import queue
+from collections import namedtuple
+
+import numpy as np
+
+_ALIGNMENT = 64
+
+_ArrayRef = namedtuple("_ArrayRef", ["index"])
+
+_ShmBatch = namedtuple("_ShmBatch", ["slot", "name", "metas", "skeleton"])
+
+
+def _shared_memory():
+    try:
+        from multiprocessing import shared_memory
+    except ImportError:
+        raise ImportError(
+            "Shared memory transport requires python >= 3.8 for multiprocessing.shared_memory."
+        )
+    return shared_memory
+
+
+def _graph_types():
+    from pgl.graph import Graph
+    from pgl.bigraph import BiGraph
+    from pgl.heter_graph import HeterGraph
+    from pgl.utils.edge_index import EdgeIndex
+    return (Graph, BiGraph, HeterGraph, EdgeIndex)
+
+
+def flatten_arrays(data, arrays):
+    """Replace the numpy arrays in data with references and collect them into arrays.
+
+    Lists, tuples, dicts and pgl graphs are traversed recursively. The input
+    data is not modified.
+    """
+    if isinstance(data, np.ndarray):
+        if data.dtype.hasobject:
+            return data
+        arrays.append(data)
+        return _ArrayRef(len(arrays) - 1)
+    elif isinstance(data, _ArrayRef):
+        raise TypeError("The batch data should not contain _ArrayRef.")
+    elif isinstance(data, dict):
+        return type(data)(
+            (key, flatten_arrays(value, arrays))
+            for key, value in data.items())
+    elif isinstance(data, list):
+        return [flatten_arrays(value, arrays) for value in data]
+    elif isinstance(data, tuple):
+        values = [flatten_arrays(value, arrays) for value in data]
+        if hasattr(data, "_fields"):
+            # namedtuple
+            return type(data)(*values)
+        return type(data)(values)
+    elif isinstance(data, _graph_types()):
+        new_data = copy.copy(data)
+        new_data.__dict__ = flatten_arrays(data.__dict__, arrays)
+        return new_data
+    else:
+        return data
+
+
+def restore_arrays(skeleton, arrays):
+    """Put the arrays back into the skeleton created by flatten_arrays.
+    """
+    if isinstance(skeleton, _ArrayRef):
+        return arrays[skeleton.index]
+    elif isinstance(skeleton, dict):
+        return type(skeleton)((key, restore_arrays(value, arrays))
+                              for key, value in skeleton.items())
+    elif isinstance(skeleton, list):
+        return [restore_arrays(value, arrays) for value in skeleton]
+    elif isinstance(skeleton, tuple):
+        values = [restore_arrays(value, arrays) for value in skeleton]
+        if hasattr(skeleton, "_fields"):
+            return type(skeleton)(*values)
+        return type(skeleton)(values)
+    elif isinstance(skeleton, _graph_types()):
+        skeleton.__dict__ = restore_arrays(skeleton.__dict__, arrays)
+        return skeleton
+    else:
+        return skeleton
+
+
+def ensure_resource_tracker():
+    """Start the resource tracker before creating worker processes.
+
+    The workers then share the tracker of the trainer, so that the blocks
+    attached by the trainer are not reported as leaked at exit.
+    """
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.ensure_running()
+    except ImportError:
+        pass
+
+
+class ShmWriter(object):
+    """Write batches into a ring of reusable shared memory blocks.
+
+    It lives in the worker process. A block is reused only after the
+    trainer puts its slot back into :code:`release_queue`, so the number of
+    batches in flight is bounded by :code:`num_blocks`.
+
+    Args:
+
+        release_queue: A multiprocessing.Queue to receive released slots.
+
+        num_blocks: The number of shared memory blocks in the ring.
+    """
+
+    def __init__(self, release_queue, num_blocks=4):
+        if num_blocks < 2:
+            raise ValueError("num_blocks should be at least 2, but got %s" %
+                             num_blocks)
+        self.release_queue = release_queue
+        self.num_blocks = num_blocks
+        self.blocks = [None] * num_blocks
+        self.free_slots = list(range(num_blocks))
+
+    def _acquire(self):
+        while True:
+            try:
+                self.free_slots.append(self.release_queue.get_nowait())
+            except queue.Empty:
+                break
+        if len(self.free_slots) == 0:
+            self.free_slots.append(self.release_queue.get())
+        return self.free_slots.pop()
+
+    def write(self, data):
+        """Write data into a free block and return its descriptor.
+        """
+        arrays = []
+        skeleton = flatten_arrays(data, arrays)
+        metas = []
+        offset = 0
+        for i, array in enumerate(arrays):
+            if not array.flags.c_contiguous:
+                array = array.copy(order="C")
+                arrays[i] = array
+            offset = (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+            metas.append((offset, array.shape, array.dtype.str))
+            offset += array.nbytes
+
+        slot = self._acquire()
+        block = self.blocks[slot]
+        if block is None or block.size < offset:
+            if block is not None:
+                block.close()
+                block.unlink()
+            # leave some room to avoid reallocating for slightly larger batches
+            block = _shared_memory().SharedMemory(
+                create=True, size=max(int(offset * 1.25), _ALIGNMENT))
+            self.blocks[slot] = block
+
+        buf = np.ndarray([block.size], dtype=np.uint8, buffer=block.buf)
+        for array, (offset, shape, dtype) in zip(arrays, metas):
+            buf[offset:offset + array.nbytes] = array.reshape([-1]).view(
+                np.uint8)
+        del buf
+        return _ShmBatch(
+            slot=slot, name=block.name, metas=metas, skeleton=skeleton)
+
+    def close(self, timeout=60):
+        """Wait for the trainer to release all blocks and unlink them.
+        """
+        try:
+            while len(self.free_slots) < self.num_blocks:
+                self.free_slots.append(
+                    self.release_queue.get(timeout=timeout))
+        except queue.Empty:
+            pass
+        for block in self.blocks:
+            if block is not None:
+                block.close()
+                block.unlink()
+        self.blocks = [None] * self.num_blocks
+
+
+def _attach_shared_memory(name):
+    """Map the shared memory block as a buffer owned by the returned arrays.
+    """
+    # The block is registered to the resource tracker again, which is shared
+    # with the writer (see ensure_resource_tracker) and is cleared when the
+    # writer unlinks the block.
+    block = _shared_memory().SharedMemory(name=name)
+
+    fd = getattr(block, "_fd", -1)
+    if fd < 0:
+        # Without a file descriptor (Windows), the block itself is used
+        # and kept open as long as the process lives.
+        _KEPT_BLOCKS.append(block)
+        return block.buf
+
+    # Map the block once more with a mmap object which is released only
+    # when all the arrays built on it are freed, so that the block can be
+    # closed right now without invalidating the arrays.
+    buf = mmap.mmap(fd, block.size)
+    block.close()
+    return buf
+
+
+_KEPT_BLOCKS = []
+
+
+class ShmReader(object):
+    """Rebuild batches written by ShmWriter without copying.
+
+    It lives in the trainer process. The arrays of a batch are views of the
+    shared memory, and the writer will reuse the memory after :code:`release`
+    of the batch is called. Copy them if they are needed after that.
+
+    Args:
+
+        release_queue: A multiprocessing.Queue to give released slots back
+                       to the writer.
+    """
+
+    def __init__(self, release_queue):
+        self.release_queue = release_queue
+        self.buffers = {}
+
+    def _attach(self, slot, name):
+        name_buf = self.buffers.get(slot, None)
+        if name_buf is None or name_buf[0] != name:
+            # the writer has reallocated a larger block for this slot
+            name_buf = (name, _attach_shared_memory(name))
+            self.buffers[slot] = name_buf
+        return name_buf[1]
+
+    def read(self, batch):
+        """Rebuild the batch data from the descriptor.
+        """
+        buf = self._attach(batch.slot, batch.name)
+        arrays = []
+        for offset, shape, dtype in batch.metas:
+            dtype = np.dtype(dtype)
+            count = int(np.prod(shape))
+            array = np.frombuffer(
+                buf, dtype=dtype, count=count, offset=offset)
+            arrays.append(array.reshape(shape))
+        return restore_arrays(batch.skeleton, arrays)
+
+    def release(self, batch):
+        """Give the block of the consumed batch back to the writer.
+        """
+        self.release_queue.put(batch.slot)
+
+    def close(self):
+        # The mappings are freed with the last arrays referring to them.
+        self.buffers = {}
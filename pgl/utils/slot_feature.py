@@ -0,0 +1,222 @@
+# Copyright (c) 2022 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""This package implements the CSR store of multi-valued slot features.
+"""
+
+import os
+
+import numpy as np
+
+from pgl import graph_kernel
+
+__all__ = ["SlotFeature"]
+
+
+class SlotFeature(object):
+    """Store multi-valued int64 slot features of nodes in CSR arrays.
+
+    Each slot has an indptr with shape [num_rows + 1] and the values of all
+    rows, so the features of a batch of nodes are gathered with array
+    operations, and the arrays can be memory-mapped by :code:`load`.
+
+    Args:
+
+        slots: A list of slot names.
+
+        indptrs: A list of indptr for each slot.
+
+        values: A list of int64 values for each slot.
+
+        node_ids: (default None) The node id of each row. If None, the row
+                  of node i is i.
+
+        sorted_rows: (default None) The rows sorted by node_ids. If None, it
+                     is computed from node_ids.
+
+        sorted_ids: (default None) The node_ids of sorted_rows. If None, it
+                    is gathered from node_ids.
+    """
+
+    def __init__(self, slots, indptrs, values, node_ids=None,
+                 sorted_rows=None, sorted_ids=None):
+        self._slots = [str(slot) for slot in slots]
+        self._indptrs = list(indptrs)
+        self._values = list(values)
+        self._node_ids = node_ids
+        self._sorted_ids = None
+        self._sorted_rows = None
+        if node_ids is not None:
+            if sorted_rows is None:
+                sorted_rows = np.argsort(node_ids, kind="stable")
+                sorted_ids = None
+            if sorted_ids is None:
+                sorted_ids = np.asarray(node_ids)[sorted_rows]
+            self._sorted_rows = sorted_rows
+            self._sorted_ids = sorted_ids
+
+    @classmethod
+    def from_strings(cls, feats, slots, node_ids=None):
+        """Parse slot features like "1:583,2:697,2:15" in a compiled loop.
+
+        Args:
+
+            feats: A list of str (or bytes) for each row. Each of them is a
+                   comma separated list of "slot:value". Unknown slots and
+                   values that are not integers are skipped, and values out
+                   of the range of int64 raise OverflowError.
+
+            slots: A list of slot names to keep.
+
+            node_ids: (default None) The node id of each row.
+        """
+        slots = [str(slot) for slot in slots]
+        feats = [f.decode("utf-8") if isinstance(f, bytes) else f
+                 for f in feats]
+        # newlines separate the rows, so they can not appear in features
+        data = "\n".join(f.replace("\n", ",") for f in feats)
+        outputs = graph_kernel.parse_slot_feature(
+            data.encode("utf-8"), len(feats), slots)
+        indptrs = [indptr for indptr, _ in outputs]
+        values = [value for _, value in outputs]
+        return cls(slots, indptrs, values, node_ids=node_ids)
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        """Load SlotFeature from path.
+
+        Args:
+
+            path: The directory path of the stored SlotFeature.
+
+            mmap_mode: Default :code:`mmap_mode="r"`. If not None, memory-map
+                       the arrays.
+        """
+        slots = np.load(os.path.join(path, "slots.npy")).tolist()
+        indptrs, values = [], []
+        for i in range(len(slots)):
+            indptrs.append(
+                np.load(
+                    os.path.join(path, "indptr_%s.npy" % i),
+                    mmap_mode=mmap_mode))
+            values.append(
+                np.load(
+                    os.path.join(path, "values_%s.npy" % i),
+                    mmap_mode=mmap_mode))
+        node_ids = sorted_rows = sorted_ids = None
+        if os.path.exists(os.path.join(path, "node_ids.npy")):
+            node_ids = np.load(
+                os.path.join(path, "node_ids.npy"), mmap_mode=mmap_mode)
+        # the sort order is saved by dump, so it is not sorted again here
+        if os.path.exists(os.path.join(path, "sorted_rows.npy")):
+            sorted_rows = np.load(
+                os.path.join(path, "sorted_rows.npy"), mmap_mode=mmap_mode)
+            sorted_ids = np.load(
+                os.path.join(path, "sorted_ids.npy"), mmap_mode=mmap_mode)
+        return cls(slots,
+                   indptrs,
+                   values,
+                   node_ids=node_ids,
+                   sorted_rows=sorted_rows,
+                   sorted_ids=sorted_ids)
+
+    def dump(self, path):
+        """Dump the CSR arrays into path as npy files.
+        """
+        if not os.path.exists(path):
+            os.makedirs(path)
+        np.save(os.path.join(path, "slots.npy"), np.array(self._slots))
+        for i in range(len(self._slots)):
+            np.save(
+                os.path.join(path, "indptr_%s.npy" % i), self._indptrs[i])
+            np.save(os.path.join(path, "values_%s.npy" % i), self._values[i])
+        if self._node_ids is not None:
+            np.save(os.path.join(path, "node_ids.npy"), self._node_ids)
+            np.save(os.path.join(path, "sorted_rows.npy"), self._sorted_rows)
+            np.save(os.path.join(path, "sorted_ids.npy"), self._sorted_ids)
+
+    @property
+    def slots(self):
+        """Return the slot names.
+        """
+        return self._slots
+
+    @property
+    def num_rows(self):
+        """Return the number of rows.
+        """
+        return len(self._indptrs[0]) - 1 if len(self._indptrs) > 0 else 0
+
+    def row_index(self, nodes):
+        """Return the rows of nodes, where unknown nodes are -1.
+        """
+        if self._sorted_ids is None:
+            rows = np.array(nodes, dtype="int64").reshape([-1])
+            rows[(rows < 0) | (rows >= self.num_rows)] = -1
+            return rows
+
+        nodes = np.asarray(nodes, dtype=self._sorted_ids.dtype).reshape([-1])
+        if len(self._sorted_ids) == 0:
+            return np.full([len(nodes)], -1, dtype="int64")
+        pos = np.searchsorted(self._sorted_ids, nodes)
+        pos = np.minimum(pos, len(self._sorted_ids) - 1)
+        found = self._sorted_ids[pos] == nodes
+        return np.where(found, self._sorted_rows[pos], -1).astype("int64")
+
+    def gather(self, nodes, slots=None, pad_value=None):
+        """Gather the slot features of nodes.
+
+        Args:
+
+            nodes: The node ids to gather.
+
+            slots: (default None) The slots to gather. If None, all slots.
+
+            pad_value: (default None) If not None, a node without values in
+                       a slot (or an unknown node) gets one pad_value.
+
+        Return:
+
+            A dict from slot name to (values, segment_ids), where
+            segment_ids[j] is the index in nodes of values[j].
+        """
+        if slots is None:
+            slots = self._slots
+        rows = self.row_index(nodes)
+        valid = rows >= 0
+        safe_rows = np.where(valid, rows, 0)
+        segment_range = np.arange(len(rows), dtype="int64")
+
+        outputs = {}
+        for slot in slots:
+            slot_idx = self._slots.index(str(slot))
+            indptr = self._indptrs[slot_idx]
+            start = np.where(valid, indptr[safe_rows], 0)
+            counts = np.where(valid, indptr[safe_rows + 1] - start, 0)
+            if pad_value is not None:
+                out_counts = np.maximum(counts, 1)
+            else:
+                out_counts = counts
+
+            segment_ids = np.repeat(segment_range, out_counts)
+            offsets = np.cumsum(out_counts) - out_counts
+            local = np.arange(
+                len(segment_ids), dtype="int64") - offsets[segment_ids]
+            is_value = local < counts[segment_ids]
+            values = np.empty([len(segment_ids)], dtype="int64")
+            values[is_value] = self._values[slot_idx][
+                start[segment_ids[is_value]] + local[is_value]]
+            if pad_value is not None:
+                values[~is_value] = pad_value
+            outputs[str(slot)] = (values, segment_ids)
+        return outputs
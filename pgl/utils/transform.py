@@ -18,50 +18,224 @@
 import numpy as np
 import pgl
 import paddle
+from pgl import graph_kernel
 from pgl.math import segment_sum
+from pgl.utils.edge_index import EdgeIndex
 from pgl.utils.helper import maybe_num_nodes
 
 
-def to_undirected(graph, copy_node_feat=True, copy_edge_feat=False):
-    """Convert a graph to an undirected graph.
-    
+_REDUCE = ["sum", "mean", "max", "min", "first"]
+
+
+def _check_numpy(graph):
+    if graph.is_tensor():
+        raise TypeError("The input graph should be numpy format.")
+
+
+def _copy_node_feat(graph, g):
+    for k, v in graph._node_feat.items():
+        g._node_feat[k] = v
+
+
+def _src_index(u, v, num_nodes):
+    """Build the adj_src_index of edges sorted by u with eids in order.
+    """
+    degree = np.bincount(u, minlength=num_nodes).astype("int64")
+    indptr = np.zeros([num_nodes + 1], dtype="int64")
+    np.cumsum(degree, out=indptr[1:])
+    return EdgeIndex.from_index(
+        sorted_v=v,
+        sorted_u=u,
+        sorted_eid=np.arange(
+            len(u), dtype="int64"),
+        degree=degree,
+        indptr=indptr)
+
+
+def _merge_index(index_a, index_b, eid_offset):
+    """Merge the segments of two EdgeIndex of the same nodes in O(E), where
+    the eids of index_b are shifted by eid_offset.
+    """
+    indptr_a, indptr_b = index_a._indptr, index_b._indptr
+    num_nodes = len(indptr_a) - 1
+    nodes = np.arange(num_nodes, dtype="int64")
+    len_a, len_b = indptr_a[-1], indptr_b[-1]
+    # the segment of u is the v of index_a followed by the v of index_b
+    pos_a = np.arange(
+        len_a, dtype="int64") + np.repeat(indptr_b[:-1], index_a.degree)
+    pos_b = np.arange(
+        len_b, dtype="int64") + np.repeat(indptr_a[1:], index_b.degree)
+
+    sorted_u = np.repeat(nodes, index_a.degree + index_b.degree)
+    sorted_v = np.empty([len_a + len_b], dtype="int64")
+    sorted_eid = np.empty([len_a + len_b], dtype="int64")
+    sorted_v[pos_a] = index_a._sorted_v
+    sorted_v[pos_b] = index_b._sorted_v
+    sorted_eid[pos_a] = index_a._sorted_eid
+    sorted_eid[pos_b] = index_b._sorted_eid + eid_offset
+    return EdgeIndex.from_index(
+        sorted_v=sorted_v,
+        sorted_u=sorted_u,
+        sorted_eid=sorted_eid,
+        degree=index_a.degree + index_b.degree,
+        indptr=indptr_a + indptr_b)
+
+
+def _drop_reversed_self_loops(edge_index, num_edges):
+    """Drop the reversed copies (eid >= num_edges) of self-loops, which
+    are the same edges as the self-loops themselves.
+    """
+    sorted_u, sorted_v = edge_index._sorted_u, edge_index._sorted_v
+    keep = (edge_index._sorted_eid < num_edges) | (sorted_u != sorted_v)
+    if keep.all():
+        return edge_index
+    num_nodes = len(edge_index._indptr) - 1
+    degree = np.bincount(
+        sorted_u[keep], minlength=num_nodes).astype("int64")
+    indptr = np.zeros([num_nodes + 1], dtype="int64")
+    np.cumsum(degree, out=indptr[1:])
+    return EdgeIndex.from_index(
+        sorted_v=sorted_v[keep],
+        sorted_u=sorted_u[keep],
+        sorted_eid=edge_index._sorted_eid[keep],
+        degree=degree,
+        indptr=indptr)
+
+
+def _reduce_feat(feat, perm, starts, reduce):
+    """Reduce feat[perm] in the segments beginning at starts.
+    """
+    feat = np.asarray(feat)
+    if len(starts) == 0:
+        return feat[:0]
+    feat = feat[perm]
+    if reduce == "first":
+        return feat[starts]
+    elif reduce == "max":
+        return np.maximum.reduceat(feat, starts, axis=0)
+    elif reduce == "min":
+        return np.minimum.reduceat(feat, starts, axis=0)
+    feat = np.add.reduceat(feat, starts, axis=0)
+    if reduce == "mean":
+        counts = np.diff(np.append(starts, len(perm)))
+        feat = feat / counts.reshape([-1] + [1] * (feat.ndim - 1))
+    return feat
+
+
+def _coalesce(num_nodes, edge_index, edge_feat, reduce, num_feat_edges):
+    """Remove duplicated edges of an EdgeIndex sorted by src.
+
+    The eids of edge_index index edge_feat modulo num_feat_edges.
+    """
+    if reduce not in _REDUCE:
+        raise ValueError("reduce should be in %s." % _REDUCE)
+    sorted_v, perm, is_first = graph_kernel.coalesce_by_segment(
+        edge_index._indptr, edge_index._sorted_v, edge_index._sorted_eid)
+    u = edge_index._sorted_u[is_first]
+    v = sorted_v[is_first]
+    starts = np.flatnonzero(is_first)
+
+    new_edge_feat = {}
+    if len(edge_feat) > 0:
+        feat_perm = perm % num_feat_edges if num_feat_edges > 0 else perm
+        for k, feat in edge_feat.items():
+            new_edge_feat[k] = _reduce_feat(feat, feat_perm, starts, reduce)
+
+    return pgl.graph.Graph(
+        num_nodes=num_nodes,
+        edges=np.stack(
+            [u, v], axis=1),
+        edge_feat=new_edge_feat,
+        adj_src_index=_src_index(u, v, num_nodes))
+
+
+def coalesce(graph, reduce="sum", copy_node_feat=True, copy_edge_feat=False):
+    """Remove duplicated edges of a graph.
+
+    Edges are grouped by src with a counting sort (or the adj_src_index of
+    the graph if it has been built) and deduplicated within each src, so
+    the cost is linear in the number of edges for bounded degrees.
+
     Args:
 
         graph (pgl.Graph): The input graph, should be in numpy format.
 
+        reduce (str): The reduction of the edge features of duplicated
+                      edges, in "sum", "mean", "max", "min" and "first".
+
         copy_node_feat (bool): Whether to copy node feature in return graph. Default: True.
- 
-        copy_edge_feat (bool): [Alternate input] Whether to copy edge feature in return graph.
+
+        copy_edge_feat (bool): Whether to copy the reduced edge feature in return graph.
 
     Returns:
 
-        g (pgl.Graph): Returns an undirected graph.
+        g (pgl.Graph): Returns a graph with edges sorted by (src, dst).
 
     """
+    _check_numpy(graph)
+    edge_index = graph._adj_src_index
+    if edge_index is None:
+        edge_index = EdgeIndex.from_edges(
+            u=graph.edges[:, 0],
+            v=graph.edges[:, 1],
+            num_nodes=graph.num_nodes)
+    g = _coalesce(graph.num_nodes, edge_index, graph.edge_feat
+                  if copy_edge_feat else {}, reduce, graph.num_edges)
+    if copy_node_feat:
+        _copy_node_feat(graph, g)
+    return g
 
-    if graph.is_tensor():
-        raise TypeError("The input graph should be numpy format.")
 
-    inv_edges = np.zeros(graph.edges.shape)
-    inv_edges[:, 0] = graph.edges[:, 1]
-    inv_edges[:, 1] = graph.edges[:, 0]
-    edges = np.vstack((graph.edges, inv_edges))
-    edges = np.unique(edges, axis=0)
-    g = pgl.graph.Graph(num_nodes=graph.num_nodes, edges=edges)
+def to_undirected(graph,
+                  copy_node_feat=True,
+                  copy_edge_feat=False,
+                  reduce="sum"):
+    """Convert a graph to an undirected graph.
 
-    if copy_node_feat:
-        for k, v in graph._node_feat.items():
-            g._node_feat[k] = v
+    The reversed edges of non-self-loop edges are added and the duplicated
+    edges are removed.
+    If both adj_src_index and adj_dst_index of the graph have been built,
+    they are merged instead of sorting the edges again.
 
-    if copy_edge_feat:
-        # TODO(daisiming): Support duplicate edge_feature.
-        raise NotImplementedError(
-            "The copy of edge feature is not implemented currently.")
+    Args:
+
+        graph (pgl.Graph): The input graph, should be in numpy format.
+
+        copy_node_feat (bool): Whether to copy node feature in return graph. Default: True.
+ 
+        copy_edge_feat (bool): Whether to copy edge feature in return graph.
+                               A reversed edge shares the feature of its edge.
+
+        reduce (str): The reduction of the edge features of duplicated
+                      edges, in "sum", "mean", "max", "min" and "first".
 
+    Returns:
+
+        g (pgl.Graph): Returns an undirected graph with edges sorted by (src, dst).
+
+    """
+    _check_numpy(graph)
+    num_edges = graph.num_edges
+    if graph._adj_src_index is not None and graph._adj_dst_index is not None:
+        edge_index = _merge_index(graph._adj_src_index,
+                                  graph._adj_dst_index, num_edges)
+    else:
+        edges = graph.edges
+        u = np.concatenate([edges[:, 0], edges[:, 1]])
+        v = np.concatenate([edges[:, 1], edges[:, 0]])
+        edge_index = EdgeIndex.from_edges(
+            u=u, v=v, num_nodes=graph.num_nodes)
+    edge_index = _drop_reversed_self_loops(edge_index, num_edges)
+
+    g = _coalesce(graph.num_nodes, edge_index, graph.edge_feat
+                  if copy_edge_feat else {}, reduce, num_edges)
+    if copy_node_feat:
+        _copy_node_feat(graph, g)
     return g
 
 
-def add_self_loops(graph, copy_node_feat=True, copy_edge_feat=False):
+def add_self_loops(graph, copy_node_feat=True, copy_edge_feat=False,
+                   fill_value=0):
     """Add self-loops to the given graph.
 
     Args:
@@ -70,31 +244,112 @@ def add_self_loops(graph, copy_node_feat=True, copy_edge_feat=False):
 
         copy_node_feat (bool): Whether to copy node feature in return graph. Default: True.
 
-        copy_edge_feat (bool): [Alternate input] Whether to copy edge feature in return graph.
+        copy_edge_feat (bool): Whether to copy edge feature in return graph.
+
+        fill_value: The edge feature of self-loops. It can be a scalar, or
+                    "sum", "mean", "max" and "min" to reduce the features of
+                    the incoming edges of each node. Nodes without incoming
+                    edges are filled with 0.
     
     Returns:
 
         g (pgl.Graph): Returns a graph with self-loops.
 
     """
+    _check_numpy(graph)
+    num_nodes = graph.num_nodes
+    nodes = np.arange(num_nodes, dtype="int64")
+    edges = np.concatenate([graph.edges, np.stack([nodes, nodes], axis=1)])
 
-    if graph.is_tensor():
-        raise TypeError("The input graph should be numpy format.")
+    edge_feat = {}
+    if copy_edge_feat:
+        for k, feat in graph.edge_feat.items():
+            feat = np.asarray(feat)
+            if isinstance(fill_value, str):
+                if fill_value not in _REDUCE[:-1]:
+                    raise ValueError("fill_value should be a scalar or in %s."
+                                     % _REDUCE[:-1])
+                index = graph.adj_dst_index
+                has_edges = index.degree > 0
+                loop_feat = np.zeros(
+                    (num_nodes, ) + feat.shape[1:],
+                    dtype=np.result_type(feat.dtype, np.float32)
+                    if fill_value == "mean" else feat.dtype)
+                loop_feat[has_edges] = _reduce_feat(
+                    feat, index._sorted_eid, index._indptr[:-1][has_edges],
+                    fill_value)
+            else:
+                loop_feat = np.full(
+                    (num_nodes, ) + feat.shape[1:],
+                    fill_value,
+                    dtype=feat.dtype)
+            edge_feat[k] = np.concatenate([feat, loop_feat.astype(feat.dtype)])
+
+    g = pgl.graph.Graph(num_nodes=num_nodes, edges=edges, edge_feat=edge_feat)
+    if copy_node_feat:
+        _copy_node_feat(graph, g)
+    return g
 
-    self_loop_edges = np.zeros((graph.num_nodes, 2))
-    self_loop_edges[:, 0] = self_loop_edges[:, 1] = np.arange(graph.num_nodes)
-    edges = np.vstack((graph.edges, self_loop_edges))
-    g = pgl.graph.Graph(num_nodes=graph.num_nodes, edges=edges)
 
-    if copy_node_feat:
-        for k, v in graph._node_feat.items():
-            g._node_feat[k] = v
+def remove_self_loops(graph, copy_node_feat=True, copy_edge_feat=False):
+    """Remove self-loops from the given graph.
+
+    Args:
 
+        graph (pgl.Graph): The input graph, should be in numpy format.
+
+        copy_node_feat (bool): Whether to copy node feature in return graph. Default: True.
+
+        copy_edge_feat (bool): Whether to copy edge feature in return graph.
+
+    Returns:
+
+        g (pgl.Graph): Returns a graph without self-loops.
+
+    """
+    _check_numpy(graph)
+    edges = graph.edges
+    mask = edges[:, 0] != edges[:, 1]
+    edge_feat = {}
     if copy_edge_feat:
-        # TODO(daisiming): Generate edge_feature of self-loops.
-        raise NotImplementedError(
-            "The copy of edge feature is not implemented currently.")
+        for k, feat in graph.edge_feat.items():
+            edge_feat[k] = np.asarray(feat)[mask]
 
+    g = pgl.graph.Graph(
+        num_nodes=graph.num_nodes, edges=edges[mask], edge_feat=edge_feat)
+    if copy_node_feat:
+        _copy_node_feat(graph, g)
+    return g
+
+
+def reverse(graph, copy_node_feat=True, copy_edge_feat=False):
+    """Reverse the direction of all edges in the given graph.
+
+    The edge ids are kept, and the built adj_src_index and adj_dst_index
+    of the graph are swapped into the reversed graph without rebuilding.
+
+    Args:
+
+        graph (pgl.Graph): The input graph, should be in numpy format.
+
+        copy_node_feat (bool): Whether to copy node feature in return graph. Default: True.
+
+        copy_edge_feat (bool): Whether to copy edge feature in return graph.
+
+    Returns:
+
+        g (pgl.Graph): Returns the reversed graph.
+
+    """
+    _check_numpy(graph)
+    g = pgl.graph.Graph(
+        num_nodes=graph.num_nodes,
+        edges=graph.edges[:, ::-1].copy(),
+        edge_feat=dict(graph.edge_feat) if copy_edge_feat else None,
+        adj_src_index=graph._adj_dst_index,
+        adj_dst_index=graph._adj_src_index)
+    if copy_node_feat:
+        _copy_node_feat(graph, g)
     return g
 
 
@@ -12,6 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+import tempfile
 import unittest
 import numpy as np
 
@@ -70,6 +72,66 @@ class ConvTest(unittest.TestCase):
         paddle.set_default_dtype("float64")
         self.run_graph_conv("float64")
 
+    def test_layerwise_inference(self):
+        paddle.set_default_dtype("float32")
+        np.random.seed(0)
+        num_nodes = 50
+        edges = np.random.randint(0, num_nodes, size=[300, 2])
+        nfeat = np.random.randn(num_nodes, global_feat_dim).astype("float32")
+        g = pgl.Graph(edges=edges, num_nodes=num_nodes)
+        tensor_g = pgl.Graph(edges=edges, num_nodes=num_nodes).tensor()
+
+        layers = [
+            pgl.nn.GCNConv(global_feat_dim, global_feat_dim),
+            pgl.nn.GraphSageConv(global_feat_dim, global_feat_dim),
+            pgl.nn.GATConv(global_feat_dim, global_feat_dim),
+        ]
+        for layer in layers:
+            layer.eval()
+
+        def layer_fn(layer_idx, layer, graph, feature, norm=None):
+            if isinstance(layer, pgl.nn.GCNConv):
+                feature = layer(graph, feature, norm=norm)
+            else:
+                feature = layer(graph, feature)
+            return paddle.nn.functional.relu(feature)
+
+        with paddle.no_grad():
+            feature = paddle.to_tensor(nfeat)
+            for layer in layers:
+                feature = layer_fn(0, layer, tensor_g, feature)
+            ground = feature.numpy()
+
+        output = pgl.nn.layerwise_inference(
+            g, layers, nfeat, batch_size=7, layer_fn=layer_fn)
+        self.assertTrue(np.allclose(ground, output, atol=1e-5))
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            output = pgl.nn.layerwise_inference(
+                g,
+                layers,
+                nfeat,
+                batch_size=16,
+                layer_fn=layer_fn,
+                output_dir=output_dir)
+            self.assertTrue(isinstance(output, np.memmap))
+            self.assertTrue(np.allclose(ground, output, atol=1e-5))
+            self.assertEqual(
+                sorted(os.listdir(output_dir)),
+                ["layer_0.npy", "layer_1.npy", "layer_2.npy"])
+            del output
+
+        empty_g = pgl.Graph(
+            edges=np.zeros(
+                [0, 2], dtype="int64"), num_nodes=0)
+        output = pgl.nn.layerwise_inference(
+            empty_g, layers, nfeat[:0], layer_fn=layer_fn)
+        self.assertEqual(output.shape, (0, nfeat.shape[1]))
+        # the output width is the one of the last layer
+        output = pgl.nn.layerwise_inference(
+            empty_g, [pgl.nn.GraphSageConv(global_feat_dim, 7)], nfeat[:0])
+        self.assertEqual(output.shape, (0, 7))
+
 
 if __name__ == "__main__":
     unittest.main()
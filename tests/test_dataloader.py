@@ -19,6 +19,9 @@ import json
 import os
 import random
 
+import numpy as np
+
+import pgl
 from pgl.utils.data.dataset import Dataset, StreamDataset
 from pgl.utils.data.dataloader import Dataloader
 
@@ -165,6 +168,132 @@ class DataloaderTest(unittest.TestCase):
                 res.extend(batch_data['data'])
             self.assertEqual([i for i in range(DATA_SIZE)], res)
 
+    def test_ListDataset_SharedMemory(self):
+        def graph_collate_fn(batch_examples):
+            graphs = []
+            for example in batch_examples:
+                edges = np.array([[example, example + 1], [example + 1, 0]])
+                g = pgl.Graph(
+                    edges=edges,
+                    num_nodes=example + 2,
+                    node_feat={
+                        "feat": np.arange(
+                            example + 2, dtype="float32").reshape([-1, 1])
+                    })
+                # build the index in the worker
+                g.adj_dst_index
+                graphs.append(g)
+            return {"graphs": graphs, "data": np.array(batch_examples)}
+
+        loader = Dataloader(
+            ListDataset(),
+            batch_size=2,
+            num_workers=4,
+            collate_fn=graph_collate_fn,
+            use_shared_memory=True)
+
+        for e in range(2):
+            res = []
+            for batch_data in loader:
+                for example, g in zip(batch_data["data"],
+                                      batch_data["graphs"]):
+                    self.assertEqual(g.num_nodes, example + 2)
+                    self.assertEqual(g.edges.tolist(),
+                                     [[example, example + 1],
+                                      [example + 1, 0]])
+                    self.assertEqual(g.node_feat["feat"][:, 0].tolist(),
+                                     list(range(example + 2)))
+                    self.assertEqual(
+                        g.predecessor([0]).tolist(), [[example + 1]])
+                res.extend(batch_data["data"].tolist())
+            self.assertEqual([i for i in range(DATA_SIZE)], res)
+
+    def test_ListDataset_LoadBalance(self):
+        collate_fn = Collate_fn({})
+        for ordered in [False, True]:
+            loader = Dataloader(
+                ListDataset(),
+                batch_size=2,
+                num_workers=4,
+                collate_fn=collate_fn,
+                load_balance=True,
+                ordered=ordered,
+                prefetch_depth=1)
+            res = []
+            for batch_data in loader:
+                res.extend(batch_data['data'])
+            if ordered:
+                self.assertEqual([i for i in range(DATA_SIZE)], res)
+            else:
+                self.assertEqual(set([i for i in range(DATA_SIZE)]), set(res))
+                self.assertEqual(len(res), DATA_SIZE)
+            self.assertEqual(
+                sum([stats.num_batches for stats in loader.worker_stats]),
+                len(loader))
+            for stats in loader.worker_stats:
+                self.assertGreaterEqual(stats.avg_latency, 0)
+
+    def test_ListDataset_LoadBalance_SharedMemory(self):
+        def collate_fn(batch_examples):
+            return {"data": np.array(batch_examples, dtype="int64")}
+
+        loader = Dataloader(
+            ListDataset(),
+            batch_size=3,
+            shuffle=True,
+            num_workers=3,
+            collate_fn=collate_fn,
+            load_balance=True,
+            ordered=True,
+            use_shared_memory=True)
+        res = []
+        for batch_data in loader:
+            res.extend(batch_data["data"].tolist())
+        self.assertEqual(sorted(res), [i for i in range(DATA_SIZE)])
+
+        # stop in the middle of an epoch
+        for batch_data in loader:
+            break
+
+    def test_ListDataset_PersistentWorkers(self):
+        def collate_fn(batch_examples):
+            return {
+                "data": np.array(batch_examples, dtype="int64"),
+                "pid": os.getpid(),
+                "rand": np.random.rand(),
+            }
+
+        for load_balance in [False, True]:
+            loader = Dataloader(
+                ListDataset(),
+                batch_size=2,
+                num_workers=2,
+                collate_fn=collate_fn,
+                load_balance=load_balance,
+                persistent_workers=True,
+                use_shared_memory=load_balance)
+            pids, rands = [], []
+            for e in range(3):
+                res = []
+                for batch_data in loader:
+                    res.extend(batch_data["data"].tolist())
+                    pids.append(batch_data["pid"])
+                    rands.append(batch_data["rand"])
+                if load_balance:
+                    self.assertEqual(sorted(res), list(range(DATA_SIZE)))
+                else:
+                    self.assertEqual(res, list(range(DATA_SIZE)))
+
+                # stop in the middle of an epoch
+                for batch_data in loader:
+                    break
+
+            # the same workers are used in all epochs
+            self.assertEqual(len(set(pids)), 2)
+            # and reseeded in every epoch
+            self.assertEqual(len(set(rands)), len(rands))
+            loader.close()
+
 
 if __name__ == "__main__":
     unittest.main()
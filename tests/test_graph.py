@@ -14,6 +14,7 @@
 
 import os
 
+import tempfile
 import unittest
 import numpy as np
 import paddle
@@ -98,6 +99,133 @@ class GraphTest(unittest.TestCase):
         self.assertEqual(set(succ[3]), set([4]))
         self.assertEqual(set(succ[4]), set([]))
 
+    def test_sample_flat(self):
+        num_nodes = 5
+        edges = [(0, 1), (0, 2), (1, 2), (3, 4), (0, 3), (0, 4)]
+        g1 = pgl.Graph(edges=edges, num_nodes=num_nodes)
+
+        succ, succ_eid, counts = g1.sample_successor(
+            [0, 1, 2], max_degree=2, return_eids=True, return_flat=True)
+        self.assertEqual(counts.tolist(), [2, 1, 0])
+        self.assertEqual(len(succ), 3)
+        self.assertEqual(len(set(succ[:2])), 2)
+        self.assertTrue(set(succ[:2]).issubset(set([1, 2, 3, 4])))
+        self.assertEqual(succ[2], 2)
+        for v, eid in zip(succ, succ_eid):
+            self.assertEqual(g1.edges[eid, 1], v)
+
+        pred, counts = g1.sample_predecessor(
+            [2, 4], max_degree=-1, return_flat=True)
+        self.assertEqual(counts.tolist(), [2, 2])
+        self.assertEqual(set(pred[:2]), set([0, 1]))
+        self.assertEqual(set(pred[2:]), set([0, 3]))
+
+    def test_sample_weighted(self):
+        num_nodes = 4
+        edges = [(0, 1), (0, 2), (0, 3), (1, 2)]
+        weight = np.array([0.0, 1.0, 3.0, 1.0])
+        g1 = pgl.Graph(edges=edges, num_nodes=num_nodes)
+        g1.adj_src_index.build_alias_table(weight)
+
+        np.random.seed(1)
+        succ, succ_eid, counts = g1.sample_successor(
+            [0] * 2000 + [1],
+            max_degree=1,
+            return_eids=True,
+            return_flat=True,
+            weighted=True)
+        self.assertEqual(counts.tolist(), [1] * 2001)
+        self.assertEqual(succ[-1], 2)
+        self.assertNotIn(1, succ[:2000].tolist())
+        ratio = np.mean(succ[:2000] == 3)
+        self.assertTrue(0.7 < ratio < 0.8)
+        self.assertTrue(np.all(g1.edges[succ_eid, 1] == succ))
+
+        succ = g1.sample_successor([0, 2], max_degree=2, weighted=True)
+        self.assertEqual(len(succ), 2)
+        self.assertEqual(len(succ[0]), 2)
+        self.assertEqual(len(succ[1]), 0)
+
+        with tempfile.TemporaryDirectory() as path:
+            g1.dump(path)
+            g2 = pgl.Graph.load(path)
+            self.assertTrue(g2.adj_src_index.has_alias_table())
+            succ, counts = g2.sample_successor(
+                [0] * 10, max_degree=1, return_flat=True, weighted=True)
+            self.assertNotIn(1, succ.tolist())
+
+    def test_sample_weighted_small_degree(self):
+        num_nodes = 4
+        edges = [(0, 1), (0, 2), (0, 3), (1, 2), (1, 3)]
+        weight = np.array([0.0, 1.0, 3.0, 0.0, 0.0])
+        g1 = pgl.Graph(edges=edges, num_nodes=num_nodes)
+        g1.adj_src_index.build_alias_table(weight)
+
+        # nodes with degree <= max_degree are sampled by weights too, and
+        # the successors with zero weight are never drawn
+        for max_degree, count in [(2, 2), (5, 5), (-1, 3)]:
+            succ, succ_eid, counts = g1.sample_successor(
+                [0, 0, 1],
+                max_degree=max_degree,
+                return_eids=True,
+                return_flat=True,
+                weighted=True)
+            self.assertEqual(counts.tolist(), [count, count, 0])
+            self.assertNotIn(1, succ.tolist())
+            self.assertNotIn(0, succ_eid.tolist())
+            self.assertTrue(np.all(g1.edges[succ_eid, 1] == succ))
+
+    def test_build_index_on_disk(self):
+        from pgl.utils.edge_index import EdgeIndex
+
+        g1 = create_random_graph()
+        for num_threads in [1, 3]:
+            with tempfile.TemporaryDirectory() as path:
+                g1.dump(
+                    path,
+                    indegree=True,
+                    outdegree=True,
+                    num_threads=num_threads)
+                self.assertFalse(
+                    os.path.exists(
+                        os.path.join(path, "adj_src", "partial_degree.npy")))
+                g2 = pgl.Graph.load(path)
+                for index1, index2 in [
+                    (g1.adj_src_index, g2.adj_src_index),
+                    (g1.adj_dst_index, g2.adj_dst_index)
+                ]:
+                    self.assertTrue(np.all(index1.degree == index2.degree))
+                    self.assertTrue(np.all(index1._indptr == index2._indptr))
+                    for a, b in zip(index1.triples(), index2.triples()):
+                        self.assertTrue(np.all(a == b))
+            g1._adj_src_index = None
+            g1._adj_dst_index = None
+
+        with tempfile.TemporaryDirectory() as path:
+            # more threads than edges leaves some chunks empty
+            index = EdgeIndex.build_on_disk(
+                g1.edges[:2], g1.num_nodes, path, sort_by="dst", num_threads=4)
+            self.assertTrue(
+                np.all(index.degree == np.bincount(
+                    g1.edges[:2, 1], minlength=g1.num_nodes)))
+
+        with tempfile.TemporaryDirectory() as path:
+            index = EdgeIndex.build_on_disk(
+                g1.edges, g1.num_nodes, path, sort_by="dst", num_threads=2)
+            self.assertTrue(np.all(index.degree == g1.indegree()))
+
+        with tempfile.TemporaryDirectory() as path:
+            # int32 edges are converted while streaming the chunks
+            edges_path = os.path.join(path, "edges.npy")
+            np.save(edges_path, g1.edges.astype("int32"))
+            index = EdgeIndex.build_on_disk(
+                edges_path,
+                g1.num_nodes,
+                os.path.join(path, "adj_src"),
+                num_threads=3)
+            for a, b in zip(g1.adj_src_index.triples(), index.triples()):
+                self.assertTrue(np.all(a == b))
+
     def test_check_degree(self):
         """Check the degree
         """
@@ -356,6 +484,30 @@ class GraphTest(unittest.TestCase):
 
         self.assertTrue((ground == output).all())
 
+    def test_fused_send_u_recv(self):
+        np.random.seed(0)
+        num_nodes = 20
+        edges = np.random.randint(0, num_nodes, size=[100, 2])
+        nfeat = np.random.randn(num_nodes, 8).astype("float32")
+
+        g = pgl.Graph(edges=edges, num_nodes=num_nodes)
+        tensor_g = pgl.Graph(edges=edges, num_nodes=num_nodes).tensor()
+        for reduce_op in ["sum", "mean", "max", "min"]:
+            ground = tensor_g.send_u_recv(
+                paddle.to_tensor(nfeat), reduce_op=reduce_op).numpy()
+            output = g.send_u_recv(nfeat, reduce_op=reduce_op)
+            self.assertTrue(isinstance(output, np.ndarray))
+            self.assertTrue(np.allclose(ground, output, atol=1e-6))
+
+            output = g.send_recv(
+                paddle.to_tensor(nfeat), reduce_func=reduce_op, out_size=10)
+            self.assertTrue(isinstance(output, paddle.Tensor))
+            self.assertTrue(np.allclose(ground[:10], output.numpy(), atol=1e-6))
+
+        nfeat = paddle.to_tensor(nfeat, stop_gradient=False)
+        with self.assertRaises(ValueError):
+            g.send_u_recv(nfeat)
+
     def test_send_and_recv(self):
         np.random.seed(0)
         num_nodes = 5
@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import os
+import tempfile
 
 import unittest
 import numpy as np
@@ -63,6 +64,69 @@ class HeterGraphTest(unittest.TestCase):
         for batch in hg.node_batch_iter(3):
             break
 
+    def test_sample_typed_neighbors(self):
+        edges = {
+            'c2p': [(1, 4), (0, 5), (1, 9), (1, 8), (2, 8), (2, 5), (3, 6)],
+            'p2a': [(4, 10), (4, 11), (4, 12), (6, 12), (7, 12), (9, 10)],
+            'a2p': [(10, 4), (11, 4), (12, 4), (12, 6), (12, 7), (10, 9)],
+        }
+        node_types = [(i, 'c') for i in range(4)] + \
+                     [(i, 'p') for i in range(4, 10)] + \
+                     [(i, 'a') for i in range(10, 13)]
+        hg = pgl.HeterGraph(edges=edges, node_types=node_types)
+        self.assertEqual(hg.edge_types, ['c2p', 'p2a', 'a2p'])
+        self.assertEqual(hg.indegree([4, 12]).tolist(), [4, 3])
+        self.assertEqual(hg.outdegree().tolist(),
+                         hg.outdegree(hg.nodes).tolist())
+
+        nodes = [4, 12, 0]
+        neigh, eids, etypes, counts = hg.sample_typed_predecessor(nodes, -1)
+        self.assertEqual(counts.tolist(), [[1, 0, 3], [0, 3, 0], [0, 0, 0]])
+        self.assertEqual(neigh.tolist(), [1, 4, 6, 7, 10, 11, 12])
+        self.assertEqual(etypes.tolist(), [0, 1, 1, 1, 2, 2, 2])
+        for n, e, t in zip(neigh, eids, etypes):
+            self.assertEqual(edges[hg.edge_types[t]][e][0], n)
+
+        neigh, eids, etypes, counts = hg.sample_typed_predecessor(
+            nodes, {'a2p': 2})
+        self.assertEqual(counts.tolist(), [[0, 0, 2], [0, 0, 0], [0, 0, 0]])
+        self.assertTrue(set(neigh.tolist()) < set([10, 11, 12]))
+        self.assertEqual(len(set(neigh.tolist())), 2)
+
+        neigh, eids, etypes, counts = hg.sample_typed_successor([12], 1)
+        self.assertEqual(counts.tolist(), [[0, 0, 1]])
+        self.assertTrue(neigh[0] in [4, 6, 7])
+
+        # the typed indices are dumped, loaded and converted with the graph
+        src_triples = [x.tolist() for x in hg.typed_src_index.triples()]
+        with tempfile.TemporaryDirectory() as path:
+            hg.dump(path)
+            loaded = pgl.HeterGraph.load(path)
+            self.assertEqual(loaded.typed_src_index.num_types, 3)
+            self.assertEqual(
+                [x.tolist() for x in loaded.typed_src_index.triples()],
+                src_triples)
+            neigh, eids, etypes, counts = loaded.sample_typed_predecessor(
+                nodes, -1)
+            self.assertEqual(neigh.tolist(), [1, 4, 6, 7, 10, 11, 12])
+            self.assertEqual(etypes.tolist(), [0, 1, 1, 1, 2, 2, 2])
+
+        tensor_hg = hg.tensor(inplace=False)
+        self.assertTrue(tensor_hg.typed_src_index.is_tensor())
+        self.assertFalse(hg.typed_src_index.is_tensor())
+        numpy_hg = tensor_hg.numpy(inplace=False)
+        self.assertEqual(
+            [x.tolist() for x in numpy_hg.typed_src_index.triples()],
+            src_triples)
+        hg.tensor()
+        self.assertTrue(hg.typed_dst_index.is_tensor())
+        with tempfile.TemporaryDirectory() as path:
+            hg.dump(path)
+            loaded = pgl.HeterGraph.load(path)
+            self.assertEqual(
+                [x.tolist() for x in loaded.typed_src_index.triples()],
+                src_triples)
+
     def test_build_tensor_hetergraph(self):
         np.random.seed(1)
         dim = 4
@@ -19,7 +19,8 @@ import unittest
 import numpy as np
 import paddle
 import pgl
-from pgl.partition import metis_partition
+from pgl.partition import metis_partition, random_partition
+from pgl.partition import streaming_partition, partition_stats
 
 from testsuite import create_random_graph
 
@@ -66,6 +67,45 @@ class GraphPartitionTest(unittest.TestCase):
             node_weights=node_weight,
             edge_weights=edge_weight)
 
+    def test_random_partition(self):
+        graph = pgl.Graph(
+            edges=np.zeros([0, 2], dtype="int64"), num_nodes=103)
+        part_id = random_partition(graph, npart=10)
+        self.assertEqual(part_id.dtype, np.int64)
+        self.assertEqual(
+            sorted(np.bincount(part_id).tolist()), [4] + [11] * 9)
+
+    def test_streaming_partition(self):
+        np.random.seed(1)
+        # 20 cliques of 10 nodes with shuffled node ids
+        num_nodes = 200
+        perm = np.random.permutation(num_nodes)
+        edges = []
+        for c in range(20):
+            nodes = perm[c * 10:(c + 1) * 10]
+            edges.extend((u, v) for u in nodes for v in nodes if u != v)
+        graph = pgl.Graph(edges=edges, num_nodes=num_nodes)
+
+        random_stats = partition_stats(graph, random_partition(graph, 4))
+        for method in ["ldg", "fennel"]:
+            part_id = streaming_partition(
+                graph, 4, method=method, num_passes=2, chunk_size=64)
+            stats = partition_stats(graph, part_id, chunk_size=64)
+            self.assertTrue(np.all(stats["part_sizes"] <= 53))
+            self.assertLess(stats["edge_cut"], random_stats["edge_cut"])
+            self.assertLess(stats["replication_factor"],
+                            random_stats["replication_factor"])
+
+    def test_partition_stats(self):
+        graph = pgl.Graph(
+            edges=[(0, 1), (1, 0), (1, 2), (2, 3), (3, 0)], num_nodes=4)
+        stats = partition_stats(graph, np.array([0, 0, 1, 1]))
+        self.assertEqual(stats["edge_cut"], 2)
+        self.assertEqual(stats["part_sizes"].tolist(), [2, 2])
+        # every node has a neighbor in the other part
+        self.assertEqual(stats["replication_factor"], 2.0)
+        self.assertEqual(stats["balance"], 1.0)
+
 
 if __name__ == "__main__":
     if sys.platform != "win32":
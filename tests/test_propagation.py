@@ -0,0 +1,121 @@
+# Copyright (c) 2022 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import numpy as np
+
+import pgl
+from pgl.utils.propagation import propagate, label_propagation, correct_and_smooth
+
+
+class PropagationTest(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        self.num_nodes = 50
+        self.edges = np.random.randint(0, self.num_nodes, size=[300, 2])
+        self.graph = pgl.Graph(edges=self.edges, num_nodes=self.num_nodes)
+        self.feature = np.random.rand(self.num_nodes, 5).astype("float32")
+
+    def dense_propagate(self, num_iters, alpha, norm, add_self_loop):
+        adj = np.zeros([self.num_nodes, self.num_nodes])
+        for src, dst in self.edges:
+            adj[dst, src] += 1
+        if add_self_loop:
+            adj += np.eye(self.num_nodes)
+        degree = adj.sum(axis=1)
+        inv = np.where(degree > 0, 1.0 / np.maximum(degree, 1), 0)
+        if norm == "sym":
+            adj = np.sqrt(inv)[:, None] * adj * np.sqrt(inv)[None, :]
+        elif norm == "row":
+            adj = inv[:, None] * adj
+        elif norm == "indegree":
+            adj = adj * inv[None, :]
+        h0 = self.feature.astype("float64")
+        h = h0
+        for _ in range(num_iters):
+            h = (1 - alpha) * adj.dot(h) + alpha * h0
+        return h
+
+    def test_norms(self):
+        for norm in [None, "sym", "row", "indegree"]:
+            for add_self_loop in [False, True]:
+                for num_threads in [1, 3]:
+                    output = propagate(
+                        self.graph,
+                        self.feature,
+                        num_iters=3,
+                        alpha=0.1,
+                        norm=norm,
+                        add_self_loop=add_self_loop,
+                        block_size=7,
+                        num_threads=num_threads)
+                    ground = self.dense_propagate(3, 0.1, norm, add_self_loop)
+                    self.assertTrue(np.allclose(output, ground, atol=1e-4))
+
+    def test_float16_in_place(self):
+        feature = self.feature.astype("float16")
+        ground = propagate(
+            self.graph, feature.astype("float32"), num_iters=4, norm="row")
+        output = propagate(
+            self.graph, feature, num_iters=4, norm="row", out=feature)
+        self.assertIs(output, feature)
+        self.assertEqual(output.dtype, np.float16)
+        self.assertTrue(np.allclose(output, ground, atol=1e-2))
+
+    def test_nodes_and_fixed(self):
+        nodes = np.arange(0, self.num_nodes, 2)
+        fixed_index = np.array([0, 4])
+        output = propagate(
+            self.graph,
+            self.feature,
+            num_iters=1,
+            norm="row",
+            nodes=nodes,
+            fixed_index=fixed_index)
+        ground = self.dense_propagate(1, 0.0, "row", False)
+        updated = nodes[~np.isin(nodes, fixed_index)]
+        self.assertTrue(np.allclose(output[updated], ground[updated]))
+        self.assertTrue(np.allclose(output[1::2], self.feature[1::2]))
+        self.assertTrue(
+            np.allclose(output[fixed_index], self.feature[fixed_index]))
+
+    def test_tol(self):
+        output = propagate(
+            self.graph, self.feature, num_iters=1000, alpha=0.5, tol=1e-7)
+        ground = self.dense_propagate(100, 0.5, "sym", False)
+        self.assertTrue(np.allclose(output, ground, atol=1e-5))
+
+    def test_label_propagation(self):
+        labels = np.random.randint(0, 3, size=[10])
+        output = label_propagation(
+            self.graph,
+            labels,
+            np.arange(10),
+            3,
+            num_iters=10,
+            post_step="normalize",
+            fixed_index=np.arange(10))
+        self.assertEqual(output.shape, (self.num_nodes, 3))
+        self.assertEqual(np.argmax(output[:10], -1).tolist(), labels.tolist())
+
+        y_soft = np.random.dirichlet(np.ones(3), self.num_nodes)
+        output = correct_and_smooth(
+            self.graph, y_soft.astype("float32"), labels, np.arange(10))
+        self.assertEqual(output.shape, (self.num_nodes, 3))
+        self.assertTrue(output.min() >= 0 and output.max() <= 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
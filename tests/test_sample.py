@@ -22,6 +22,13 @@ from pgl.sampling import graphsage_sample
 from pgl.sampling import random_walk
 from pgl.sampling import node2vec_walk
 from pgl.sampling import node2vec_walk_plus
+from pgl.sampling import batch_random_walk
+from pgl.sampling import skip_gram_pairs, UnigramSampler
+from pgl.sampling import metapath_random_walk
+from pgl.sampling import ego_graph_sample
+from pgl.sampling import NeighborSampler
+from pgl.sampling import HeteroNeighborSampler
+from pgl.sampling import subgraph, induced_subgraph, LazyFeature
 
 from testsuite import create_random_graph
 
@@ -37,6 +44,98 @@ class SampleTest(unittest.TestCase):
         nodes = [1, 2, 3]
         np.random.seed(1)
         subgraphs = graphsage_sample(graph, nodes, [10, 10], [])
+        self.assertEqual(len(subgraphs), 2)
+        for sg, sample_index, node_index in subgraphs:
+            self.assertEqual(sg.num_nodes, len(sample_index))
+            self.assertEqual(sample_index[node_index].tolist(), nodes)
+            src = sample_index[sg.edges[:, 0]]
+            dst = sample_index[sg.edges[:, 1]]
+            for s, d in zip(src, dst):
+                self.assertIn(s, graph.predecessor([d])[0])
+
+    def test_graphsage_sample_ignore_edges(self):
+        """test_graphsage_sample_ignore_edges
+        """
+        graph = self.build_test_graph()
+        subgraphs = graphsage_sample(graph, [1], [10], [(0, 1)])
+        sg, sample_index, node_index = subgraphs[0]
+        edges = set(
+            zip(sample_index[sg.edges[:, 0]].tolist(), sample_index[sg.edges[
+                :, 1]].tolist()))
+        self.assertEqual(edges, set([(2, 1)]))
+        self.assertEqual(sg.edge_feat['efeat'].shape[0], 1)
+
+    def test_neighbor_sampler_numpy(self):
+        """test_neighbor_sampler_numpy
+        """
+        graph = create_random_graph()
+        nodes = np.array([1, 2, 3], dtype="int64")
+        sampler = NeighborSampler(graph, [5, 3], backend="numpy")
+        graph_list, sample_index = sampler.sample_neighbors(nodes)
+        self.assertEqual(len(graph_list), 2)
+        self.assertEqual(sample_index[:3].tolist(), nodes.tolist())
+        subgraph, num_dst = graph_list[-1]
+        self.assertEqual(num_dst, 3)
+        self.assertTrue(np.all(subgraph.outdegree() <= 5 * 3))
+        self.assertTrue(np.all(subgraph.indegree()[:3] <= 5))
+        self.assertEqual(subgraph.indegree()[3:].sum(), 0)
+
+    def test_hetero_neighbor_sampler(self):
+        """test_hetero_neighbor_sampler
+        """
+        edges = {
+            'c2p': [(1, 4), (0, 5), (1, 9), (1, 8), (2, 8), (2, 5), (3, 6)],
+            'p2a': [(4, 10), (4, 11), (4, 12), (6, 12), (7, 12), (9, 10)],
+        }
+        node_types = [(i, 'c') for i in range(4)] + \
+                     [(i, 'p') for i in range(4, 10)] + \
+                     [(i, 'a') for i in range(10, 13)]
+        hg = pgl.HeterGraph(edges=edges, node_types=node_types)
+        sampler = HeteroNeighborSampler(hg, [{'p2a': 2}, 2])
+        graph_list, sample_index = sampler.sample_neighbors([12])
+        self.assertEqual(len(graph_list), 2)
+        blocks, num_dst = graph_list[-1]
+        self.assertEqual(num_dst, 1)
+        self.assertEqual(list(blocks.keys()), ['p2a'])
+        self.assertEqual(blocks['p2a'].num_edges, 2)
+        blocks, num_dst = graph_list[0]
+        self.assertEqual(set(blocks.keys()), set(['c2p', 'p2a']))
+
+    def test_subgraph(self):
+        """test_subgraph
+        """
+        graph = self.build_test_graph()
+        sg = subgraph(graph, [1, 2, 0], eid=[0, 1, 3])
+        self.assertEqual(sg.edges.tolist(), [[2, 0], [0, 1], [0, 2]])
+        self.assertEqual(sg.node_feat['nfeat'].tolist(),
+                         graph.node_feat['nfeat'][[1, 2, 0]].tolist())
+        self.assertEqual(sg.edge_feat['efeat'].tolist(),
+                         graph.edge_feat['efeat'][[0, 1, 3]].tolist())
+        # the relabel buffer is reset after use
+        sg = subgraph(graph, [3, 4], eid=[2, 5])
+        self.assertEqual(sg.edges.tolist(), [[0, 1], [1, 0]])
+        with self.assertRaises(ValueError):
+            subgraph(graph, [0, 1], eid=[1])
+
+    def test_induced_subgraph(self):
+        """test_induced_subgraph
+        """
+        graph = self.build_test_graph()
+        sg, eids = induced_subgraph(
+            graph, [2, 1, 0], lazy_feat=True, return_eids=True)
+        self.assertEqual(sorted(eids.tolist()), [0, 1, 3, 4])
+        edges = set(map(tuple, sg.edges.tolist()))
+        self.assertEqual(edges, set([(2, 1), (1, 0), (1, 2), (0, 1)]))
+        nfeat = sg.node_feat['nfeat']
+        self.assertTrue(isinstance(nfeat, LazyFeature))
+        self.assertEqual(nfeat.shape, (3, 4))
+        self.assertEqual(nfeat[1].tolist(), graph.node_feat['nfeat'][1].tolist())
+        self.assertEqual(
+            np.asarray(sg.edge_feat['efeat']).tolist(),
+            graph.edge_feat['efeat'][eids].tolist())
+        sg.tensor()
+        self.assertEqual(sg.node_feat['nfeat'].numpy().tolist(),
+                         graph.node_feat['nfeat'][[2, 1, 0]].tolist())
 
     def build_test_graph(self):
         num_nodes = 5
@@ -64,5 +163,162 @@ class SampleTest(unittest.TestCase):
         g1 = self.build_test_graph()
         walk_paths = node2vec_walk_plus(g1, [0, 1], 4, p=0.25, q=0.25)
 
+    def test_batch_random_walk(self):
+        g1 = self.build_test_graph()
+        edges = set(map(tuple, g1.edges.tolist()))
+        for p, q in [(1.0, 1.0), (0.25, 4.0)]:
+            walks = batch_random_walk(g1, [0, 1, 4], 5, p=p, q=q, seed=1)
+            self.assertEqual(walks.shape, (3, 5))
+            self.assertEqual(walks[:, 0].tolist(), [0, 1, 4])
+            for walk in walks:
+                for src, dst in zip(walk[:-1], walk[1:]):
+                    if dst == -1:
+                        break
+                    self.assertIn((src, dst), edges)
+
+        walks = batch_random_walk(g1, [2, 3] * 10, 6, seed=2)
+        threaded_walks = batch_random_walk(g1, [2, 3] * 10,
+                                           6,
+                                           seed=2,
+                                           num_threads=3)
+        self.assertTrue(np.all(walks == threaded_walks))
+
+        g2 = pgl.Graph(edges=[(0, 1)], num_nodes=3)
+        walks = batch_random_walk(g2, [0, 2], 3)
+        self.assertEqual(walks.tolist(), [[0, 1, -1], [2, -1, -1]])
+
+    def test_skip_gram_pairs(self):
+        walks = np.array([[0, 1, 2, 3, -1], [4, 4, 5, -1, -1]])
+        src, pos = skip_gram_pairs(walks, win_size=1, seed=1)
+        self.assertEqual(list(zip(src.tolist(),
+                                  pos.tolist())), [(0, 1), (1, 0), (1, 2),
+                                                   (2, 1), (2, 3), (3, 2),
+                                                   (4, 5), (5, 4)])
+
+        src, pos = skip_gram_pairs(walks, win_size=3, seed=2)
+        src2, pos2 = skip_gram_pairs(walks, win_size=3, seed=2)
+        self.assertTrue(np.all(src == src2) and np.all(pos == pos2))
+        for s, p in zip(src, pos):
+            self.assertNotEqual(s, p)
+            self.assertIn(s, [0, 1, 2, 3, 4, 5])
+            self.assertIn(p, [0, 1, 2, 3, 4, 5])
+
+        keep_prob = np.array([1.0, 0.0, 1.0, 1.0, 1.0, 1.0])
+        src, pos = skip_gram_pairs(walks,
+                                   win_size=1,
+                                   keep_prob=keep_prob,
+                                   seed=1)
+        self.assertNotIn(1, src.tolist() + pos.tolist())
+        self.assertIn((0, 2), list(zip(src.tolist(), pos.tolist())))
+
+    def test_unigram_sampler(self):
+        np.random.seed(0)
+        sampler = UnigramSampler([1, 0, 16, 81], power=0.75)
+        samples = sampler.sample([50000, 2])
+        self.assertEqual(samples.shape, (50000, 2))
+        freq = np.bincount(samples.reshape([-1]), minlength=4) / samples.size
+        self.assertEqual(freq[1], 0)
+        self.assertTrue(
+            np.allclose(freq, [1 / 36., 0, 8 / 36., 27 / 36.], atol=0.01))
+
+        keep_prob = sampler.keep_prob(threshold=0.1)
+        self.assertTrue(np.all(keep_prob[:3] == 1.0))
+        self.assertLess(keep_prob[3], 1.0)
+
+    def build_test_hetergraph(self):
+        edges = {
+            'c2p': [(1, 4), (0, 5), (1, 9), (1, 8), (2, 8), (2, 5), (3, 6)],
+            'p2a': [(4, 10), (4, 11), (4, 12), (6, 12), (7, 12), (9, 10)],
+            'a2p': [(10, 4), (11, 4), (12, 4), (12, 6), (12, 7), (10, 9)],
+            'p2c': [(4, 1), (5, 0), (9, 1), (8, 1), (8, 2), (5, 2), (6, 3)],
+        }
+        node_types = [(i, 'c') for i in range(4)] + \
+                     [(i, 'p') for i in range(4, 10)] + \
+                     [(i, 'a') for i in range(10, 13)]
+        return pgl.HeterGraph(edges=edges, node_types=node_types), edges
+
+    def test_metapath_random_walk(self):
+        hg, edges = self.build_test_hetergraph()
+        metapath = "c2p-p2a-a2p-p2c"
+        walks, lengths = metapath_random_walk(
+            hg, [0, 1, 2, 3], metapath, 6, walk_times=2, seed=1)
+        self.assertEqual(walks.shape, (8, 6))
+        self.assertEqual(walks[:, 0].tolist(), [0, 0, 1, 1, 2, 2, 3, 3])
+        etypes = metapath.split("-")
+        for walk, length in zip(walks, lengths):
+            self.assertTrue(np.all(walk[length:] == -1))
+            for t in range(length - 1):
+                self.assertIn((walk[t], walk[t + 1]),
+                              edges[etypes[t % len(etypes)]])
+        # node 5 has no p2a edges
+        self.assertEqual(lengths[:2].tolist(), [2, 2])
+
+        walks2, lengths2 = metapath_random_walk(
+            hg, [0, 1, 2, 3], metapath, 6, walk_times=2, seed=1)
+        self.assertTrue(np.all(walks == walks2))
+
+        hg["a2p"].adj_src_index.build_alias_table(
+            np.array([0, 0, 0, 1, 0, 0], dtype="float64"))
+        walks, lengths = metapath_random_walk(
+            hg, [12] * 10, ["a2p"], 2, weighted=True)
+        self.assertEqual(walks[:, 1].tolist(), [6] * 10)
+
+    def test_metapath_random_walk_client(self):
+        hg, edges = self.build_test_hetergraph()
+
+        class GraphClient(object):
+            def sample_successor(self, nodes, max_degree, edge_type,
+                                 return_edges, split):
+                succ = hg.sample_successor(edge_type,
+                                           nodes.astype("int64"), max_degree)
+                return np.array([[u, v[0]] for u, v in zip(nodes, succ)
+                                 if len(v) > 0]).reshape([-1, 2])
+
+        metapath = "c2p-p2a-a2p-p2c"
+        walks, lengths = metapath_random_walk(GraphClient(), [0, 1, 3],
+                                              metapath, 5)
+        self.assertEqual(walks.dtype, np.uint64)
+        self.assertEqual(lengths[0], 2)
+        etypes = metapath.split("-")
+        for walk, length in zip(walks, lengths):
+            self.assertTrue(np.all(walk[length:] == 0))
+            for t in range(length - 1):
+                self.assertIn((walk[t], walk[t + 1]),
+                              edges[etypes[t % len(etypes)]])
+
+    def test_ego_graph_sample(self):
+        hg, edges = self.build_test_hetergraph()
+        edge_types = ['c2p', 'p2a']
+        g = ego_graph_sample(
+            hg, [1, 3], [10, 10], edge_types=edge_types, pad_value=-1)
+        self.assertFalse(g.is_tensor())
+        self.assertEqual(g.num_graph, 2)
+        node_id = g.node_feat["node_id"]
+        self.assertEqual(node_id.tolist(), [
+            1, 4, 9, 8, -1, -1, -1, -1, 10, 11, 12, 10, -1, 3, 6, -1, -1, 12
+        ])
+        self.assertEqual(g.graph_node_id.tolist(), [0] * 13 + [1] * 5)
+        self.assertEqual(g.graph_edge_id.tolist(), [0] * 12 + [1] * 4)
+        for (src, dst), etype, weight in zip(g.edges, g.edge_feat["edge_type"],
+                                             g.edge_feat["edge_weight"]):
+            self.assertEqual(g.graph_node_id[src], g.graph_node_id[dst])
+            if node_id[src] == -1:
+                self.assertEqual(src, dst)
+                self.assertEqual(weight, 1.0)
+            else:
+                # edges point from the successors to their parents
+                self.assertIn((node_id[dst], node_id[src]),
+                              edges[edge_types[etype]])
+        # node 1 has 3 c2p successors
+        self.assertTrue(np.allclose(g.edge_feat["edge_weight"][:3], 1 / 3.))
+
+        g = ego_graph_sample(hg, [1, 3], [{'c2p': 2}, {'p2a': 1}])
+        node_id = g.node_feat["node_id"]
+        self.assertEqual(node_id[-3:].tolist(), [3, 6, 12])
+        self.assertEqual(g.graph_node_id.tolist().count(1), 3)
+        self.assertEqual(len(set(node_id[1:3].tolist()) - set([4, 8, 9])), 0)
+        self.assertEqual(g.edge_feat["edge_type"][:2].tolist(), [0, 0])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -18,7 +18,7 @@ import unittest
 import numpy as np
 import paddle
 
-from pgl.utils.shared_embedding import SharedEmbedding
+from pgl.utils.shared_embedding import RowCache, SharedEmbedding
 
 
 class TestSharedEmebdding(unittest.TestCase):
@@ -114,13 +114,175 @@ class TestSharedEmebdding(unittest.TestCase):
             loss.backward()
             embeds.step()
             y = np.array([[-1., 2.], [5., 9.], [2., 8.]])
-            time.sleep(5)
+            embeds.wait_async_update()
             self.assertTrue((embeds.weight == y).all())
             embeds.finish_async_update()
         except AssertionError as error:
             embeds.finish_async_update()
             raise AssertionError(error)
 
+    def test_step_trace_duplicate_index(self):
+        embeds = SharedEmbedding.from_array(self.x, self.weight_path, 'sgd',
+                                            1.)
+        indexs = paddle.to_tensor([0, 2, 0])
+        grad = [paddle.ones([3, 2]).astype('float32')]
+        embeds.step_trace([indexs, grad])
+        y = np.array([[-2., 1.], [5., 9.], [0., 6.]])
+        self.assertTrue((embeds.weight == y).all())
+
+    def test_step_adagrad_duplicate_index(self):
+        embeds = SharedEmbedding.from_array(self.x, self.weight_path,
+                                            'adagrad', 1.)
+        indexs = paddle.to_tensor([0, 2, 0])
+        grad = paddle.to_tensor([[1., 1.], [3., 4.], [1., 1.]])
+        embeds.step_trace([indexs, [grad, (grad * grad).mean(axis=-1)]])
+        # the duplicate rows update like a single row with the summed grad
+        y = self.x.copy()
+        y[0] -= np.array([2., 2.]) / 2.
+        y[2] -= np.array([3., 4.]) / np.sqrt(12.5)
+        self.assertTrue(np.allclose(embeds.weight, y, atol=1e-6))
+        self.assertTrue(np.allclose(embeds._moment[[0, 2]], [4., 12.5]))
+
+    def test_step_adam(self):
+        for optim in ['adam', 'rowwise_adam']:
+            embeds = SharedEmbedding.from_array(self.x, self.weight_path,
+                                                optim, 0.1)
+            indexs = paddle.to_tensor([0, 2])
+            grad = paddle.to_tensor([[1., -1.], [2., 3.]])
+            embeds.step_trace([indexs, [grad]])
+            # the first step of adam moves each element by lr * sign(grad)
+            if optim == 'adam':
+                delta = -0.1 * np.sign(grad.numpy())
+            else:
+                g = grad.numpy()
+                delta = -0.1 * g / np.sqrt((g * g).mean(-1, keepdims=True))
+            y = self.x.copy()
+            y[[0, 2]] += delta
+            self.assertTrue(np.allclose(embeds.weight, y, atol=1e-6))
+
+    def test_async_update_shards(self):
+        try:
+            x = np.zeros([10, 2])
+            embeds = SharedEmbedding.from_array(
+                x, self.weight_path, 'sgd', 1., num_workers=2)
+            embeds.start_async_update()
+            for _ in range(3):
+                indexs = paddle.to_tensor([1, 8, 1, 5])
+                grad = [paddle.ones([4, 2]).astype('float32')]
+                embeds.step_trace([indexs, grad])
+            embeds.wait_async_update()
+            y = np.zeros([10, 2])
+            y[1], y[5], y[8] = -6., -3., -3.
+            self.assertTrue((embeds.weight == y).all())
+            stats = embeds.update_stats()
+            self.assertEqual(stats['num_enqueued'], 6)
+            self.assertEqual(stats['num_pending'], 0)
+            embeds.finish_async_update()
+        except AssertionError as error:
+            embeds.finish_async_update()
+            raise AssertionError(error)
+
+    def test_row_cache(self):
+        x = np.arange(20).reshape([10, 2]).astype('float32')
+        embeds = SharedEmbedding.from_array(
+            x, self.weight_path, 'sgd', 1., cache_size=2)
+        for _ in range(3):
+            y = embeds(paddle.to_tensor([1, 3, 1]))
+            self.assertTrue((y.numpy() == x[[1, 3, 1]]).all())
+        stats = embeds.cache_stats()
+        self.assertEqual(stats['num_cached'], 2)
+        # row 1 is admitted after the 1st lookup and row 3 after the 2nd
+        self.assertEqual(stats['num_hits'], 5)
+
+        grad = [paddle.ones([3, 2]).astype('float32')]
+        embeds.step_trace([paddle.to_tensor([1, 5, 1]), grad])
+        x[1] -= 2.
+        x[5] -= 1.
+        # the cached row is written back on flush
+        self.assertTrue((embeds.weight[1] == x[1] + 2.).all())
+        self.assertTrue((embeds.weight[5] == x[5]).all())
+        self.assertTrue((embeds.get(np.array([1, 5])) == x[[1, 5]]).all())
+        embeds.flush()
+        self.assertTrue((embeds.weight == x).all())
+
+    def test_row_cache_admit_reads_after_filter(self):
+        x = np.arange(20).reshape([10, 2]).astype('float32')
+        cache = RowCache(x.copy(), capacity=2, admit_threshold=1)
+
+        def admit_filter(rows):
+            # an async update lands after the rows are read for the lookup
+            cache._weight[rows] += 1.
+            return np.ones(rows.shape, dtype=bool)
+
+        cache.admit_filter = admit_filter
+        y = cache.lookup(np.array([1, 3]))
+        self.assertTrue((y == x[[1, 3]]).all())
+        self.assertTrue(cache.cached(np.array([1, 3])).all())
+        self.assertTrue((cache[np.array([1, 3])] == x[[1, 3]] + 1.).all())
+
+    def test_row_cache_eviction(self):
+        x = np.arange(20).reshape([10, 2]).astype('float32')
+        for policy in ['lfu', 'lru']:
+            embeds = SharedEmbedding(
+                weight=x,
+                weight_path=self.weight_path,
+                init_mode='array',
+                optimizer='sgd',
+                learning_rate=1.,
+                cache_size=2,
+                cache_policy=policy,
+                cache_admit_threshold=1)
+            embeds.step_trace([
+                paddle.to_tensor([0, 1]),
+                [paddle.ones([2, 2]).astype('float32')]
+            ])
+            for index in [[0, 0, 1], [2], [2], [2], [3]]:
+                y = embeds.get(np.array(index))
+                self.assertTrue((y == x[index] - (np.array(index) < 2).
+                                 reshape([-1, 1])).all())
+            embeds.flush()
+            z = x.copy()
+            z[:2] -= 1.
+            self.assertTrue((embeds.weight == z).all())
+
+    def test_storage_dtype(self):
+        x = np.random.uniform(-1, 1, size=[10, 4]).astype('float32')
+        for storage_dtype, atol in [('float16', 1e-3), ('bfloat16', 1e-2),
+                                    ('int8', 1e-2)]:
+            embeds = SharedEmbedding.from_array(
+                x, self.weight_path, 'sgd', 1., storage_dtype=storage_dtype)
+            self.assertEqual(embeds.storage_dtype, storage_dtype)
+            y = embeds(paddle.to_tensor([0, 3]))
+            self.assertEqual(y.dtype, paddle.float32)
+            self.assertTrue(np.allclose(y.numpy(), x[[0, 3]], atol=atol))
+
+            grad = paddle.full([2, 4], 0.5, dtype='float32')
+            embeds.step_trace([paddle.to_tensor([0, 3]), [grad]])
+            z = x.copy()
+            z[[0, 3]] -= 0.5
+
+            # the storage dtype is inferred from the file
+            loaded = SharedEmbedding.from_file(self.weight_path)
+            self.assertEqual(loaded.storage_dtype, storage_dtype)
+            self.assertTrue(np.allclose(
+                loaded.get(np.arange(10)), z, atol=atol))
+
+    def test_storage_dtype_small_updates(self):
+        np.random.seed(0)
+        x = np.random.uniform(0.5, 1, size=[4, 64]).astype('float32')
+        for storage_dtype in ['float16', 'bfloat16', 'int8']:
+            embeds = SharedEmbedding.from_array(
+                x, self.weight_path, 'sgd', 1., storage_dtype=storage_dtype)
+            start = embeds.get(np.arange(4))
+            # each update is far smaller than half of the storage precision
+            grad = [paddle.full([4, 64], 1e-4, dtype='float32')]
+            for _ in range(1000):
+                embeds.step_trace([paddle.to_tensor([0, 1, 2, 3]), grad])
+            delta = embeds.get(np.arange(4)) - start
+            # the rounding of each element is a random walk around -0.1
+            self.assertTrue(np.allclose(delta.mean(-1), -0.1, atol=0.01))
+            self.assertTrue((delta < 0).all())
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,89 @@
+# Copyright (c) 2022 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from pgl.utils.slot_feature import SlotFeature
+
+
+class SlotFeatureTest(unittest.TestCase):
+    def setUp(self):
+        self.feats = [
+            "1:583,2:697", "", "2:5, 1 : 7 ,3:9,1:x,1:-4",
+            b"1:1,1:2,long_slot_name:3"
+        ]
+        self.slots = ["1", "2", "long_slot_name"]
+
+    def test_from_strings(self):
+        store = SlotFeature.from_strings(self.feats, self.slots)
+        self.assertEqual(store.num_rows, 4)
+        self.assertEqual(store._indptrs[0].tolist(), [0, 1, 1, 3, 5])
+        self.assertEqual(store._values[0].tolist(), [583, 7, -4, 1, 2])
+        self.assertEqual(store._indptrs[1].tolist(), [0, 1, 1, 2, 2])
+        self.assertEqual(store._values[1].tolist(), [697, 5])
+        self.assertEqual(store._values[2].tolist(), [3])
+
+    def test_from_strings_overflow(self):
+        store = SlotFeature.from_strings(
+            ["1:9223372036854775807,1:-9223372036854775808"], ["1"])
+        self.assertEqual(store._values[0].tolist(),
+                         [9223372036854775807, -9223372036854775808])
+        for feat in ["1:9223372036854775808", "1:-99999999999999999999"]:
+            with self.assertRaises(OverflowError):
+                SlotFeature.from_strings(["1:1", feat], ["1"])
+
+    def test_gather(self):
+        store = SlotFeature.from_strings(
+            self.feats, self.slots, node_ids=np.array([10, 11, 12, 13]))
+        outputs = store.gather([12, 99, 10], slots=["1", "2"])
+        values, segment_ids = outputs["1"]
+        self.assertEqual(values.tolist(), [7, -4, 583])
+        self.assertEqual(segment_ids.tolist(), [0, 0, 2])
+
+        outputs = store.gather([12, 99, 11, 10], pad_value=0)
+        values, segment_ids = outputs["2"]
+        self.assertEqual(values.tolist(), [5, 0, 0, 697])
+        self.assertEqual(segment_ids.tolist(), [0, 1, 2, 3])
+        values, segment_ids = outputs["1"]
+        self.assertEqual(values.tolist(), [7, -4, 0, 0, 583])
+        self.assertEqual(segment_ids.tolist(), [0, 0, 1, 2, 3])
+
+    def test_dump_and_load(self):
+        store = SlotFeature.from_strings(
+            self.feats, self.slots, node_ids=np.array([13, 10, 12, 11]))
+        path = tempfile.mkdtemp()
+        try:
+            store.dump(path)
+            loaded = SlotFeature.load(path)
+            self.assertEqual(loaded.slots, self.slots)
+            self.assertIsInstance(loaded._values[0], np.memmap)
+            # the sort order of node_ids is loaded instead of sorted again
+            self.assertIsInstance(loaded._sorted_rows, np.memmap)
+            self.assertEqual(loaded.row_index([10, 13, 99]).tolist(),
+                             [1, 0, -1])
+            for slot in self.slots:
+                for a, b in zip(
+                        store.gather([13, 12, 11], pad_value=0)[slot],
+                        loaded.gather([13, 12, 11], pad_value=0)[slot]):
+                    self.assertEqual(a.tolist(), b.tolist())
+        finally:
+            shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
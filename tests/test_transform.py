@@ -11,6 +11,8 @@ import paddle
 import pgl
 from pgl.utils.logger import log
 from pgl.utils.transform import to_dense_batch, filter_adj
+from pgl.utils.transform import to_undirected, coalesce, reverse
+from pgl.utils.transform import add_self_loops, remove_self_loops
 
 
 class TransformTest(unittest.TestCase):
@@ -50,6 +52,74 @@ class TransformTest(unittest.TestCase):
         edge_index_ = [[2, 0], [2, 1], [3, 0], [4, 0], [5, 0]]
         self.assertAlmostEqual(edge_index.numpy().tolist(), edge_index_)
 
+    def test_to_undirected(self):
+        edges = [(0, 1), (1, 0), (1, 2), (2, 2)]
+        efeat = np.array([1.0, 2.0, 3.0, 4.0], dtype="float32")
+        graph = pgl.Graph(
+            edges=edges, num_nodes=4, edge_feat={'efeat': efeat})
+        for build_index in [False, True]:
+            if build_index:
+                graph.adj_src_index, graph.adj_dst_index
+            g = to_undirected(graph, copy_edge_feat=True, reduce="sum")
+            self.assertEqual(g.edges.tolist(),
+                             [[0, 1], [1, 0], [1, 2], [2, 1], [2, 2]])
+            self.assertEqual(g.edge_feat['efeat'].tolist(),
+                             [3.0, 3.0, 3.0, 3.0, 4.0])
+            self.assertEqual(g.outdegree().tolist(), [1, 2, 2, 0])
+
+        g = to_undirected(graph, copy_edge_feat=True, reduce="first")
+        self.assertEqual(g.edge_feat['efeat'].tolist(),
+                         [1.0, 2.0, 3.0, 3.0, 4.0])
+
+        # a self-loop is not duplicated by its reversed edge
+        graph = pgl.Graph(
+            edges=[(1, 1)],
+            num_nodes=2,
+            edge_feat={'efeat': np.array([4.0], dtype="float32")})
+        for build_index in [False, True]:
+            if build_index:
+                graph.adj_src_index, graph.adj_dst_index
+            for reduce in ["sum", "mean"]:
+                g = to_undirected(graph, copy_edge_feat=True, reduce=reduce)
+                self.assertEqual(g.edges.tolist(), [[1, 1]])
+                self.assertEqual(g.edge_feat['efeat'].tolist(), [4.0])
+
+    def test_coalesce(self):
+        edges = [(1, 2), (0, 1), (1, 2), (1, 2)]
+        efeat = np.array([[1, 5], [2, 6], [3, 7], [4, 8]], dtype="int64")
+        graph = pgl.Graph(
+            edges=edges, num_nodes=3, edge_feat={'efeat': efeat})
+        g = coalesce(graph, reduce="max", copy_edge_feat=True)
+        self.assertEqual(g.edges.tolist(), [[0, 1], [1, 2]])
+        self.assertEqual(g.edge_feat['efeat'].tolist(), [[2, 6], [4, 8]])
+        g = coalesce(graph, reduce="mean", copy_edge_feat=True)
+        self.assertEqual(g.edge_feat['efeat'].tolist(),
+                         [[2.0, 6.0], [8 / 3.0, 20 / 3.0]])
+
+    def test_self_loops(self):
+        edges = [(0, 1), (2, 1), (1, 1)]
+        efeat = np.array([1.0, 3.0, 5.0], dtype="float32")
+        graph = pgl.Graph(
+            edges=edges, num_nodes=3, edge_feat={'efeat': efeat})
+        g = add_self_loops(graph, copy_edge_feat=True, fill_value="mean")
+        self.assertEqual(g.edges.tolist()[3:], [[0, 0], [1, 1], [2, 2]])
+        self.assertEqual(g.edge_feat['efeat'].tolist(),
+                         [1.0, 3.0, 5.0, 0.0, 3.0, 0.0])
+        g = remove_self_loops(g, copy_edge_feat=True)
+        self.assertEqual(g.edges.tolist(), [[0, 1], [2, 1]])
+        self.assertEqual(g.edge_feat['efeat'].tolist(), [1.0, 3.0])
+
+    def test_reverse(self):
+        graph = pgl.Graph(
+            edges=[(0, 1), (0, 2)],
+            num_nodes=3,
+            edge_feat={'efeat': np.array([1, 2])})
+        graph.adj_src_index
+        g = reverse(graph, copy_edge_feat=True)
+        self.assertEqual(g.edges.tolist(), [[1, 0], [2, 0]])
+        self.assertEqual(g.edge_feat['efeat'].tolist(), [1, 2])
+        self.assertEqual(g.predecessor([0]).tolist(), [[1, 2]])
+
 
 if __name__ == "__main__":
     unittest.main()